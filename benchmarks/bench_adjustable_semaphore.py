@@ -0,0 +1,66 @@
+"""AdjustableSemaphore 与 asyncio.Semaphore 的 acquire/release 微基准
+
+用法:
+    python benchmarks/bench_adjustable_semaphore.py [--ops 200000] [--workers 64]
+
+分别测量两种场景下的 ops/sec：
+    - uncontended: 单个协程循环 acquire/release，衡量快速路径开销
+    - contended: 多个协程争用少量名额，衡量等待队列的唤醒开销
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Callable
+
+from adaptio import AdjustableSemaphore
+
+
+async def _uncontended(sem, ops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(ops):
+        async with sem:
+            pass
+    return ops / (time.perf_counter() - start)
+
+
+async def _contended(sem, ops: int, workers: int) -> float:
+    per_worker = ops // workers
+
+    async def worker():
+        for _ in range(per_worker):
+            async with sem:
+                await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(workers)])
+    return per_worker * workers / (time.perf_counter() - start)
+
+
+def _run(factory: Callable[[int], object], ops: int, workers: int) -> dict[str, float]:
+    async def main():
+        return {
+            "uncontended": await _uncontended(factory(1), ops),
+            "contended": await _contended(factory(max(1, workers // 8)), ops, workers),
+        }
+
+    return asyncio.run(main())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=64)
+    args = parser.parse_args()
+
+    results = {
+        "asyncio.Semaphore": _run(asyncio.Semaphore, args.ops, args.workers),
+        "AdjustableSemaphore": _run(AdjustableSemaphore, args.ops, args.workers),
+    }
+    print(f"{'implementation':<22}{'uncontended ops/s':>20}{'contended ops/s':>20}")
+    for name, result in results.items():
+        print(f"{name:<22}{result['uncontended']:>20,.0f}{result['contended']:>20,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""自适应并发控制在模拟过载后端上的端到端基准
+
+用法:
+    python benchmarks/bench_overloaded_backend.py [--phases 16:5,48:5,8:5] [--callers 256]
+        [--scenarios adaptive-aimd,async-control] [--output results.json]
+
+在本地启动一个 aiohttp 服务模拟容量有限的后端：
+    - 同时处理的请求数达到当前容量时返回 429/503（可带 Retry-After 头）
+    - 延迟随负载升高：base_latency * (1 + latency_slope * (in_flight / capacity) ** 2)
+    - 容量按 --phases 在运行中途变化，格式为 "容量:秒数,容量:秒数,..."
+
+每个场景用 --callers 个协程循环调用后端（闭环负载），统计：
+    - goodput: 每秒成功完成的调用数（含重试的完整调用）
+    - p50/p99: 调用方看到的延迟（含排队与重试）
+    - overload_ratio: 后端收到的请求中被拒绝的比例
+    - convergence_time: 每次容量变化后，后端利用率首次连续 --window 秒不低于 --converge-utilization
+      且拒绝率不超过 --converge-reject-ratio 所需的时间（秒），未收敛时为 null，
+      任一阶段未收敛时 convergence_time_mean 为 null
+    - oscillation: 每个阶段后半段后端并发数的标准差相对容量的比例
+
+结果以 JSON 输出（--output 指定文件，否则打印到标准输出），便于跟踪回归。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+
+import aiohttp
+from aiohttp import web
+
+from adaptio import (
+    AdaptiveAsyncConcurrencyLimiter,
+    raise_on_aiohttp_overload,
+    with_adaptive_retry,
+    with_async_control,
+)
+
+CONTROLLERS = ("aimd", "gradient", "reno", "cubic", "vegas")
+SCENARIOS = (*(f"adaptive-{name}" for name in CONTROLLERS), "async-control")
+
+
+@dataclass
+class Sample:
+    time: float
+    capacity: int
+    in_flight: int
+    requests_total: int
+    rejected_total: int
+    limit: int | None
+
+
+@dataclass
+class PhaseResult:
+    capacity: int
+    seconds: float
+    convergence_time: float | None
+    oscillation: float
+
+
+@dataclass
+class ScenarioResult:
+    scenario: str
+    calls: int
+    goodput: float
+    p50: float | None
+    p99: float | None
+    overload_ratio: float
+    convergence_time_mean: float | None
+    oscillation_mean: float
+    phases: list[PhaseResult] = field(default_factory=list)
+
+
+class SimulatedBackend:
+    """容量有限、容量会随时间变化的模拟后端"""
+
+    def __init__(
+        self,
+        phases: list[tuple[int, float]],
+        base_latency: float,
+        latency_slope: float,
+        retry_after: float,
+    ):
+        self.phases = phases
+        self.base_latency = base_latency
+        self.latency_slope = latency_slope
+        self.retry_after = retry_after
+        self.capacity = phases[0][0]
+        self.in_flight = 0
+        self.requests_total = 0
+        self.rejected_total = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests_total += 1
+        if self.in_flight >= self.capacity:
+            self.rejected_total += 1
+            headers = (
+                {"Retry-After": f"{self.retry_after:g}"} if self.retry_after else {}
+            )
+            status = 429 if self.rejected_total % 2 else 503
+            return web.Response(status=status, headers=headers)
+
+        self.in_flight += 1
+        try:
+            load = self.in_flight / self.capacity
+            latency = self.base_latency * (1 + self.latency_slope * load**2)
+            await asyncio.sleep(latency * random.uniform(0.8, 1.2))
+        finally:
+            self.in_flight -= 1
+        return web.Response(text="ok")
+
+    async def run_phases(self) -> None:
+        for capacity, seconds in self.phases:
+            self.capacity = capacity
+            await asyncio.sleep(seconds)
+
+
+async def _sample_loop(
+    backend: SimulatedBackend,
+    limit: Callable[[], int | None],
+    samples: list[Sample],
+    interval: float,
+    started_at: float,
+) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        samples.append(
+            Sample(
+                time=loop.time() - started_at,
+                capacity=backend.capacity,
+                in_flight=backend.in_flight,
+                requests_total=backend.requests_total,
+                rejected_total=backend.rejected_total,
+                limit=limit(),
+            )
+        )
+        await asyncio.sleep(interval)
+
+
+def _phase_results(
+    samples: list[Sample],
+    phases: list[tuple[int, float]],
+    window: float,
+    min_utilization: float,
+    max_reject_ratio: float,
+) -> list[PhaseResult]:
+    results = []
+    phase_start = 0.0
+    for capacity, seconds in phases:
+        phase_end = phase_start + seconds
+        in_phase = [s for s in samples if phase_start <= s.time < phase_end]
+
+        convergence_time = None
+        for i, first in enumerate(in_phase):
+            window_samples = [s for s in in_phase[i:] if s.time <= first.time + window]
+            last = window_samples[-1]
+            if last.time - first.time < window * 0.9:
+                break
+            utilization = (
+                statistics.fmean(s.in_flight for s in window_samples) / capacity
+            )
+            requests = last.requests_total - first.requests_total
+            rejected = last.rejected_total - first.rejected_total
+            if utilization >= min_utilization and (
+                not requests or rejected / requests <= max_reject_ratio
+            ):
+                convergence_time = first.time - phase_start
+                break
+
+        second_half = [
+            s.in_flight for s in in_phase if s.time >= phase_start + seconds / 2
+        ]
+        oscillation = (
+            statistics.pstdev(second_half) / capacity if len(second_half) > 1 else 0.0
+        )
+        results.append(PhaseResult(capacity, seconds, convergence_time, oscillation))
+        phase_start = phase_end
+    return results
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _build_call(
+    scenario: str, session: aiohttp.ClientSession, url: str, args: argparse.Namespace
+) -> tuple[Callable[[], Awaitable[str]], Callable[[], int | None]]:
+    async def request() -> str:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.text()
+
+    if scenario == "async-control":
+
+        def is_overload(e: Exception) -> bool:
+            return isinstance(e, aiohttp.ClientResponseError) and e.status in (429, 503)
+
+        call = with_async_control(
+            cared_exception=is_overload,
+            max_concurrency=args.static_concurrency,
+            retry_n=1024,
+            retry_delay=args.retry_interval,
+        )(request)
+        return call, lambda: args.static_concurrency
+
+    limiter = AdaptiveAsyncConcurrencyLimiter(
+        max_concurrency=args.callers,
+        initial_concurrency=1,
+        controller=scenario.removeprefix("adaptive-"),  # type: ignore[arg-type]
+        log_level="ERROR",
+    )
+    call = with_adaptive_retry(
+        scheduler=limiter, retry_interval_seconds=args.retry_interval
+    )(raise_on_aiohttp_overload()(request))
+    return call, lambda: limiter.workers_lock.initial_value
+
+
+async def run_scenario(scenario: str, args: argparse.Namespace) -> ScenarioResult:
+    phases = args.phases
+    backend = SimulatedBackend(
+        phases, args.base_latency, args.latency_slope, args.retry_after
+    )
+    app = web.Application()
+    app.router.add_get("/", backend.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+
+    loop = asyncio.get_running_loop()
+    latencies: list[float] = []
+    samples: list[Sample] = []
+    duration = sum(seconds for _, seconds in phases)
+
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=0)
+    ) as session:
+        call, limit = _build_call(scenario, session, f"http://127.0.0.1:{port}/", args)
+        started_at = loop.time()
+        deadline = started_at + duration
+
+        async def caller() -> None:
+            while loop.time() < deadline:
+                call_start = loop.time()
+                try:
+                    await call()
+                except Exception:
+                    continue
+                latencies.append(loop.time() - call_start)
+
+        background = [
+            asyncio.create_task(backend.run_phases()),
+            asyncio.create_task(
+                _sample_loop(backend, limit, samples, args.sample_interval, started_at)
+            ),
+        ]
+        callers = [asyncio.create_task(caller()) for _ in range(args.callers)]
+        await asyncio.sleep(duration)
+        # 给最后一批调用一点时间结束，剩下的直接取消
+        await asyncio.wait(callers, timeout=args.base_latency * 10)
+        for task in [*callers, *background]:
+            task.cancel()
+        await asyncio.gather(*callers, *background, return_exceptions=True)
+        elapsed = loop.time() - started_at
+
+    await runner.cleanup()
+
+    phase_results = _phase_results(
+        samples,
+        phases,
+        args.window,
+        args.converge_utilization,
+        args.converge_reject_ratio,
+    )
+    convergence_times = [
+        p.convergence_time for p in phase_results if p.convergence_time is not None
+    ]
+    return ScenarioResult(
+        scenario=scenario,
+        calls=len(latencies),
+        goodput=len(latencies) / elapsed,
+        p50=_percentile(latencies, 0.5),
+        p99=_percentile(latencies, 0.99),
+        overload_ratio=(
+            backend.rejected_total / backend.requests_total
+            if backend.requests_total
+            else 0.0
+        ),
+        convergence_time_mean=(
+            statistics.fmean(convergence_times)
+            if len(convergence_times) == len(phase_results)
+            else None
+        ),
+        oscillation_mean=statistics.fmean(p.oscillation for p in phase_results),
+        phases=phase_results,
+    )
+
+
+def _parse_phases(value: str) -> list[tuple[int, float]]:
+    phases = []
+    for part in value.split(","):
+        capacity, seconds = part.split(":")
+        phases.append((int(capacity), float(seconds)))
+    return phases
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--phases", type=_parse_phases, default="16:5,48:5,8:5")
+    parser.add_argument("--callers", type=int, default=256)
+    parser.add_argument("--base-latency", type=float, default=0.02)
+    parser.add_argument("--latency-slope", type=float, default=1.0)
+    parser.add_argument("--retry-after", type=float, default=0.05)
+    parser.add_argument("--retry-interval", type=float, default=0.05)
+    parser.add_argument("--static-concurrency", type=int, default=32)
+    parser.add_argument("--sample-interval", type=float, default=0.02)
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--converge-utilization", type=float, default=0.75)
+    parser.add_argument("--converge-reject-ratio", type=float, default=0.3)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(",")
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"未知的场景 {sorted(unknown)}，可选 {list(SCENARIOS)}")
+
+    # with_async_control 每次重试都会打印错误日志
+    logging.getLogger("adaptio.with_async_control").setLevel(logging.CRITICAL)
+    results = [asyncio.run(run_scenario(scenario, args)) for scenario in scenarios]
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "phases": args.phases,
+            "callers": args.callers,
+            "base_latency": args.base_latency,
+            "latency_slope": args.latency_slope,
+            "retry_after": args.retry_after,
+        },
+        "results": [asdict(result) for result in results],
+    }
+
+    print(
+        f"{'scenario':<18}{'goodput/s':>12}{'p50':>9}{'p99':>9}"
+        f"{'overload':>10}{'converge':>10}{'oscillation':>13}"
+    )
+    for r in results:
+        converge = (
+            "-" if r.convergence_time_mean is None else f"{r.convergence_time_mean:.2f}"
+        )
+        print(
+            f"{r.scenario:<18}{r.goodput:>12,.1f}{r.p50 or 0:>9.3f}{r.p99 or 0:>9.3f}"
+            f"{r.overload_ratio:>10.1%}{converge:>10}{r.oscillation_mean:>13.2f}"
+        )
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,103 @@ from .adaptive_async_concurrency_limiter import (
     AdaptiveAsyncConcurrencyLimiter,
     ServiceOverloadError,
 )
-from .adjustable_semaphore import AdjustableSemaphore
+from .adaptive_batcher import AdaptiveBatcher, with_adaptive_batching
+from .adaptive_rate_limiter import AdaptiveRateLimiter
+from .adjustable_semaphore import AdjustableSemaphore, ThreadSafeAdjustableSemaphore
+from .backoff import (
+    BackoffPolicy,
+    ConstantBackoff,
+    DecorrelatedJitterBackoff,
+    ExponentialBackoff,
+    FullJitterBackoff,
+)
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .congestion_control import (
+    AIMDController,
+    ConcurrencyController,
+    CubicController,
+    GradientController,
+    RenoController,
+    VegasController,
+    WindowSample,
+)
+from .coordinator import CoordinatedAdaptiveLimiter, LimitCoordinator
+from .hedging import HedgePolicy
+from .hooks import AdjustEvent, LimiterHooks, RetryEvent, TaskTrace
+from .keyed_limiter import KeyedAdaptiveLimiter
+from .metrics import Histogram, LimiterMetrics, LimiterStats, render_prometheus
+from .opentelemetry_hooks import OpenTelemetryHooks
 from .raise_on_aiohttp_overload import raise_on_aiohttp_overload
 from .raise_on_overload_by_guessing import raise_on_overload
+from .result_cache import ResultCache
+from .shared_memory_limiter import SharedMemoryLimiter
+from .simulation import (
+    ClosedLoopWorkload,
+    OpenLoopWorkload,
+    SimulatedBackend,
+    Simulation,
+    SimulationResult,
+    VirtualTimeEventLoop,
+    limiter_probes,
+    step_schedule,
+)
+from .singleflight import SingleFlight
+from .sliding_window import SlidingWindowStats, WindowTotals
+from .token_bucket import TokenBucket
 from .with_adaptive_retry import with_adaptive_retry
 from .with_async_control import with_async_control
 
 __all__ = [
     "AdaptiveAsyncConcurrencyLimiter",
+    "AdaptiveBatcher",
+    "AdaptiveRateLimiter",
     "AdjustableSemaphore",
+    "AdjustEvent",
+    "AIMDController",
+    "BackoffPolicy",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ClosedLoopWorkload",
+    "ConcurrencyController",
+    "ConstantBackoff",
+    "CoordinatedAdaptiveLimiter",
+    "CubicController",
+    "DecorrelatedJitterBackoff",
+    "ExponentialBackoff",
+    "FullJitterBackoff",
+    "GradientController",
+    "HedgePolicy",
+    "Histogram",
+    "KeyedAdaptiveLimiter",
+    "LimitCoordinator",
+    "LimiterHooks",
+    "LimiterMetrics",
+    "LimiterStats",
+    "limiter_probes",
+    "OpenLoopWorkload",
+    "OpenTelemetryHooks",
     "raise_on_aiohttp_overload",
     "raise_on_overload",
+    "render_prometheus",
+    "ResultCache",
+    "RenoController",
+    "RetryEvent",
     "ServiceOverloadError",
+    "SharedMemoryLimiter",
+    "SimulatedBackend",
+    "Simulation",
+    "SimulationResult",
+    "SingleFlight",
+    "SlidingWindowStats",
+    "step_schedule",
+    "TaskTrace",
+    "ThreadSafeAdjustableSemaphore",
+    "TokenBucket",
+    "VegasController",
+    "VirtualTimeEventLoop",
+    "WindowSample",
+    "WindowTotals",
+    "with_adaptive_batching",
     "with_adaptive_retry",
     "with_async_control",
 ]
@@ -1,12 +1,49 @@
 import asyncio
-from collections.abc import Coroutine
+import contextlib
+import logging
+import math
+import threading
+from collections import deque
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Iterable,
+    Mapping,
+    Sequence,
+)
+from typing import Any, TypeVar
 
-from .adjustable_semaphore import AdjustableSemaphore
+from .adjustable_semaphore import AdjustableSemaphore, ThreadSafeAdjustableSemaphore
+from .backoff import BackoffName, BackoffPolicy
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from .congestion_control import (
+    AIMDController,
+    ConcurrencyController,
+    ControllerName,
+    WindowSample,
+    create_controller,
+)
+from .hooks import AdjustEvent, LimiterHooks, TaskOutcome, TaskTrace, fire_hooks
 from .log_utils import setup_colored_logger
+from .metrics import LimiterMetrics, LimiterStats
+from .sliding_window import SlidingWindowStats
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 class ServiceOverloadError(BaseException):
-    pass
+    """服务过载异常
+
+    Args:
+        retry_after: 服务端建议的重试等待时间（秒），例如 HTTP 响应的 Retry-After 头
+    """
+
+    def __init__(self, *args: object, retry_after: float | None = None) -> None:
+        super().__init__(*args)
+        self.retry_after = retry_after
 
 
 class AdaptiveAsyncConcurrencyLimiter:
@@ -17,6 +54,15 @@ class AdaptiveAsyncConcurrencyLimiter:
     - 当检测到过载时，快速降低并发数
     - 通过动态信号量（DynamicSemaphore）来控制并发度
 
+    每完成一轮调用（完成数超过当前并发上限），限制器会把这一轮的统计样本
+    （WindowSample）交给并发度控制算法（ConcurrencyController），由它给出新的并发上限。
+    每次降低并发上限（包括进入与结束退避暂停）都会开始新的控制周期（control_epoch），
+    一轮只统计在当前周期内开始执行的调用，在降低前的较高并发上限下放行、之后才结束的调用
+    不会让一次过载引发连续多次降低；提高并发上限不开始新周期，已在执行的调用仍计入本轮。
+    设置了 control_interval 时还会定时检查：如果超过 control_interval 秒都没有完成一轮
+    （例如调用耗时几分钟），就用最近 stats_window_seconds 秒的滑动窗口统计生成样本并调整，
+    调用耗时很长时也能及时响应已经出现的过载；调用很快时仍按轮调整，保持稳定。
+
     Args:
         max_concurrency: 最大允许的并发数
         min_concurrency: 最小允许的并发数
@@ -24,14 +70,52 @@ class AdaptiveAsyncConcurrencyLimiter:
         adjust_overload_rate: 触发并发度调整的过载率阈值
             意思是在最近一轮并发调用中，若触发过载错误的调用数量超过这个比例，才会进行降低并发数操作
         overload_exception: 用于标识过载的异常类型
+        controller: 并发度控制算法，可以是内置算法的名称或实现了
+            ConcurrencyController 协议的对象
+            "aimd": 仅根据过载率做加性增、乘性减（默认）
+            "gradient": 在过载控制的基础上，根据延迟相对基准的升高幅度调整并发数
+            "reno": TCP Reno 风格的慢启动 + 拥塞避免
+            "cubic": TCP CUBIC 风格的三次函数增长
+            "vegas": TCP Vegas 风格，根据估计的排队量调整并发数
+        latency_tolerance: controller="gradient" 时可容忍的延迟升高倍数，
+            最近一轮平均延迟不超过基准的这个倍数时不会因延迟降低并发数
         log_level: 日志级别
         log_prefix: 日志前缀
+        logger: 使用的日志记录器，为 None 时为每个实例创建一个独立的 logger
+            大量创建限制器时（例如 KeyedAdaptiveLimiter 为每个 key 创建一个）可以共享同一个 logger，
+            此时 log_level 不生效
         ignore_loop_bound_exception: 是否忽略事件循环绑定异常
             如果你获取了一个在另一个asyncio循环中初始化的信号量，实际上它没有任何限制并发的能力！
             默认情况下，这个库在这种情况下会引发RuntimeError异常。
             但是，如果你将此选项设置为True，它将忽略异常，并且除了打印一条 warning 外没有其他动作。
             通常情况下很难在实际应用中出发这个错误，除非刻意写出在同步函数中使用多线程调用异步函数的代码。
             https://github.com/python/cpython/blob/v3.13.3/Lib/asyncio/mixins.py#L20
+        metrics: 累计指标，为 None 时使用默认分桶创建，见 stats() 与 render_prometheus
+        hooks: 插桩钩子（LimiterHooks），用于分解每次调用的排队、等待与执行时间或接入链路追踪；
+            未注册钩子时不创建 TaskTrace，几乎没有额外开销
+        thread_safe: 是否允许在多个线程的多个事件循环中共享同一个限制器
+            为 True 时使用 ThreadSafeAdjustableSemaphore，统计与调整并发数的状态由线程锁保护，
+            所有事件循环共享同一个自适应并发上限，ignore_loop_bound_exception 不再需要。
+            asubmit 的等待队列仍绑定在第一次调用 asubmit 的事件循环上
+        max_pending: asubmit 等待队列的最大长度，None 表示不限制
+            队列已满时 asubmit 会挂起调用方，直到有任务获得名额
+        global_cooldown: 过载异常带有 retry_after（服务端的退避提示）时是否暂停整个限制器
+            暂停期间不再放行新的调用；到期后先只放行一小部分探测调用，
+            探测调用成功后再恢复到暂停前的并发数。默认为 False，需要时显式开启
+        cooldown_probe_ratio: 暂停结束后用于探测的并发数占暂停前并发数的比例（至少为 1）
+        circuit_breaker: 熔断器，None 表示不启用
+            后端持续过载或失败时熔断器打开，此时调用不再执行，而是抛出 CircuitOpenError
+            （或按 CircuitBreaker.max_wait_seconds 等待熔断结束），之后以少量探测调用检查后端是否恢复
+        priority_weights: 各优先级分到名额的权重，含义见 AdjustableSemaphore
+            submit/asubmit/map 的 priority 参数数值越小越重要，默认为 0；
+            所有优先级共享同一个自适应并发上限，名额紧张时优先分给重要的调用
+        control_interval: 两次调整之间的最长间隔（秒），None 表示只按完成的调用数分轮调整
+            定时检查的任务在第一次 submit/asubmit 时于当前事件循环中启动，shutdown 时停止；
+            并发上限没有被用满的区间不会提高并发上限，降低并发上限后清空滑动窗口，
+            旧的过载证据不会再次触发调整
+        stats_window_seconds: 定时调整使用的滑动窗口长度（秒），默认为 control_interval 的 5 倍
+        idle_decay: 设置了 control_interval 时，整个滑动窗口内都没有调用则每次检查把并发上限乘以这个系数
+            （不低于 min_concurrency），长时间空闲后不再沿用过时的并发上限；为 1 时不衰减
     """
 
     def __init__(
@@ -41,9 +125,23 @@ class AdaptiveAsyncConcurrencyLimiter:
         initial_concurrency=1,
         adjust_overload_rate: float = 0.1,
         overload_exception: type[BaseException] = ServiceOverloadError,
+        controller: ControllerName | ConcurrencyController = "aimd",
+        latency_tolerance: float = 1.5,
         log_level: str = "INFO",
         log_prefix: str = "",
         ignore_loop_bound_exception: bool = False,
+        max_pending: int | None = None,
+        global_cooldown: bool = False,
+        cooldown_probe_ratio: float = 0.1,
+        circuit_breaker: CircuitBreaker | None = None,
+        priority_weights: Mapping[int, float] | None = None,
+        logger: logging.Logger | None = None,
+        metrics: LimiterMetrics | None = None,
+        hooks: Sequence[LimiterHooks] = (),
+        thread_safe: bool = False,
+        control_interval: float | None = None,
+        stats_window_seconds: float | None = None,
+        idle_decay: float = 0.9,
     ):
         if initial_concurrency < min_concurrency:
             raise ValueError(
@@ -57,136 +155,940 @@ class AdaptiveAsyncConcurrencyLimiter:
             raise ValueError(
                 f"{log_prefix} -- {min_concurrency=} 不能大于 {max_concurrency=}"
             )
+        if control_interval is not None and control_interval <= 0:
+            raise ValueError(f"{log_prefix} -- {control_interval=} 必须大于 0")
 
         self.max_concurrency = max_concurrency
         self.min_concurrency = min_concurrency
         self.adjust_overload_rate = adjust_overload_rate
         self.overload_exception = overload_exception
+        self.controller = (
+            create_controller(controller, latency_tolerance=latency_tolerance)
+            if isinstance(controller, str)
+            else controller
+        )
         self.log_prefix = log_prefix
 
-        self.logger = setup_colored_logger(
+        self.logger = logger or setup_colored_logger(
             logger_name=f"scheduler_{id(self)}",
             log_level=log_level,
         )
 
         self.submitted_tasks: set[asyncio.Future] = set()
+        self.max_pending = max_pending
+        # asubmit 的等待队列：每个优先级一个先进先出队列和一个分发任务，
+        # 总长度由 _pending_slots 限制为 max_pending
+        self._pending: dict[
+            int, deque[tuple[Coroutine, asyncio.Future, float, TaskTrace | None]]
+        ] = {}
+        self._pending_slots: asyncio.Semaphore | None = None
+        self._dispatchers: dict[int, asyncio.Task] = {}
+
+        self.global_cooldown = global_cooldown
+        self.cooldown_probe_ratio = cooldown_probe_ratio
+        self._cooldown_until = 0.0
+        self._limit_before_cooldown: int | None = None
+        self.circuit_breaker = circuit_breaker
 
         self.current_failed_count = 0
         self.current_overload_count = 0
         self.current_succeed_count = 0
         self.current_finished_count = 0
         self.current_running_count = 0
+        self.current_latency_sum = 0.0
+        self.current_min_latency = math.inf
+        self.metrics = metrics or LimiterMetrics()
+        self.hooks: tuple[LimiterHooks, ...] = tuple(hooks)
 
-        self.workers_lock = AdjustableSemaphore(
-            initial_concurrency,
-            ignore_loop_bound_exception=ignore_loop_bound_exception,
+        self.control_interval = control_interval
+        self.idle_decay = idle_decay
+        self.window_stats: SlidingWindowStats | None = (
+            SlidingWindowStats(stats_window_seconds or control_interval * 5)
+            if control_interval is not None
+            else None
         )
-        # 添加新的变量来跟踪调整状态
-        self.increase_step = 1  # 初始增长步长
-        self.decrease_factor = 0.75  # 遇到过载时的下降因子
+        # 每次修改并发上限时加一；只有在当前周期内获得名额的调用才计入统计，
+        # 在旧的（更高的）并发上限下放行的调用不会再次触发调整
+        self.control_epoch = 0
+        self._peak_running_count = 0
+        self._last_adjust_at = -math.inf
+        self._control_task: asyncio.Task | None = None
+        # 并发上限可以暂时为 0（例如协调服务没有分到名额），是否关闭单独记录
+        self._closed = False
+
+        self.thread_safe = thread_safe
+        self.workers_lock: AdjustableSemaphore
+        if thread_safe:
+            self._state_lock: contextlib.AbstractContextManager = threading.Lock()
+            self.workers_lock = ThreadSafeAdjustableSemaphore(
+                initial_concurrency, priority_weights=priority_weights
+            )
+        else:
+            self._state_lock = contextlib.nullcontext()
+            self.workers_lock = AdjustableSemaphore(
+                initial_concurrency,
+                ignore_loop_bound_exception=ignore_loop_bound_exception,
+                priority_weights=priority_weights,
+            )
 
     def reset_counters(self):
         self.current_failed_count = 0
         self.current_overload_count = 0
         self.current_succeed_count = 0
         self.current_finished_count = 0
+        self.current_latency_sum = 0.0
+        self.current_min_latency = math.inf
+
+    def window_sample(self) -> WindowSample:
+        """生成最近一轮调用的统计样本"""
+        return self._make_sample(
+            self.current_finished_count,
+            self.current_succeed_count,
+            self.current_overload_count,
+            self.current_failed_count,
+            self.current_latency_sum,
+            self.current_min_latency,
+        )
+
+    def sliding_window_sample(self) -> WindowSample:
+        """生成滑动窗口内调用的统计样本，只在设置了 control_interval 时可用"""
+        if self.window_stats is None:
+            raise RuntimeError(f"{self.log_prefix} -- 未设置 control_interval")
+        totals = self.window_stats.totals(asyncio.get_running_loop().time())
+        return self._make_sample(
+            totals.finished_count,
+            totals.succeed_count,
+            totals.overload_count,
+            totals.failed_count,
+            totals.latency_sum,
+            totals.min_latency,
+        )
+
+    def _make_sample(
+        self,
+        finished_count: int,
+        succeed_count: int,
+        overload_count: int,
+        failed_count: int,
+        latency_sum: float,
+        min_latency: float,
+    ) -> WindowSample:
+        overload_rate = overload_count / finished_count if finished_count else 0.0
+        return WindowSample(
+            current_limit=self.workers_lock.initial_value,
+            finished_count=finished_count,
+            succeed_count=succeed_count,
+            overload_count=overload_count,
+            failed_count=failed_count,
+            running_count=self.current_running_count,
+            latency_sum=latency_sum,
+            min_latency=None if min_latency == math.inf else min_latency,
+            overloaded=overload_rate > self.adjust_overload_rate,
+            timestamp=asyncio.get_running_loop().time(),
+        )
 
     async def adjust_concurrency(self):
         """借鉴TCP的拥塞控制算法调整 workers 数量"""
-        if self.current_finished_count == 0:
+        with self._state_lock:
+            self._adjust_concurrency()
+
+    def _adjust_concurrency(self, sample: WindowSample | None = None) -> None:
+        if self._closed:
+            return
+        if sample is None:
+            sample = self.window_sample()
+        if sample.finished_count == 0:
             self.logger.debug(f"{self.log_prefix} -- 没有完成的任务，跳过调整")
             return
 
-        overload_rate = self.current_overload_count / self.current_finished_count
         self.logger.debug(
-            f"{self.log_prefix} -- 当前过载率: {overload_rate:.2%}, 调整阈值: {self.adjust_overload_rate:.2%}"
+            f"{self.log_prefix} -- 当前过载率: {sample.overload_rate:.2%}, 调整阈值: {self.adjust_overload_rate:.2%}"
         )
 
-        if overload_rate > self.adjust_overload_rate:
-            # 遇到过载时，乘以下降因子快速降低并发数
-            new_concurrency = max(
-                self.min_concurrency,
-                int(self.workers_lock.initial_value * self.decrease_factor),
-            )
-            self.increase_step = 1  # 重置增长步长
+        current_concurrency = self.workers_lock.initial_value
+        new_concurrency = max(
+            self.min_concurrency,
+            min(self.max_concurrency, int(self.controller.next_limit(sample))),
+        )
+        if sample.overloaded:
             self.logger.info(
                 f"{self.log_prefix} -- 检测到过载，降低并发数至 {new_concurrency}"
             )
-        else:
-            # 未过载时，采用渐进式增长
-            new_concurrency = min(
-                self.max_concurrency,
-                self.workers_lock.initial_value + self.increase_step,
-            )
-            self.increase_step = min(
-                self.increase_step * 2, 16
-            )  # 指数增长步长，但设置上限
+        elif new_concurrency != current_concurrency:
             self.logger.info(
-                f"{self.log_prefix} -- 系统运行正常，提升并发数从 {self.workers_lock.initial_value} 到 {new_concurrency}，下次增长步长: {self.increase_step}"
+                f"{self.log_prefix} -- 系统运行正常，调整并发数从 {current_concurrency} 到 {new_concurrency}"
             )
 
-        await self.workers_lock.set_value(new_concurrency)
+        if new_concurrency > current_concurrency:
+            self.metrics.limit_increase_total += 1
+        elif new_concurrency < current_concurrency:
+            self.metrics.limit_decrease_total += 1
+            if self.window_stats is not None:
+                self.window_stats.clear()
+        self._last_adjust_at = sample.timestamp
+        self._set_limit(new_concurrency)
+        if self.hooks:
+            self._fire(
+                "on_adjust",
+                AdjustEvent(self, current_concurrency, new_concurrency, sample),
+            )
 
-    def submit(self, coro: Coroutine):
-        if not self.workers_lock.initial_value:
+    def _record_window_outcome(
+        self, outcome: TaskOutcome, latency: float | None, now: float
+    ) -> None:
+        """把当前控制周期内获得名额的调用的结果计入本轮统计"""
+        self.current_finished_count += 1
+        if outcome == "succeed":
+            self.current_succeed_count += 1
+            if latency is not None:
+                self.current_latency_sum += latency
+                if latency < self.current_min_latency:
+                    self.current_min_latency = latency
+        elif outcome == "overload":
+            self.current_overload_count += 1
+        elif outcome == "failed":
+            self.current_failed_count += 1
+        if self.window_stats is not None and outcome != "cancelled":
+            self.window_stats.record(now, outcome, latency)
+
+    def _set_limit(self, value: int) -> None:
+        """修改并发上限，降低时开始新的控制周期"""
+        if value < self.workers_lock.initial_value:
+            self.control_epoch += 1
+        self.workers_lock.set_value_nowait(value)
+
+    def _control_step(self) -> None:
+        """定时检查：超过 control_interval 没有按轮调整时，根据滑动窗口内的统计调整并发上限"""
+        assert self.control_interval is not None
+        peak_running_count = self._peak_running_count
+        self._peak_running_count = self.current_running_count
+        if self.in_cooldown:
+            # 暂停与探测期间由探测结果决定何时恢复
+            return
+        sample = self.sliding_window_sample()
+        if sample.timestamp - self._last_adjust_at < self.control_interval:
+            return
+        if sample.finished_count == 0:
+            if (
+                peak_running_count == 0
+                and not self.workers_lock.waiting_count
+                and not self.pending_count
+            ):
+                self._decay_idle_limit(sample)
+            return
+        if not sample.overloaded and peak_running_count < sample.current_limit:
+            # 并发上限没有被用满，无法说明后端还能承受更高的并发
+            return
+        self._adjust_concurrency(sample)
+
+    def _decay_idle_limit(self, sample: WindowSample) -> None:
+        current_concurrency = self.workers_lock.initial_value
+        new_concurrency = max(
+            self.min_concurrency, int(current_concurrency * self.idle_decay)
+        )
+        if new_concurrency >= current_concurrency:
+            return
+        self.logger.debug(
+            f"{self.log_prefix} -- 空闲中，并发数从 {current_concurrency} 衰减到 {new_concurrency}"
+        )
+        self.metrics.limit_decrease_total += 1
+        self._set_limit(new_concurrency)
+        if self.hooks:
+            self._fire(
+                "on_adjust",
+                AdjustEvent(self, current_concurrency, new_concurrency, sample),
+            )
+
+    async def _control_loop(self) -> None:
+        assert self.control_interval is not None
+        while True:
+            await asyncio.sleep(self.control_interval)
+            try:
+                with self._state_lock:
+                    self._control_step()
+            except Exception:
+                self.logger.exception(f"{self.log_prefix} -- 定时调整并发数失败")
+
+    def _ensure_control_task(self) -> None:
+        if self.control_interval is None:
+            return
+        with self._state_lock:
+            task = self._control_task
+            if task is None or task.done() or task.get_loop().is_closed():
+                self._control_task = asyncio.create_task(self._control_loop())
+
+    def _stop_control_task(self) -> None:
+        """取消定时检查任务（不等待其结束），之后再提交调用时会重新创建"""
+        with self._state_lock:
+            task, self._control_task = self._control_task, None
+        if task is not None and not task.done() and not task.get_loop().is_closed():
+            task.cancel()
+
+    def add_hook(self, hook: LimiterHooks) -> None:
+        """注册一个插桩钩子"""
+        self.hooks = (*self.hooks, hook)
+
+    def _fire(self, method: str, event: Any) -> None:
+        fire_hooks(self.hooks, method, event, self.logger)
+
+    def _new_trace(self, priority: int, enqueued_at: float) -> TaskTrace | None:
+        if not self.hooks:
+            return None
+        trace = TaskTrace(self, priority, enqueued_at)
+        self._fire("on_enqueue", trace)
+        return trace
+
+    def _complete_trace(
+        self, trace: TaskTrace, outcome: TaskOutcome, error: BaseException | None
+    ) -> None:
+        trace.finished_at = asyncio.get_running_loop().time()
+        trace.outcome = outcome
+        trace.error = error
+        self._fire("on_complete", trace)
+
+    def stats(self) -> LimiterStats:
+        """当前状态与累计指标的快照"""
+        metrics = self.metrics
+        return LimiterStats(
+            current_limit=self.workers_lock.initial_value,
+            in_flight=self.current_running_count,
+            queue_depth=self.workers_lock.waiting_count + self.pending_count,
+            submitted_total=metrics.submitted_total,
+            succeed_total=metrics.succeed_total,
+            overload_total=metrics.overload_total,
+            failed_total=metrics.failed_total,
+            cancelled_total=metrics.cancelled_total,
+            rejected_total=metrics.rejected_total,
+            limit_increase_total=metrics.limit_increase_total,
+            limit_decrease_total=metrics.limit_decrease_total,
+            latency_p50=metrics.latency.quantile(0.5),
+            latency_p99=metrics.latency.quantile(0.99),
+            queue_wait_p50=metrics.queue_wait.quantile(0.5),
+            queue_wait_p99=metrics.queue_wait.quantile(0.99),
+        )
+
+    def _aimd_controller(self, attribute: str) -> AIMDController:
+        if not isinstance(self.controller, AIMDController):
+            raise AttributeError(
+                f"{self.log_prefix} -- {attribute} 只对 AIMD 算法有效，"
+                f"当前算法为 {type(self.controller).__name__}"
+            )
+        return self.controller
+
+    @property
+    def increase_step(self) -> int:
+        """AIMD 算法下一轮的增长步长，转发到 controller（其他算法时抛出 AttributeError）"""
+        return self._aimd_controller("increase_step").increase_step
+
+    @increase_step.setter
+    def increase_step(self, value: int) -> None:
+        self._aimd_controller("increase_step").increase_step = value
+
+    @property
+    def decrease_factor(self) -> float:
+        """AIMD 算法过载时的缩减比例，转发到 controller（其他算法时抛出 AttributeError）"""
+        return self._aimd_controller("decrease_factor").decrease_factor
+
+    @decrease_factor.setter
+    def decrease_factor(self, value: float) -> None:
+        self._aimd_controller("decrease_factor").decrease_factor = value
+
+    @property
+    def in_cooldown(self) -> bool:
+        """是否处于服务端要求的暂停或随后的探测阶段"""
+        return self._limit_before_cooldown is not None
+
+    @property
+    def cooldown_remaining(self) -> float:
+        """距离暂停结束的剩余秒数"""
+        if not self.in_cooldown:
+            return 0.0
+        return max(0.0, self._cooldown_until - asyncio.get_running_loop().time())
+
+    def _enter_cooldown(self, retry_after: float) -> None:
+        """收到服务端退避提示：暂停放行，并把并发数降到探测规模"""
+        deadline = asyncio.get_running_loop().time() + retry_after
+        if deadline <= self._cooldown_until:
+            return
+        self._cooldown_until = deadline
+        if self._limit_before_cooldown is None:
+            self._limit_before_cooldown = self.workers_lock.initial_value
+            probe_concurrency = max(
+                1, int(self._limit_before_cooldown * self.cooldown_probe_ratio)
+            )
+            self._set_limit(probe_concurrency)
+        self.logger.warning(
+            f"{self.log_prefix} -- 服务端要求退避 {retry_after:.2f} 秒，暂停放行新的调用，"
+            f"之后以 {self.workers_lock.initial_value} 的并发数探测"
+        )
+
+    def _exit_cooldown(self) -> None:
+        """探测调用成功，恢复到暂停前的并发数"""
+        if self._limit_before_cooldown is None:
+            return
+        limit, self._limit_before_cooldown = self._limit_before_cooldown, None
+        self.reset_counters()
+        if self.window_stats is not None:
+            self.window_stats.clear()
+        # 探测阶段放行的调用不计入恢复后的第一轮
+        self.control_epoch += 1
+        self._set_limit(limit)
+        self.logger.info(f"{self.log_prefix} -- 探测调用成功，恢复并发数至 {limit}")
+
+    async def _wait_for_cooldown(self) -> None:
+        loop = asyncio.get_running_loop()
+        while (remaining := self._cooldown_until - loop.time()) > 0:
+            await asyncio.sleep(remaining)
+        with self._state_lock:
+            # 暂停已结束：清零后之后的调用不必再进入这里
+            if self._cooldown_until <= loop.time():
+                self._cooldown_until = 0.0
+
+    @property
+    def circuit_state(self) -> CircuitState:
+        """熔断器状态，未启用熔断器时始终为 closed"""
+        if self.circuit_breaker is None:
+            return "closed"
+        return self.circuit_breaker.state
+
+    async def _pass_circuit_breaker(self) -> None:
+        """熔断器拒绝时最多等待 max_wait_seconds，仍被拒绝则抛出 CircuitOpenError"""
+        breaker = self.circuit_breaker
+        assert breaker is not None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + breaker.max_wait_seconds
+        while True:
+            with self._state_lock:
+                if breaker.allow_request():
+                    return
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise CircuitOpenError(
+                    f"{self.log_prefix} -- 熔断器处于 {breaker.state} 状态，拒绝调用",
+                    retry_after=breaker.retry_after,
+                )
+            # 半开状态下探测名额被占满时 retry_after 为 0，稍后再检查
+            await asyncio.sleep(min(remaining, max(breaker.retry_after, 0.01)))
+
+    def _record_circuit_outcome(self, record: Callable[[], None]) -> None:
+        breaker = self.circuit_breaker
+        assert breaker is not None
+        previous_state = breaker.state
+        record()
+        state = breaker.state
+        if state == previous_state:
+            return
+        if state == "open":
+            self.logger.warning(
+                f"{self.log_prefix} -- 熔断器打开，{breaker.open_seconds} 秒内拒绝新的调用"
+            )
+        elif state == "closed":
+            self.logger.info(f"{self.log_prefix} -- 探测调用成功，熔断器关闭")
+
+    async def _admit(self, coro: Coroutine, trace: TaskTrace | None) -> float:
+        """在等待名额之前等待暂停结束并通过熔断器检查，被拒绝或取消时关闭 coro 并结束 trace
+
+        熔断器打开时不必先排队等名额就能快速失败，等待暂停的调用也不会占着名额。
+        半开状态下放行会占用一个探测名额，之后 coro 没有执行就结束时要调用 _abandon_admitted 归还。
+
+        Returns:
+            通过检查的事件循环时间
+        """
+        try:
+            if self._cooldown_until:
+                await self._wait_for_cooldown()
+            if self.circuit_breaker is not None:
+                await self._pass_circuit_breaker()
+        except CircuitOpenError as e:
+            with self._state_lock:
+                self.metrics.rejected_total += 1
+            coro.close()
+            if trace is not None:
+                self._complete_trace(trace, "rejected", e)
+            raise
+        except BaseException as e:
+            coro.close()
+            if trace is not None:
+                self._complete_trace(trace, "cancelled", e)
+            raise
+        admitted_at = asyncio.get_running_loop().time()
+        if trace is not None:
+            trace.admitted_at = admitted_at
+        return admitted_at
+
+    def _try_admit(self) -> bool:
+        """_admit 的非阻塞版本：暂停中或熔断器拒绝时返回 False"""
+        if self._cooldown_until > asyncio.get_running_loop().time():
+            return False
+        if self.circuit_breaker is None:
+            return True
+        with self._state_lock:
+            return self.circuit_breaker.allow_request()
+
+    def _abandon_admitted(
+        self, coro: Coroutine, trace: TaskTrace | None, error: BaseException | None
+    ) -> None:
+        """已通过 _admit、但在开始执行前被取消的调用：归还探测名额，关闭 coro 并结束 trace"""
+        if self.circuit_breaker is not None:
+            with self._state_lock:
+                self._record_circuit_outcome(self.circuit_breaker.record_cancelled)
+        coro.close()
+        if trace is not None and trace.outcome is None:
+            self._complete_trace(trace, "cancelled", error)
+
+    async def _execute(
+        self, coro: Coroutine, admitted_at: float, trace: TaskTrace | None = None
+    ):
+        """在已通过 _admit 并持有 workers_lock 名额的情况下执行 coro 并统计结果
+
+        Args:
+            coro: 要执行的协程
+            admitted_at: 通过 _admit 的事件循环时间，用于统计排队等待名额的时间
+            trace: 注册了钩子时记录这次调用的时间线
+        """
+        loop = asyncio.get_running_loop()
+        acquired_at = loop.time()
+        with self._state_lock:
+            self.metrics.queue_wait.observe(acquired_at - admitted_at)
+        if trace is not None:
+            trace.acquired_at = acquired_at
+            self._fire("on_acquire", trace)
+        with self._state_lock:
+            self.current_running_count += 1
+            if self.current_running_count > self._peak_running_count:
+                self._peak_running_count = self.current_running_count
+            # 运行数已超过并发上限时开始执行，说明名额是在降低并发上限之前分到的，不计入本轮
+            epoch: int | None = (
+                self.control_epoch
+                if self.current_running_count <= self.workers_lock.initial_value
+                else None
+            )
+        start_time = loop.time()
+        if trace is not None:
+            trace.started_at = start_time
+        outcome: TaskOutcome = "succeed"
+        error: BaseException | None = None
+        latency: float | None = None
+        try:
+            result = await coro
+            with self._state_lock:
+                self.metrics.succeed_total += 1
+                if self.circuit_breaker is not None:
+                    self._record_circuit_outcome(self.circuit_breaker.record_success)
+                if self.in_cooldown and loop.time() >= self._cooldown_until:
+                    self._exit_cooldown()
+                latency = loop.time() - start_time
+                self.metrics.latency.observe(latency)
+            return result
+        except self.overload_exception as e:
+            outcome, error = "overload", e
+            with self._state_lock:
+                self.metrics.overload_total += 1
+                if self.circuit_breaker is not None:
+                    self._record_circuit_outcome(self.circuit_breaker.record_overload)
+                retry_after = getattr(e, "retry_after", None)
+                if self.global_cooldown and retry_after:
+                    self._enter_cooldown(retry_after)
+            self.logger.debug(
+                f"{self.log_prefix} -- "
+                f"服务过载，当前触发过载任务数: {self.current_overload_count + 1} "
+                f"任务状态 - 已完成: {self.current_finished_count}, "
+                f"成功数: {self.current_succeed_count}, "
+                f"运行中: {self.current_running_count}, "
+                f"过载数: {self.current_overload_count}, "
+                f"失败数: {self.current_failed_count}, "
+                f"当前并发度: {self.workers_lock.get_value()}, "
+                f"基准并发度: {self.workers_lock.initial_value}",
+            )
+            raise
+        except Exception as e:
+            outcome, error = "failed", e
+            with self._state_lock:
+                self.metrics.failed_total += 1
+                if self.circuit_breaker is not None:
+                    self._record_circuit_outcome(self.circuit_breaker.record_failure)
+            raise
+        except asyncio.CancelledError as e:
+            outcome, error = "cancelled", e
+            with self._state_lock:
+                self.metrics.cancelled_total += 1
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_cancelled()
+            raise
+        finally:
+            with self._state_lock:
+                self.current_running_count -= 1
+                if epoch == self.control_epoch:
+                    self._record_window_outcome(outcome, latency, loop.time())
+                self.logger.debug(
+                    f"{self.log_prefix} -- "
+                    f"任务状态 - 已完成: {self.current_finished_count}, "
+                    f"成功数: {self.current_succeed_count}, "
+                    f"运行中: {self.current_running_count}, "
+                    f"过载数: {self.current_overload_count}, "
+                    f"失败数: {self.current_failed_count}, "
+                    f"当前并发度: {self.workers_lock.get_value()}, "
+                    f"基准并发度: {self.workers_lock.initial_value}"
+                )
+                if self.in_cooldown:
+                    # 暂停与探测期间由探测结果决定何时恢复，不做常规调整
+                    self.reset_counters()
+
+                if self.current_finished_count > self.workers_lock.initial_value:
+                    self._adjust_concurrency()
+                    self.reset_counters()
+            if trace is not None:
+                self._complete_trace(trace, outcome, error)
+
+    def submit(self, coro: Coroutine, priority: int = 0):
+        """提交 coro，获得名额后执行
+
+        Args:
+            coro: 要执行的协程
+            priority: 优先级，数值越小越先获得名额
+        """
+        if self._closed:
             raise RuntimeError("并发限制器已关闭")
+        self._ensure_control_task()
+        with self._state_lock:
+            self.metrics.submitted_total += 1
+        enqueued_at = asyncio.get_running_loop().time()
+        trace = self._new_trace(priority, enqueued_at)
 
         async def _task_wrapper():
-            async with self.workers_lock:
-                self.current_running_count += 1
-                try:
-                    result = await coro
-                    self.current_succeed_count += 1
-                    return result
-                except self.overload_exception:
-                    self.current_overload_count += 1
-                    self.logger.debug(
-                        f"{self.log_prefix} -- "
-                        f"服务过载，当前触发过载任务数: {self.current_overload_count} "
-                        f"任务状态 - 已完成: {self.current_finished_count}, "
-                        f"成功数: {self.current_succeed_count}, "
-                        f"运行中: {self.current_running_count}, "
-                        f"过载数: {self.current_overload_count}, "
-                        f"失败数: {self.current_failed_count}, "
-                        f"当前并发度: {self.workers_lock.get_value()}, "
-                        f"基准并发度: {self.workers_lock.initial_value}",
-                    )
-                    raise
-                except Exception:
-                    self.current_failed_count += 1
-                    raise
-                finally:
-                    self.current_finished_count += 1
-                    self.current_running_count -= 1
-                    self.logger.debug(
-                        f"{self.log_prefix} -- "
-                        f"任务状态 - 已完成: {self.current_finished_count}, "
-                        f"成功数: {self.current_succeed_count}, "
-                        f"运行中: {self.current_running_count}, "
-                        f"过载数: {self.current_overload_count}, "
-                        f"失败数: {self.current_failed_count}, "
-                        f"当前并发度: {self.workers_lock.get_value()}, "
-                        f"基准并发度: {self.workers_lock.initial_value}"
-                    )
-                    if self.workers_lock.get_value() < 0:
-                        self.reset_counters()
+            admitted_at = await self._admit(coro, trace)
+            acquired = False
+            try:
+                async with self.workers_lock.prioritized(priority):
+                    acquired = True
+                    return await self._execute(coro, admitted_at, trace)
+            except asyncio.CancelledError as e:
+                if not acquired:
+                    # 等待名额期间被取消时 coro 从未执行，_execute 也没有机会结束 trace
+                    self._abandon_admitted(coro, trace, e)
+                raise
+
+        return self._track(asyncio.create_task(_task_wrapper()))
+
+    def try_submit(self, coro: Coroutine, priority: int = 0) -> asyncio.Task | None:
+        """有空闲名额时立即提交 coro，否则不提交并返回 None（coro 仍归调用方所有）
+
+        不会排队，也不会抢在排队中的调用前面，适合只应使用空闲并发的调用（例如对冲请求）。
+
+        Args:
+            coro: 要执行的协程
+            priority: 优先级，只用于插桩钩子
+        """
+        if self._closed:
+            raise RuntimeError("并发限制器已关闭")
+        if not self.workers_lock.try_acquire():
+            return None
+        if not self._try_admit():
+            self.workers_lock.release()
+            return None
+        self._ensure_control_task()
+        with self._state_lock:
+            self.metrics.submitted_total += 1
+        enqueued_at = asyncio.get_running_loop().time()
+        trace = self._new_trace(priority, enqueued_at)
+        if trace is not None:
+            trace.admitted_at = enqueued_at
+        started = False
+
+        async def _run():
+            nonlocal started
+            started = True
+            return await self._execute(coro, enqueued_at, trace)
 
-                    if self.current_finished_count > self.workers_lock.initial_value:
-                        await self.adjust_concurrency()
-                        self.reset_counters()
+        task = asyncio.create_task(_run())
 
+        def _release(task: asyncio.Task) -> None:
+            # 在 Task 开始执行前就被取消时 _execute 不会运行，名额在这里归还
+            if not started:
+                self._abandon_admitted(coro, trace, None)
+            self.workers_lock.release()
+
+        task.add_done_callback(_release)
+        return self._track(task)
+
+    def _track(self, task: asyncio.Task) -> asyncio.Task:
         def _on_done(task):
             # self.finished_tasks.put_nowait(task)
             self.submitted_tasks.remove(task)
 
-        task = asyncio.create_task(_task_wrapper())
         task.add_done_callback(_on_done)
         self.submitted_tasks.add(task)
         return task
 
+    @property
+    def pending_count(self) -> int:
+        """通过 asubmit 提交、尚未获得名额的任务数"""
+        return sum(len(queue) for queue in self._pending.values())
+
+    async def asubmit(self, coro: Coroutine, priority: int = 0) -> asyncio.Future:
+        """可等待的提交方式，用于有界的提交队列
+
+        未设置 max_pending 时等价于 submit。
+        设置了 max_pending 时，coro 先进入有界的等待队列，队列已满时挂起调用方（背压）；
+        只有在即将获得名额时才会为 coro 创建 Task，
+        因此即使提交海量任务，Task 数量也只与并发上限相关。
+        同一优先级内先进先出；不同优先级之间与 submit 相同，由 workers_lock 按权重公平地分配名额，
+        低优先级的调用不会被源源不断的高优先级调用饿死。
+
+        Returns:
+            任务结果的 Future
+        """
+        if self._closed:
+            raise RuntimeError("并发限制器已关闭")
+        if self.max_pending is None:
+            return self.submit(coro, priority=priority)
+        self._ensure_control_task()
+
+        if self._pending_slots is None:
+            self._pending_slots = asyncio.Semaphore(self.max_pending)
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        with self._state_lock:
+            self.metrics.submitted_total += 1
+        enqueued_at = loop.time()
+        trace = self._new_trace(priority, enqueued_at)
+        try:
+            await self._pending_slots.acquire()
+        except asyncio.CancelledError as e:
+            coro.close()
+            if trace is not None:
+                self._complete_trace(trace, "cancelled", e)
+            raise
+        queue = self._pending.get(priority)
+        if queue is None:
+            queue = self._pending[priority] = deque()
+        queue.append((coro, future, enqueued_at, trace))
+        if priority not in self._dispatchers:
+            self._dispatchers[priority] = asyncio.create_task(
+                self._dispatch_pending(priority)
+            )
+        return future
+
+    async def _dispatch_pending(self, priority: int):
+        """按先进先出取出一个优先级的等待任务，获得名额后再创建 Task 执行
+
+        每个优先级只有一个分发任务在 workers_lock 上等待名额，
+        因此优先级之间的先后由 workers_lock 的加权公平调度决定。
+        """
+        queue = self._pending[priority]
+        slots = self._pending_slots
+        assert slots is not None
+        try:
+            while queue:
+                coro, future, _, trace = queue[0]
+                if future.cancelled():
+                    self._drop_pending(queue.popleft())
+                    slots.release()
+                    continue
+                try:
+                    admitted_at = await self._admit(coro, trace)
+                except CircuitOpenError as e:
+                    queue.popleft()
+                    slots.release()
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+                except asyncio.CancelledError:
+                    queue.popleft()
+                    slots.release()
+                    future.cancel()
+                    raise
+                try:
+                    await self.workers_lock.acquire(priority)
+                except asyncio.CancelledError as e:
+                    queue.popleft()
+                    slots.release()
+                    self._abandon_admitted(coro, trace, e)
+                    future.cancel()
+                    raise
+                queue.popleft()
+                slots.release()
+                if future.cancelled():
+                    # 等待期间任务已被取消
+                    self.workers_lock.release()
+                    self._abandon_admitted(coro, trace, None)
+                    continue
+                task = self._track(
+                    asyncio.create_task(
+                        self._execute_and_release(coro, admitted_at, trace)
+                    )
+                )
+                _chain_future(task, future)
+        finally:
+            # 队列已空：之后 asubmit 到这个优先级时重新创建分发任务
+            del self._pending[priority]
+            del self._dispatchers[priority]
+
+    def _drop_pending(
+        self, item: tuple[Coroutine, asyncio.Future, float, TaskTrace | None]
+    ) -> None:
+        coro, _, _, trace = item
+        coro.close()
+        if trace is not None:
+            self._complete_trace(trace, "cancelled", None)
+
+    async def _execute_and_release(
+        self, coro: Coroutine, admitted_at: float, trace: TaskTrace | None
+    ):
+        try:
+            return await self._execute(coro, admitted_at, trace)
+        finally:
+            self.workers_lock.release()
+
+    async def map(
+        self,
+        func: Callable[[T], Coroutine[Any, Any, R]],
+        items: AsyncIterable[T] | Iterable[T],
+        ordered: bool = True,
+        max_buffer: int | None = None,
+        return_exceptions: bool = False,
+        max_retries: int = 1024,
+        retry_interval_seconds: float = 1,
+        backoff: BackoffName | BackoffPolicy = "constant",
+        max_retry_interval_seconds: float = 60,
+        priority: int = 0,
+    ) -> AsyncIterator[R]:
+        """以流式方式把 func 应用到 items 上，按完成情况逐个产出结果
+
+        输入是惰性拉取的：在途调用数达到当前并发上限时不再读取新的输入，
+        因此无论输入流有多长，内存占用都只与并发上限相关。
+        触发过载异常的调用会像 with_adaptive_retry 一样自动重试。
+
+        Args:
+            func: 对单个输入调用的异步函数
+            items: 输入，可以是异步可迭代对象（数据库游标、消息队列消费者等）或普通可迭代对象
+            ordered: 是否按输入顺序产出结果；为 False 时按完成顺序产出
+            max_buffer: ordered=True 时，在途调用与重排缓冲区中结果的总数上限，
+                默认为当前并发上限的两倍
+            return_exceptions: 为 True 时把异常作为结果产出，否则直接抛出并取消其余在途调用
+            max_retries: 过载时的最大重试次数
+            retry_interval_seconds: 过载重试间隔时间（秒）
+            backoff: 重试等待时间策略，含义与 with_adaptive_retry 的同名参数一致
+            max_retry_interval_seconds: 退避策略的最长等待时间（秒）
+            priority: 这批调用的优先级，数值越小越先获得名额
+
+        Yields:
+            func 的返回值（或 return_exceptions=True 时的异常）
+        """
+        from .with_adaptive_retry import with_adaptive_retry
+
+        call = with_adaptive_retry(
+            scheduler=self,
+            max_retries=max_retries,
+            retry_interval_seconds=retry_interval_seconds,
+            backoff=backoff,
+            max_retry_interval_seconds=max_retry_interval_seconds,
+            priority=priority,
+        )(func)
+
+        async def _aiter(items: AsyncIterable[T] | Iterable[T]) -> AsyncIterator[T]:
+            if isinstance(items, AsyncIterable):
+                async for item in items:
+                    yield item
+            else:
+                for item in items:
+                    yield item
+
+        iterator = _aiter(items)
+        in_flight: dict[asyncio.Future, int] = {}
+        reorder_buffer: dict[int, Any] = {}
+        next_index = 0
+        submitted_count = 0
+        exhausted = False
+        try:
+            while True:
+                window = max(1, self.workers_lock.initial_value)
+                buffer_limit = max_buffer or 2 * window
+                while (
+                    not exhausted
+                    and len(in_flight) < window
+                    and (
+                        not ordered
+                        or len(in_flight) + len(reorder_buffer) < buffer_limit
+                    )
+                ):
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    in_flight[asyncio.ensure_future(call(item))] = submitted_count
+                    submitted_count += 1
+
+                if not in_flight:
+                    break
+
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    index = in_flight.pop(future)
+                    if return_exceptions and future.exception() is not None:
+                        result = future.exception()
+                    else:
+                        result = future.result()
+                    if ordered:
+                        reorder_buffer[index] = result
+                    else:
+                        yield result
+
+                while next_index in reorder_buffer:
+                    yield reorder_buffer.pop(next_index)
+                    next_index += 1
+        finally:
+            for future in in_flight:
+                future.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+            await iterator.aclose()
+
+    def map_unordered(
+        self,
+        func: Callable[[T], Coroutine[Any, Any, R]],
+        items: AsyncIterable[T] | Iterable[T],
+        **kwargs: Any,
+    ) -> AsyncIterator[R]:
+        """等价于 map(func, items, ordered=False)，按完成顺序产出结果"""
+        return self.map(func, items, ordered=False, **kwargs)
+
     async def shutdown(self):
         """关闭并发限制器，等待所有任务完成"""
+        while self._dispatchers:
+            # 等待 asubmit 的等待队列全部分发完
+            await asyncio.gather(*self._dispatchers.values(), return_exceptions=True)
+        if self._control_task is not None:
+            self._control_task.cancel()
+            await asyncio.gather(self._control_task, return_exceptions=True)
+            self._control_task = None
+        self._closed = True
         await self.workers_lock.set_value(0)
         if self.submitted_tasks:
             await asyncio.gather(*self.submitted_tasks, return_exceptions=True)
         self.submitted_tasks.clear()
+
+
+def _chain_future(task: asyncio.Task, future: asyncio.Future) -> None:
+    """把 task 的结果转交给 future，future 被取消时同时取消 task"""
+
+    def _copy_result(task: asyncio.Task) -> None:
+        if future.done():
+            return
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())  # type: ignore[arg-type]
+        else:
+            future.set_result(task.result())
+
+    def _cancel_task(future: asyncio.Future) -> None:
+        if future.cancelled():
+            task.cancel()
+
+    task.add_done_callback(_copy_result)
+    future.add_done_callback(_cancel_task)
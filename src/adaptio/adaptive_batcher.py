@@ -0,0 +1,325 @@
+import asyncio
+from collections import deque
+from collections.abc import Callable, Coroutine, Sequence
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Generic, TypeVar
+
+from .adaptive_async_concurrency_limiter import (
+    AdaptiveAsyncConcurrencyLimiter,
+    ServiceOverloadError,
+)
+from .congestion_control import (
+    ConcurrencyController,
+    ControllerName,
+    WindowSample,
+    create_controller,
+)
+from .log_utils import setup_colored_logger
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+BatchFunc = Callable[[list[T]], Coroutine[Any, Any, Sequence[R | BaseException]]]
+
+
+@dataclass
+class _PendingItem(Generic[T, R]):
+    item: T
+    future: asyncio.Future[R]
+    retries: int = 0
+
+
+class AdaptiveBatcher(Generic[T, R]):
+    """自适应微批处理器，把单个调用攒成批次调用支持批量接口的后端。
+
+    - 队列中的调用数达到 batch_size 时立即发出一批，否则最多等待 max_linger_seconds
+    - 批次通过 AdaptiveAsyncConcurrencyLimiter 提交，批次并发数照常自适应
+    - 每个批次完成后把统计样本交给并发度控制算法（默认 AIMD）调整 batch_size：
+      正常时逐步增大，过载时快速缩小
+    - 每个调用方拿到自己那一项的结果或异常
+
+    batch_func 接收一个列表，返回等长的结果序列。结果序列中的某一项可以是异常实例，
+    表示只有这一项失败；如果是 overload_exception 的实例，则只有这一项会被重新排队重试。
+    batch_func 整体抛出 overload_exception 时整批重试，抛出其他异常时整批失败。
+
+    Args:
+        batch_func: 批量调用的异步函数
+        max_batch_size: 最大批次大小
+        min_batch_size: 最小批次大小
+        initial_batch_size: 初始批次大小
+        max_linger_seconds: 凑批的最长等待时间（秒）
+        adjust_overload_rate: 触发批次大小调整的过载率阈值
+            意思是在一个批次中，若过载的项目数量超过这个比例，才会缩小批次
+        overload_exception: 用于标识过载的异常类型
+        controller: 调整批次大小的控制算法，与 AdaptiveAsyncConcurrencyLimiter 的同名参数一致
+        scheduler: 提交批次使用的 AdaptiveAsyncConcurrencyLimiter，为 None 时创建一个默认实例
+        max_retries: 单个项目因过载的最大重试次数
+        retry_interval_seconds: 过载重试间隔时间（秒）
+        log_level: 日志级别
+        log_prefix: 日志前缀
+    """
+
+    def __init__(
+        self,
+        batch_func: BatchFunc[T, R],
+        max_batch_size: int = 256,
+        min_batch_size: int = 1,
+        initial_batch_size: int = 8,
+        max_linger_seconds: float = 0.01,
+        adjust_overload_rate: float = 0.1,
+        overload_exception: type[BaseException] = ServiceOverloadError,
+        controller: ControllerName | ConcurrencyController = "aimd",
+        scheduler: AdaptiveAsyncConcurrencyLimiter | None = None,
+        max_retries: int = 1024,
+        retry_interval_seconds: float = 1,
+        log_level: str = "INFO",
+        log_prefix: str = "",
+    ):
+        if initial_batch_size < min_batch_size:
+            raise ValueError(
+                f"{log_prefix} -- {initial_batch_size=} 不能小于 {min_batch_size=}"
+            )
+        if initial_batch_size > max_batch_size:
+            raise ValueError(
+                f"{log_prefix} -- {initial_batch_size=} 不能大于 {max_batch_size=}"
+            )
+        if min_batch_size < 1:
+            raise ValueError(f"{log_prefix} -- {min_batch_size=} 不能小于 1")
+
+        self.batch_func = batch_func
+        self.max_batch_size = max_batch_size
+        self.min_batch_size = min_batch_size
+        self.batch_size = initial_batch_size
+        self.max_linger_seconds = max_linger_seconds
+        self.adjust_overload_rate = adjust_overload_rate
+        self.overload_exception = overload_exception
+        self.controller = (
+            create_controller(controller) if isinstance(controller, str) else controller
+        )
+        self.scheduler = scheduler or AdaptiveAsyncConcurrencyLimiter(
+            overload_exception=overload_exception,
+            log_level=log_level,
+            log_prefix=log_prefix,
+        )
+        self.max_retries = max_retries
+        self.retry_interval_seconds = retry_interval_seconds
+        self.log_prefix = log_prefix
+
+        self.logger = setup_colored_logger(
+            logger_name=f"batcher_{id(self)}",
+            log_level=log_level,
+        )
+
+        self._queue: deque[_PendingItem[T, R]] = deque()
+        self._linger_timer: asyncio.TimerHandle | None = None
+        self._retry_tasks: set[asyncio.Task] = set()
+        self.running_batches: set[asyncio.Task] = set()
+
+    @property
+    def pending_count(self) -> int:
+        """排队等待凑批的调用数"""
+        return len(self._queue)
+
+    async def submit(self, item: T) -> R:
+        """提交单个调用并等待它所在批次中对应的结果"""
+        future: asyncio.Future[R] = asyncio.get_running_loop().create_future()
+        self._queue.append(_PendingItem(item, future))
+        self._schedule_flush()
+        return await future
+
+    def _schedule_flush(self) -> None:
+        while len(self._queue) >= self.batch_size:
+            self._start_batch()
+        if self._queue and self._linger_timer is None:
+            self._linger_timer = asyncio.get_running_loop().call_later(
+                self.max_linger_seconds, self._on_linger_timeout
+            )
+        elif not self._queue and self._linger_timer is not None:
+            self._linger_timer.cancel()
+            self._linger_timer = None
+
+    def _on_linger_timeout(self) -> None:
+        self._linger_timer = None
+        if self._queue:
+            self._start_batch()
+        self._schedule_flush()
+
+    def _start_batch(self) -> None:
+        batch: list[_PendingItem[T, R]] = []
+        while self._queue and len(batch) < self.batch_size:
+            pending = self._queue.popleft()
+            if not pending.future.done():
+                batch.append(pending)
+        if not batch:
+            return
+        task = asyncio.create_task(self._run_batch(batch))
+        self.running_batches.add(task)
+        task.add_done_callback(self.running_batches.discard)
+
+    async def _run_batch(self, batch: list[_PendingItem[T, R]]) -> None:
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        overloaded_items: list[_PendingItem[T, R]] = []
+        failed_count = 0
+        try:
+            results = await self.scheduler.submit(
+                self.batch_func([pending.item for pending in batch])
+            )
+        except self.overload_exception as e:
+            overloaded_items = batch
+            self._retry(overloaded_items, e)
+        except Exception as e:
+            failed_count = len(batch)
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+        else:
+            if len(results) != len(batch):
+                error = ValueError(
+                    f"{self.log_prefix} -- 批量函数返回了 {len(results)} 个结果，但批次大小为 {len(batch)}"
+                )
+                failed_count = len(batch)
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(error)
+            else:
+                last_overload: BaseException | None = None
+                for pending, result in zip(batch, results, strict=True):
+                    if isinstance(result, self.overload_exception):
+                        overloaded_items.append(pending)
+                        last_overload = result
+                    elif isinstance(result, BaseException):
+                        failed_count += 1
+                        if not pending.future.done():
+                            pending.future.set_exception(result)
+                    elif not pending.future.done():
+                        pending.future.set_result(result)  # type: ignore[arg-type]
+                if last_overload is not None:
+                    self._retry(overloaded_items, last_overload)
+
+        self._adjust_batch_size(
+            batch_len=len(batch),
+            overload_count=len(overloaded_items),
+            failed_count=failed_count,
+            latency=loop.time() - start_time,
+        )
+
+    def _retry(self, items: list[_PendingItem[T, R]], error: BaseException) -> None:
+        """只把过载的项目重新排队，超过重试次数的项目直接失败"""
+        retry_items = []
+        for pending in items:
+            pending.retries += 1
+            if pending.retries > self.max_retries:
+                self.logger.error(
+                    f"{self.log_prefix} -- 重试次数已达上限({pending.retries}次)，服务仍处于过载状态"
+                )
+                if not pending.future.done():
+                    pending.future.set_exception(error)
+            else:
+                retry_items.append(pending)
+        if not retry_items:
+            return
+        task = asyncio.create_task(self._requeue_later(retry_items))
+        self._retry_tasks.add(task)
+        task.add_done_callback(self._retry_tasks.discard)
+
+    async def _requeue_later(self, items: list[_PendingItem[T, R]]) -> None:
+        await asyncio.sleep(self.retry_interval_seconds)
+        # 重试的项目排在队首，优先进入下一批
+        self._queue.extendleft(reversed(items))
+        self._schedule_flush()
+
+    def _adjust_batch_size(
+        self, batch_len: int, overload_count: int, failed_count: int, latency: float
+    ) -> None:
+        sample = WindowSample(
+            current_limit=self.batch_size,
+            finished_count=batch_len,
+            succeed_count=batch_len - overload_count - failed_count,
+            overload_count=overload_count,
+            failed_count=failed_count,
+            running_count=len(self.running_batches),
+            latency_sum=latency * (batch_len - overload_count - failed_count),
+            min_latency=latency,
+            overloaded=overload_count / batch_len > self.adjust_overload_rate,
+            timestamp=asyncio.get_running_loop().time(),
+        )
+        new_batch_size = max(
+            self.min_batch_size,
+            min(self.max_batch_size, int(self.controller.next_limit(sample))),
+        )
+        if new_batch_size != self.batch_size:
+            self.logger.debug(
+                f"{self.log_prefix} -- 调整批次大小从 {self.batch_size} 到 {new_batch_size}"
+            )
+        self.batch_size = new_batch_size
+
+    async def flush(self) -> None:
+        """立即发出队列中的所有调用并等待正在执行的批次完成"""
+        while self._queue:
+            self._start_batch()
+        if self.running_batches:
+            await asyncio.gather(*self.running_batches, return_exceptions=True)
+
+    async def shutdown(self) -> None:
+        """发出剩余调用、等待所有批次和重试完成"""
+        while self._queue or self.running_batches or self._retry_tasks:
+            await self.flush()
+            if self._retry_tasks:
+                await asyncio.gather(*self._retry_tasks, return_exceptions=True)
+        if self._linger_timer is not None:
+            self._linger_timer.cancel()
+            self._linger_timer = None
+
+
+def with_adaptive_batching(
+    max_batch_size: int = 256,
+    min_batch_size: int = 1,
+    initial_batch_size: int = 8,
+    max_linger_seconds: float = 0.01,
+    adjust_overload_rate: float = 0.1,
+    overload_exception: type[BaseException] = ServiceOverloadError,
+    controller: ControllerName | ConcurrencyController = "aimd",
+    scheduler: AdaptiveAsyncConcurrencyLimiter | None = None,
+    max_retries: int = 1024,
+    retry_interval_seconds: float = 1,
+    log_level: str = "INFO",
+    log_prefix: str = "",
+) -> Callable[[BatchFunc[T, R]], Callable[[T], Coroutine[Any, Any, R]]]:
+    """装饰器：把批量异步函数变成可以逐个调用的函数，调用会被自动攒批。
+
+    参数含义见 AdaptiveBatcher。装饰后的函数带有 batcher 属性，
+    可用于查看当前批次大小或在退出前调用 batcher.shutdown()。
+
+    Returns:
+        装饰后的异步函数，接收单个项目并返回该项目的结果
+    """
+
+    def decorator(
+        batch_func: BatchFunc[T, R],
+    ) -> Callable[[T], Coroutine[Any, Any, R]]:
+        batcher: AdaptiveBatcher[T, R] = AdaptiveBatcher(
+            batch_func,
+            max_batch_size=max_batch_size,
+            min_batch_size=min_batch_size,
+            initial_batch_size=initial_batch_size,
+            max_linger_seconds=max_linger_seconds,
+            adjust_overload_rate=adjust_overload_rate,
+            overload_exception=overload_exception,
+            controller=controller,
+            scheduler=scheduler,
+            max_retries=max_retries,
+            retry_interval_seconds=retry_interval_seconds,
+            log_level=log_level,
+            log_prefix=log_prefix or getattr(batch_func, "__name__", "unnamed"),
+        )
+
+        @wraps(batch_func)
+        async def wrapper(item: T) -> R:
+            return await batcher.submit(item)
+
+        wrapper.batcher = batcher  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
@@ -0,0 +1,223 @@
+import asyncio
+import math
+from collections.abc import Coroutine
+
+from .adaptive_async_concurrency_limiter import ServiceOverloadError
+from .congestion_control import (
+    AIMDController,
+    ConcurrencyController,
+    ControllerName,
+    WindowSample,
+    create_controller,
+)
+from .log_utils import setup_colored_logger
+from .token_bucket import TokenBucket
+
+
+class AdaptiveRateLimiter:
+    """自适应速率（QPS）限制器，用于按每秒请求数限流的上游服务。
+
+    与 AdaptiveAsyncConcurrencyLimiter 使用同样的过载信号（overload_exception），
+    但调整的是令牌桶（TokenBucket）的补充速率而不是并发数。
+    调整算法与并发限制器共用 ConcurrencyController：样本中的 current_limit 是取整后的当前 QPS，
+    返回值被截断到 [min_qps, max_qps] 后作为新的 QPS。默认的 AIMD 算法：
+    - 当系统正常运行时，逐步提高 QPS（步长 1, 2, 4, ... 直到 16）
+    - 当检测到过载时，乘以下降因子快速降低 QPS
+
+    每完成约一秒的调用量（完成数超过当前 QPS）调整一次。
+    它可以直接作为 with_adaptive_retry 的 scheduler 使用，
+    也可以和 AdaptiveAsyncConcurrencyLimiter 一起传入，同时限制速率和并发。
+
+    Args:
+        max_qps: 最大允许的 QPS
+        min_qps: 最小允许的 QPS
+        initial_qps: 初始 QPS
+        max_burst: 令牌桶容量，即空闲后允许的最大突发请求数
+        adjust_overload_rate: 触发速率调整的过载率阈值
+            意思是在最近一轮调用中，若触发过载错误的调用数量超过这个比例，才会进行降低 QPS 操作
+        overload_exception: 用于标识过载的异常类型
+        controller: 速率控制算法，可以是内置算法的名称或实现了
+            ConcurrencyController 协议的对象，含义与 AdaptiveAsyncConcurrencyLimiter 的同名参数一致
+        log_level: 日志级别
+        log_prefix: 日志前缀
+    """
+
+    def __init__(
+        self,
+        max_qps: float = 1000,
+        min_qps: float = 1,
+        initial_qps: float = 1,
+        max_burst: float = 1,
+        adjust_overload_rate: float = 0.1,
+        overload_exception: type[BaseException] = ServiceOverloadError,
+        controller: ControllerName | ConcurrencyController = "aimd",
+        log_level: str = "INFO",
+        log_prefix: str = "",
+    ):
+        if min_qps <= 0:
+            raise ValueError(f"{log_prefix} -- {min_qps=} 必须为正数")
+        if initial_qps < min_qps:
+            raise ValueError(f"{log_prefix} -- {initial_qps=} 不能小于 {min_qps=}")
+        if initial_qps > max_qps:
+            raise ValueError(f"{log_prefix} -- {initial_qps=} 不能大于 {max_qps=}")
+
+        self.max_qps = max_qps
+        self.min_qps = min_qps
+        self.adjust_overload_rate = adjust_overload_rate
+        self.overload_exception = overload_exception
+        self.controller = (
+            create_controller(controller) if isinstance(controller, str) else controller
+        )
+        self.log_prefix = log_prefix
+
+        self.logger = setup_colored_logger(
+            logger_name=f"rate_scheduler_{id(self)}",
+            log_level=log_level,
+        )
+
+        self.submitted_tasks: set[asyncio.Future] = set()
+
+        self.current_failed_count = 0
+        self.current_overload_count = 0
+        self.current_succeed_count = 0
+        self.current_finished_count = 0
+        self.current_running_count = 0
+        self.current_latency_sum = 0.0
+        self.current_min_latency = math.inf
+
+        self.token_bucket = TokenBucket(initial_qps, capacity=max_burst)
+        self._closed = False
+
+    @property
+    def current_qps(self) -> float:
+        return self.token_bucket.rate
+
+    def _aimd_controller(self, attribute: str) -> AIMDController:
+        if not isinstance(self.controller, AIMDController):
+            raise AttributeError(
+                f"{self.log_prefix} -- {attribute} 只对 AIMD 算法有效，"
+                f"当前算法为 {type(self.controller).__name__}"
+            )
+        return self.controller
+
+    @property
+    def increase_step(self) -> int:
+        """AIMD 算法下一轮的增长步长，转发到 controller（其他算法时抛出 AttributeError）"""
+        return self._aimd_controller("increase_step").increase_step
+
+    @increase_step.setter
+    def increase_step(self, value: int) -> None:
+        self._aimd_controller("increase_step").increase_step = value
+
+    @property
+    def decrease_factor(self) -> float:
+        """AIMD 算法过载时的缩减比例，转发到 controller（其他算法时抛出 AttributeError）"""
+        return self._aimd_controller("decrease_factor").decrease_factor
+
+    @decrease_factor.setter
+    def decrease_factor(self, value: float) -> None:
+        self._aimd_controller("decrease_factor").decrease_factor = value
+
+    def reset_counters(self):
+        self.current_failed_count = 0
+        self.current_overload_count = 0
+        self.current_succeed_count = 0
+        self.current_finished_count = 0
+        self.current_latency_sum = 0.0
+        self.current_min_latency = math.inf
+
+    def window_sample(self) -> WindowSample:
+        """生成最近一轮调用的统计样本，current_limit 为取整后的当前 QPS"""
+        finished_count = self.current_finished_count
+        overload_rate = (
+            self.current_overload_count / finished_count if finished_count else 0.0
+        )
+        return WindowSample(
+            current_limit=round(self.current_qps),
+            finished_count=finished_count,
+            succeed_count=self.current_succeed_count,
+            overload_count=self.current_overload_count,
+            failed_count=self.current_failed_count,
+            running_count=self.current_running_count,
+            latency_sum=self.current_latency_sum,
+            min_latency=None
+            if self.current_min_latency == math.inf
+            else self.current_min_latency,
+            overloaded=overload_rate > self.adjust_overload_rate,
+            timestamp=asyncio.get_running_loop().time(),
+        )
+
+    def adjust_rate(self):
+        """根据最近一轮调用的统计，由 controller 调整令牌桶的补充速率"""
+        if self.current_finished_count == 0:
+            self.logger.debug(f"{self.log_prefix} -- 没有完成的任务，跳过调整")
+            return
+
+        sample = self.window_sample()
+        self.logger.debug(
+            f"{self.log_prefix} -- 当前过载率: {sample.overload_rate:.2%}, 调整阈值: {self.adjust_overload_rate:.2%}"
+        )
+
+        current_qps = self.current_qps
+        new_qps = max(
+            self.min_qps, min(self.max_qps, float(self.controller.next_limit(sample)))
+        )
+        if sample.overloaded:
+            self.logger.info(
+                f"{self.log_prefix} -- 检测到过载，降低 QPS 至 {new_qps:.2f}"
+            )
+        elif new_qps != current_qps:
+            self.logger.info(
+                f"{self.log_prefix} -- 系统运行正常，调整 QPS 从 {current_qps:.2f} 到 {new_qps:.2f}"
+            )
+
+        self.token_bucket.set_rate(new_qps)
+
+    def submit(self, coro: Coroutine):
+        if self._closed:
+            raise RuntimeError("速率限制器已关闭")
+
+        async def _task_wrapper():
+            try:
+                await self.token_bucket.acquire()
+            except asyncio.CancelledError:
+                coro.close()
+                raise
+            loop = asyncio.get_running_loop()
+            start_time = loop.time()
+            self.current_running_count += 1
+            try:
+                result = await coro
+                self.current_succeed_count += 1
+                latency = loop.time() - start_time
+                self.current_latency_sum += latency
+                if latency < self.current_min_latency:
+                    self.current_min_latency = latency
+                return result
+            except self.overload_exception:
+                self.current_overload_count += 1
+                raise
+            except Exception:
+                self.current_failed_count += 1
+                raise
+            finally:
+                self.current_running_count -= 1
+                self.current_finished_count += 1
+                if self.current_finished_count > self.current_qps:
+                    self.adjust_rate()
+                    self.reset_counters()
+
+        def _on_done(task):
+            self.submitted_tasks.remove(task)
+
+        task = asyncio.create_task(_task_wrapper())
+        task.add_done_callback(_on_done)
+        self.submitted_tasks.add(task)
+        return task
+
+    async def shutdown(self):
+        """关闭速率限制器，等待所有任务完成"""
+        self._closed = True
+        if self.submitted_tasks:
+            await asyncio.gather(*self.submitted_tasks, return_exceptions=True)
+        self.submitted_tasks.clear()
@@ -1,22 +1,46 @@
 import asyncio
+import contextlib
+import heapq
+import threading
+from collections import deque
+from collections.abc import Mapping
 
 from loguru import logger
 
+# 默认权重 4 ** -p 的指数上限：超过约 ±500 时权重会下溢为 0 或溢出
+_MAX_PRIORITY_EXPONENT = 64
+
 
 class AdjustableSemaphore:
     """可调整容量的异步信号量
 
     这个信号量允许在运行时动态调整最大并发数。
 
+    实现上与 asyncio.Semaphore 类似：有空闲名额且无人排队时同步地直接拿走名额，
+    只有需要等待时才创建 Future 并放入等待队列；release() 是同步方法，
+    释放或扩容时按剩余名额精确唤醒等待者。
+    缩容后 _current_value 可以为负数，表示还需要归还多少名额才能再次放行。
+
+    等待者按优先级（priority，数值越小越重要，默认为 0）分别排队，同一优先级内 FIFO。
+    不同优先级之间按权重做加权公平分配（stride 调度）：名额紧张时，
+    权重为 w 的优先级大约获得 w / 总权重 的名额，因此重要的调用先拿到名额，
+    但低优先级的调用也不会被饿死。
+
     Args:
         initial_value (int): 初始的信号量值（最大并发数）
+        priority_weights: 各优先级的权重，未列出的优先级 p 的权重为 4 ** -p，
+            即每提高一级重要程度，分到的名额约为下一级的 4 倍；
+            p 超出 [-64, 64] 时按边界计算权重，但仍按数值大小决定先后
 
     Raises:
         ValueError: 当尝试设置负数值时抛出
     """
 
     def __init__(
-        self, initial_value: int = 1, ignore_loop_bound_exception: bool = False
+        self,
+        initial_value: int = 1,
+        ignore_loop_bound_exception: bool = False,
+        priority_weights: Mapping[int, float] | None = None,
     ) -> None:
         """
         Args:
@@ -28,46 +52,182 @@ class AdjustableSemaphore:
         """
         if initial_value < 0:
             raise ValueError("Initial semaphore value cannot be negative")
+        if priority_weights and min(priority_weights.values()) <= 0:
+            raise ValueError("Priority weights must be positive")
         self.initial_value = initial_value
         self._current_value = initial_value
-        self._condition = asyncio.Condition()
+        # 只保存非空的等待队列
+        self._waiters: dict[int, deque[asyncio.Future[None]]] = {}
+        self.priority_weights = dict(priority_weights or {})
+        # stride 调度：每个优先级下一次放行的起始虚拟时刻，以及每次放行前进的步长（1 / 权重）
+        self._passes: dict[int, float] = {}
+        self._strides: dict[int, float] = {}
+        # 每个有等待者的优先级在堆中有且只有一项（完成时刻, 优先级），堆顶就是下一个放行的优先级
+        self._schedule: list[tuple[float, int]] = []
+        self._virtual_time = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
         self.ignore_loop_bound_exception = ignore_loop_bound_exception
+        # 因忽略循环绑定异常而没有真正拿到名额的 async with，退出时不能归还名额
+        self._unacquired_contexts: dict[asyncio.Task | None, int] = {}
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """与 asyncio.mixins._LoopBoundMixin 一致：首次等待时绑定事件循环"""
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        if loop is not self._loop:
+            raise RuntimeError(f"{self!r} is bound to a different event loop")
+        return loop
+
+    def _weight(self, priority: int) -> float:
+        weight = self.priority_weights.get(priority)
+        if weight is not None:
+            return weight
+        exponent = max(-_MAX_PRIORITY_EXPONENT, min(priority, _MAX_PRIORITY_EXPONENT))
+        return 4.0**-exponent
+
+    def _stride(self, priority: int) -> float:
+        stride = self._strides.get(priority)
+        if stride is None:
+            stride = self._strides[priority] = 1 / self._weight(priority)
+        return stride
+
+    def _wake_up_waiters(self) -> None:
+        """把剩余名额直接转交给等待者，优先级之间按权重分配"""
+        schedule = self._schedule
+        while self._current_value > 0 and schedule:
+            # 堆顶是“完成时刻”最早的优先级（加权公平队列），相同时更重要的优先
+            priority = schedule[0][1]
+            queue = self._waiters[priority]
+            waiter = queue.popleft()
+            if self._grant(waiter):
+                self._current_value -= 1
+                start = self._passes[priority]
+                self._virtual_time = start
+                self._passes[priority] = start = start + self._strides[priority]
+                if queue:
+                    heapq.heapreplace(
+                        schedule, (start + self._strides[priority], priority)
+                    )
+                    continue
+            elif queue:
+                continue
+            heapq.heappop(schedule)
+            del self._waiters[priority]
+
+    def _grant(self, waiter: asyncio.Future[None]) -> bool:
+        """把一个名额交给等待者，等待者已取消时返回 False"""
+        if waiter.done():
+            return False
+        waiter.set_result(None)
+        return True
+
+    def _enqueue(self, waiter: asyncio.Future[None], priority: int) -> None:
+        queue = self._waiters.get(priority)
+        if queue is None:
+            queue = self._waiters[priority] = deque()
+            # 重新开始排队的优先级不能用空闲期间积攒的额度插队
+            start = self._passes[priority] = max(
+                self._passes.get(priority, 0.0), self._virtual_time
+            )
+            heapq.heappush(self._schedule, (start + self._stride(priority), priority))
+        queue.append(waiter)
+        if self._current_value > 0:
+            # 队列里可能残留已取消的等待者，这里顺便清理并尝试立即放行
+            self._wake_up_waiters()
+
+    def _on_acquire_cancelled(
+        self, waiter: asyncio.Future[None], priority: int
+    ) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # 已经拿到名额却被取消，归还给下一个等待者
+            self._current_value += 1
+            self._wake_up_waiters()
+        else:
+            self._remove_waiter(waiter, priority)
+
+    def _remove_waiter(self, waiter: asyncio.Future[None], priority: int) -> None:
+        queue = self._waiters.get(priority)
+        if queue is None:
+            return
+        with contextlib.suppress(ValueError):
+            queue.remove(waiter)
+        if not queue:
+            del self._waiters[priority]
+            self._schedule = [item for item in self._schedule if item[1] != priority]
+            heapq.heapify(self._schedule)
+
+    def locked(self) -> bool:
+        """当前是否需要等待才能获取信号量"""
+        return self._current_value <= 0 or bool(self._waiters)
+
+    @property
+    def waiting_count(self) -> int:
+        """等待中的调用数（可能包含尚未清理的已取消等待者）"""
+        return sum(len(queue) for queue in self._waiters.values())
+
+    async def acquire(self, priority: int = 0) -> bool:
+        """获取信号量
 
-    async def acquire(self) -> bool:
-        """获取信号量"""
-        async with self._condition:
-            while self._current_value <= 0:
-                await self._condition.wait()
+        Args:
+            priority: 优先级，数值越小越先获得名额
+        """
+        if self._current_value > 0 and not self._waiters:
+            # 快速路径：有空闲名额且无人排队，不需要挂起
+            self._current_value -= 1
+            return True
+
+        waiter = self._get_loop().create_future()
+        self._enqueue(waiter, priority)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            self._on_acquire_cancelled(waiter, priority)
+            raise
+        return True
+
+    def try_acquire(self) -> bool:
+        """有空闲名额且无人排队时立即拿走一个名额，否则返回 False，不会等待"""
+        if self._current_value > 0 and not self._waiters:
             self._current_value -= 1
             return True
+        return False
 
-    async def release(self) -> None:
+    def release(self) -> None:
         """释放信号量"""
-        async with self._condition:
-            self._current_value += 1
-            self._condition.notify(1)
+        self._current_value += 1
+        if self._waiters:
+            self._wake_up_waiters()
 
     async def set_value(self, value: int) -> None:
         """动态设置新的并发数量"""
+        self.set_value_nowait(value)
+
+    def set_value_nowait(self, value: int) -> None:
+        """set_value 的同步版本"""
         if value < 0:
             raise ValueError("Semaphore value cannot be negative")
 
-        async with self._condition:
-            delta = value - self.initial_value
-            self.initial_value = value
-            self._current_value += delta
+        delta = value - self.initial_value
+        self.initial_value = value
+        self._current_value += delta
 
-            # 如果新值增加了，唤醒等待的协程
-            if delta > 0:
-                self._condition.notify(delta)
+        # 如果新值增加了，唤醒等待的协程
+        if delta > 0:
+            self._wake_up_waiters()
 
     def get_value(self) -> int:
         """获取当前信号量的值"""
         return self._current_value
 
-    async def __aenter__(self):
+    def prioritized(self, priority: int) -> "_PrioritizedAcquire":
+        """以指定优先级获取信号量的异步上下文管理器：async with sem.prioritized(1): ..."""
+        return _PrioritizedAcquire(self, priority)
+
+    async def _acquire_for_context(self, priority: int = 0) -> bool:
+        """返回是否真正拿到了名额，忽略循环绑定异常时为 False"""
         try:
-            await self.acquire()
+            await self.acquire(priority)
         except RuntimeError as e:
             if (
                 "is bound to a different event loop" in str(e)
@@ -76,22 +236,138 @@ class AdjustableSemaphore:
                 logger.warning(
                     f"Catched the loop bound exception: {e}, but ignored it because ignore_loop_bound_exception is True, this semaphore is actually not working!"
                 )
-            else:
-                raise e
+                return False
+            raise e
+        return True
+
+    async def __aenter__(self):
+        if self.try_acquire():
+            # 快速路径：不需要挂起，也不会触发循环绑定检查
+            return
+        if not await self._acquire_for_context():
+            # 同一个信号量被多个任务共用，按任务记录哪些 async with 没有拿到名额
+            task = asyncio.current_task()
+            self._unacquired_contexts[task] = self._unacquired_contexts.get(task, 0) + 1
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if not self._unacquired_contexts:
+            # 常见情况：没有被忽略的循环绑定异常，直接归还名额
+            self.release()
+            return
+        task = asyncio.current_task()
+        unacquired = self._unacquired_contexts.get(task)
+        if unacquired:
+            if unacquired == 1:
+                del self._unacquired_contexts[task]
+            else:
+                self._unacquired_contexts[task] = unacquired - 1
+            return
+        self.release()
+
+
+class ThreadSafeAdjustableSemaphore(AdjustableSemaphore):
+    """可以在多个线程、多个事件循环之间共享的 AdjustableSemaphore
+
+    名额计数和等待队列由 threading.Lock 保护，不绑定事件循环。
+    名额分给其他事件循环上的等待者时，通过 call_soon_threadsafe 在等待者自己的事件循环中唤醒它；
+    如果送达前等待者已被取消，名额会被归还。
+
+    用法与 AdjustableSemaphore 相同，但每次获取和释放都要加锁，只在需要跨线程共享时使用。
+    """
+
+    def __init__(
+        self,
+        initial_value: int = 1,
+        priority_weights: Mapping[int, float] | None = None,
+    ) -> None:
+        super().__init__(initial_value, priority_weights=priority_weights)
+        self._lock = threading.Lock()
+        # 已经分配了名额、但还没在等待者的事件循环中送达的等待者
+        self._in_transit: set[asyncio.Future[None]] = set()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    def _grant(self, waiter: asyncio.Future[None]) -> bool:
+        if waiter.done():
+            return False
+        loop = waiter.get_loop()
         try:
-            await self.release()
-        except RuntimeError as e:
-            if (
-                "is bound to a different event loop" in str(e)
-                and self.ignore_loop_bound_exception
-            ):
-                logger.warning(
-                    f"Catched the loop bound exception: {e}, but ignored it because ignore_loop_bound_exception is True, this semaphore is actually not working!"
-                )
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if loop is running_loop:
+            waiter.set_result(None)
+            return True
+        try:
+            loop.call_soon_threadsafe(self._deliver, waiter)
+        except RuntimeError:
+            # 等待者所在的事件循环已经关闭
+            return False
+        self._in_transit.add(waiter)
+        return True
+
+    def _deliver(self, waiter: asyncio.Future[None]) -> None:
+        """在等待者的事件循环中执行：送达名额，等待者已取消时归还名额"""
+        with self._lock:
+            self._in_transit.discard(waiter)
+            if waiter.cancelled():
+                self._current_value += 1
+                self._wake_up_waiters()
             else:
-                raise e
+                waiter.set_result(None)
+
+    def _on_acquire_cancelled(
+        self, waiter: asyncio.Future[None], priority: int
+    ) -> None:
+        if waiter in self._in_transit:
+            # 名额正在送达的路上，由 _deliver 归还
+            return
+        super()._on_acquire_cancelled(waiter, priority)
+
+    async def acquire(self, priority: int = 0) -> bool:
+        with self._lock:
+            if not self.locked():
+                self._current_value -= 1
+                return True
+            waiter = self._get_loop().create_future()
+            self._enqueue(waiter, priority)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                self._on_acquire_cancelled(waiter, priority)
+            raise
+        return True
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            return super().try_acquire()
+
+    def release(self) -> None:
+        with self._lock:
+            super().release()
+
+    def set_value_nowait(self, value: int) -> None:
+        with self._lock:
+            super().set_value_nowait(value)
+
+
+class _PrioritizedAcquire:
+    def __init__(self, semaphore: AdjustableSemaphore, priority: int) -> None:
+        self.semaphore = semaphore
+        self.priority = priority
+        self._acquired = False
+
+    async def __aenter__(self):
+        self._acquired = self.semaphore.try_acquire() or (
+            await self.semaphore._acquire_for_context(self.priority)
+        )
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._acquired:
+            self._acquired = False
+            self.semaphore.release()
 
 
 if __name__ == "__main__":
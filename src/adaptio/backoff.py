@@ -0,0 +1,79 @@
+import random
+from typing import Literal, Protocol
+
+BackoffName = Literal["constant", "exponential", "full_jitter", "decorrelated_jitter"]
+
+
+class BackoffPolicy(Protocol):
+    """重试等待时间策略协议
+
+    next_delay 的 attempt 从 1 开始计数，previous_delay 为上一次实际等待的时间
+    （第一次重试时为 0），策略本身不保存状态，因此可以在多个调用之间共享。
+    """
+
+    def next_delay(self, attempt: int, previous_delay: float) -> float: ...
+
+
+class ConstantBackoff:
+    """固定间隔"""
+
+    def __init__(self, delay: float = 1):
+        self.delay = delay
+
+    def next_delay(self, attempt: int, previous_delay: float) -> float:
+        return self.delay
+
+
+class ExponentialBackoff:
+    """指数退避：base * multiplier ** (attempt - 1)，不超过 max_delay"""
+
+    def __init__(self, base: float = 1, max_delay: float = 60, multiplier: float = 2):
+        self.base = base
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def next_delay(self, attempt: int, previous_delay: float) -> float:
+        return min(self.max_delay, self.base * self.multiplier ** (attempt - 1))
+
+
+class FullJitterBackoff(ExponentialBackoff):
+    """完全抖动：在 [0, 指数退避时间] 内均匀随机，避免重试同时发生"""
+
+    def next_delay(self, attempt: int, previous_delay: float) -> float:
+        return random.uniform(0, super().next_delay(attempt, previous_delay))
+
+
+class DecorrelatedJitterBackoff:
+    """去相关抖动：在 [base, previous_delay * 3] 内均匀随机，不超过 max_delay"""
+
+    def __init__(self, base: float = 1, max_delay: float = 60):
+        self.base = base
+        self.max_delay = max_delay
+
+    def next_delay(self, attempt: int, previous_delay: float) -> float:
+        upper = max(self.base, previous_delay * 3)
+        return min(self.max_delay, random.uniform(self.base, upper))
+
+
+def create_backoff(name: BackoffName, base: float, max_delay: float) -> BackoffPolicy:
+    """根据名称创建内置的重试等待时间策略"""
+    if name == "constant":
+        return ConstantBackoff(base)
+    if name == "exponential":
+        return ExponentialBackoff(base, max_delay)
+    if name == "full_jitter":
+        return FullJitterBackoff(base, max_delay)
+    if name == "decorrelated_jitter":
+        return DecorrelatedJitterBackoff(base, max_delay)
+    raise ValueError(f"未知的重试等待策略 {name=}")
+
+
+def retry_delay(
+    policy: BackoffPolicy, attempt: int, previous_delay: float, error: BaseException
+) -> float:
+    """计算下一次重试前的等待时间，服务端给出的 retry_after 作为下限"""
+    delay = policy.next_delay(attempt, previous_delay)
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,180 @@
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Literal
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被直接拒绝
+
+    它不是过载异常，因此 with_adaptive_retry 不会重试它，
+    而是立即把错误交给调用方，避免大量注定失败的重试堆积在后端已经不可用的服务上。
+
+    Args:
+        retry_after: 距离熔断器进入半开状态的剩余秒数
+    """
+
+    def __init__(self, *args: object, retry_after: float | None = None) -> None:
+        super().__init__(*args)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """熔断器（closed / open / half_open 三态状态机）
+
+    - closed：正常放行，记录最近 window_size 次调用的结果；
+      至少有 minimum_calls 次结果且失败率达到 failure_rate_threshold 时进入 open
+    - open：拒绝所有调用，open_seconds 秒后进入 half_open
+    - half_open：最多同时放行 half_open_max_calls 个探测调用，
+      探测全部成功后回到 closed，任意一次探测失败则重新进入 open
+
+    “失败”指过载异常，trip_on_failures=True 时也包括其他异常。
+    熔断器本身不做任何等待，只维护状态，由 AdaptiveAsyncConcurrencyLimiter 决定
+    被拒绝的调用是立即失败还是等待一段时间。
+
+    Args:
+        failure_rate_threshold: 触发熔断的失败率
+        minimum_calls: 计算失败率所需的最少调用数
+        window_size: 统计失败率的最近调用数
+        open_seconds: 熔断持续时间（秒），之后进入半开状态
+        half_open_max_calls: 半开状态下的探测调用数
+        trip_on_failures: 非过载异常是否也计入失败
+        max_wait_seconds: 熔断期间调用的最长等待时间（秒），0 表示立即失败
+        clock: 单调时钟函数，默认为 time.monotonic
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        minimum_calls: int = 20,
+        window_size: int = 100,
+        open_seconds: float = 30,
+        half_open_max_calls: int = 1,
+        trip_on_failures: bool = True,
+        max_wait_seconds: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not 0 < failure_rate_threshold <= 1:
+            raise ValueError(f"{failure_rate_threshold=} 必须在 (0, 1] 区间内")
+        if minimum_calls < 1:
+            raise ValueError(f"{minimum_calls=} 不能小于 1")
+        if window_size < minimum_calls:
+            raise ValueError(f"{window_size=} 不能小于 {minimum_calls=}")
+        if half_open_max_calls < 1:
+            raise ValueError(f"{half_open_max_calls=} 不能小于 1")
+
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.trip_on_failures = trip_on_failures
+        self.max_wait_seconds = max_wait_seconds
+        self._clock = clock
+
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._failure_count = 0
+        self._state: CircuitState = "closed"
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.open_count = 0
+
+    @property
+    def state(self) -> CircuitState:
+        """当前状态，熔断时间到期后自动变为 half_open"""
+        if (
+            self._state == "open"
+            and self._clock() - self._opened_at >= self.open_seconds
+        ):
+            self._state = "half_open"
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        return self._state
+
+    @property
+    def failure_rate(self) -> float:
+        """closed 状态下最近调用的失败率"""
+        if not self._outcomes:
+            return 0.0
+        return self._failure_count / len(self._outcomes)
+
+    @property
+    def retry_after(self) -> float:
+        """距离进入半开状态的剩余秒数，未熔断时为 0"""
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self._opened_at + self.open_seconds - self._clock())
+
+    def allow_request(self) -> bool:
+        """判断是否放行一次调用，半开状态下放行的调用会占用一个探测名额"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        if self._probes_in_flight + self._probe_successes < self.half_open_max_calls:
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self._state == "half_open":
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_max_calls:
+                self._close()
+        elif self._state == "closed":
+            self._record(False)
+
+    def record_overload(self) -> None:
+        self._record_failure()
+
+    def record_failure(self) -> None:
+        """记录一次非过载异常，trip_on_failures=False 时视为成功"""
+        if self.trip_on_failures:
+            self._record_failure()
+        else:
+            self.record_success()
+
+    def record_cancelled(self) -> None:
+        """调用被取消，不计入统计，只归还半开状态下的探测名额"""
+        if self._state == "half_open":
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def reset(self) -> None:
+        """手动恢复到 closed 状态并清空统计"""
+        self._close()
+
+    def _record_failure(self) -> None:
+        if self._state == "half_open":
+            self._open()
+        elif self._state == "closed":
+            self._record(True)
+            if (
+                len(self._outcomes) >= self.minimum_calls
+                and self.failure_rate >= self.failure_rate_threshold
+            ):
+                self._open()
+        # open 状态下完成的调用是熔断前放行的，不再延长熔断时间
+
+    def _record(self, failed: bool) -> None:
+        if len(self._outcomes) == self._outcomes.maxlen and self._outcomes[0]:
+            self._failure_count -= 1
+        self._outcomes.append(failed)
+        self._failure_count += failed
+
+    def _open(self) -> None:
+        self._state = "open"
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self._failure_count = 0
+        self.open_count += 1
+
+    def _close(self) -> None:
+        self._state = "closed"
+        self._outcomes.clear()
+        self._failure_count = 0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
@@ -0,0 +1,243 @@
+import math
+from dataclasses import dataclass
+from typing import Literal, Protocol
+
+ControllerName = Literal["aimd", "gradient", "reno", "cubic", "vegas"]
+
+
+@dataclass
+class WindowSample:
+    """一轮调用窗口的统计样本，由 AdaptiveAsyncConcurrencyLimiter 在调整并发数前生成
+
+    Args:
+        current_limit: 当前的并发上限
+        finished_count: 本轮已完成的调用数
+        succeed_count: 本轮成功的调用数
+        overload_count: 本轮触发过载异常的调用数
+        failed_count: 本轮因其他异常失败的调用数
+        running_count: 生成样本时仍在执行中的调用数
+        latency_sum: 本轮成功调用的延迟总和（秒）
+        min_latency: 本轮成功调用的最小延迟（秒），没有成功调用时为 None
+        overloaded: 本轮过载率是否超过了限制器的 adjust_overload_rate 阈值
+        timestamp: 生成样本时的事件循环时间（秒）
+    """
+
+    current_limit: int
+    finished_count: int
+    succeed_count: int
+    overload_count: int
+    failed_count: int
+    running_count: int
+    latency_sum: float
+    min_latency: float | None
+    overloaded: bool
+    timestamp: float
+
+    @property
+    def overload_rate(self) -> float:
+        if self.finished_count == 0:
+            return 0.0
+        return self.overload_count / self.finished_count
+
+    @property
+    def avg_latency(self) -> float | None:
+        if self.succeed_count == 0:
+            return None
+        return self.latency_sum / self.succeed_count
+
+
+class ConcurrencyController(Protocol):
+    """并发度控制算法协议
+
+    限制器每完成一轮调用就会调用一次 next_limit，返回值会被截断到
+    [min_concurrency, max_concurrency] 区间后作为新的并发上限。
+    """
+
+    def next_limit(self, sample: WindowSample) -> int: ...
+
+
+class AIMDController:
+    """加性增、乘性减（默认算法）
+
+    未过载时并发数按 1, 2, 4, ... 的步长增长（步长上限为 max_increase_step），
+    过载时乘以 decrease_factor 并重置步长。
+    """
+
+    def __init__(self, decrease_factor: float = 0.75, max_increase_step: int = 16):
+        self.decrease_factor = decrease_factor
+        self.max_increase_step = max_increase_step
+        self.increase_step = 1
+
+    def next_limit(self, sample: WindowSample) -> int:
+        if sample.overloaded:
+            self.increase_step = 1
+            return int(sample.current_limit * self.decrease_factor)
+        new_limit = sample.current_limit + self.increase_step
+        self.increase_step = min(self.increase_step * 2, self.max_increase_step)
+        return new_limit
+
+
+class RenoController:
+    """TCP Reno 风格：慢启动 + 拥塞避免
+
+    并发数低于 ssthresh 时每轮翻倍（慢启动），之后每轮加一（拥塞避免）；
+    过载时 ssthresh 设为当前并发数的一半，并从 ssthresh 继续拥塞避免（快速恢复）。
+    """
+
+    def __init__(self, ssthresh: int | None = None):
+        self.ssthresh = ssthresh if ssthresh is not None else math.inf
+
+    def next_limit(self, sample: WindowSample) -> int:
+        if sample.overloaded:
+            self.ssthresh = max(1, sample.current_limit // 2)
+            return int(self.ssthresh)
+        if sample.current_limit < self.ssthresh:
+            return int(min(sample.current_limit * 2, self.ssthresh))
+        return sample.current_limit + 1
+
+
+class CubicController:
+    """TCP CUBIC：以距上次降低的时间为自变量的三次函数增长
+
+    W(t) = C * (t - K)^3 + W_max，其中 W_max 为上次过载时的并发数，
+    K = cbrt(W_max * (1 - beta) / C)。过载时并发数乘以 beta。
+    """
+
+    def __init__(self, beta: float = 0.7, c: float = 0.4, fast_convergence=True):
+        self.beta = beta
+        self.c = c
+        self.fast_convergence = fast_convergence
+        self.w_max: float | None = None
+        self.k = 0.0
+        self.epoch_start: float | None = None
+
+    def next_limit(self, sample: WindowSample) -> int:
+        if sample.overloaded:
+            limit = sample.current_limit
+            if self.fast_convergence and self.w_max is not None and limit < self.w_max:
+                # 过载点在下降，说明可用容量变小了，提前让出余量
+                self.w_max = limit * (1 + self.beta) / 2
+            else:
+                self.w_max = float(limit)
+            self.k = (self.w_max * (1 - self.beta) / self.c) ** (1 / 3)
+            self.epoch_start = sample.timestamp
+            return int(limit * self.beta)
+
+        if self.w_max is None or self.epoch_start is None:
+            # 还没有遇到过过载，按慢启动处理
+            return sample.current_limit * 2
+
+        # 用一轮调用的延迟近似 RTT，预测下一轮结束时的目标值
+        rtt = sample.avg_latency or 0.0
+        t = sample.timestamp - self.epoch_start + rtt
+        target = self.c * (t - self.k) ** 3 + self.w_max
+        return max(sample.current_limit + 1, int(target))
+
+
+class VegasController:
+    """TCP Vegas 风格：根据估计的排队量调整并发数
+
+    以观测到的最小延迟作为无负载基准，估计排队量
+    queue = limit * (1 - base_latency / avg_latency)。
+    排队量小于 alpha 时增加并发数，大于 beta 时减少，过载时乘以 decrease_factor。
+    alpha/beta 按 log10(limit) 缩放，使大并发时也能及时调整。
+    """
+
+    def __init__(self, alpha: float = 3, beta: float = 6, decrease_factor: float = 0.9):
+        self.alpha = alpha
+        self.beta = beta
+        self.decrease_factor = decrease_factor
+        self.base_latency: float | None = None
+
+    def next_limit(self, sample: WindowSample) -> int:
+        limit = sample.current_limit
+        if sample.overloaded:
+            return int(limit * self.decrease_factor)
+        if sample.min_latency is not None and (
+            self.base_latency is None or sample.min_latency < self.base_latency
+        ):
+            self.base_latency = sample.min_latency
+        avg_latency = sample.avg_latency
+        if not avg_latency or self.base_latency is None:
+            return limit
+
+        log_limit = max(1, int(math.log10(max(limit, 1))))
+        queue = limit * (1 - self.base_latency / avg_latency)
+        if queue < self.alpha * log_limit:
+            return limit + log_limit
+        if queue > self.beta * log_limit:
+            return limit - log_limit
+        return limit
+
+
+class GradientController:
+    """Netflix Gradient2 风格：根据延迟相对长期基准的升高幅度调整并发数
+
+    以长期平均延迟（EWMA）作为学习到的无负载基准，
+    gradient = clamp(tolerance * baseline / latency, 0.5, 1.0)，
+    新并发数 = limit * gradient + sqrt(limit)，并做指数平滑。
+    过载时仍乘以 decrease_factor 快速降低并发数。
+    """
+
+    def __init__(
+        self,
+        tolerance: float = 1.5,
+        decrease_factor: float = 0.75,
+        baseline_smoothing: float = 0.05,
+        smoothing: float = 0.2,
+    ):
+        self.tolerance = tolerance
+        self.decrease_factor = decrease_factor
+        self.baseline_smoothing = baseline_smoothing
+        self.smoothing = smoothing
+        self.baseline_latency: float | None = None
+        self._limit: float | None = None
+
+    def next_limit(self, sample: WindowSample) -> int:
+        if self._limit is None or abs(self._limit - sample.current_limit) >= 1:
+            # 并发数被外部修改（例如截断到上下限）时以实际值为准
+            self._limit = float(sample.current_limit)
+
+        if sample.overloaded:
+            self._limit = sample.current_limit * self.decrease_factor
+            return int(self._limit)
+
+        latency = sample.avg_latency
+        if latency is None:
+            return sample.current_limit
+        if self.baseline_latency is None:
+            self.baseline_latency = latency
+        else:
+            self.baseline_latency += self.baseline_smoothing * (
+                latency - self.baseline_latency
+            )
+            # 延迟远低于基准时说明基准已过时（例如负载下降），让它更快回落
+            if latency > 0 and self.baseline_latency / latency > 2:
+                self.baseline_latency *= 0.95
+
+        gradient = (
+            1.0
+            if latency <= 0
+            else max(0.5, min(1.0, self.tolerance * self.baseline_latency / latency))
+        )
+        # 允许少量排队（sqrt(limit)）用于探测更高的并发
+        target = self._limit * gradient + math.sqrt(self._limit)
+        self._limit = (1 - self.smoothing) * self._limit + self.smoothing * target
+        return round(self._limit)
+
+
+def create_controller(
+    name: ControllerName, latency_tolerance: float = 1.5
+) -> ConcurrencyController:
+    """根据名称创建内置的并发度控制算法"""
+    if name == "aimd":
+        return AIMDController()
+    if name == "gradient":
+        return GradientController(tolerance=latency_tolerance)
+    if name == "reno":
+        return RenoController()
+    if name == "cubic":
+        return CubicController()
+    if name == "vegas":
+        return VegasController()
+    raise ValueError(f"未知的并发控制算法 {name=}")
@@ -0,0 +1,520 @@
+import asyncio
+import contextlib
+import json
+import math
+import uuid
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass, field
+from typing import Any
+
+from .adaptive_async_concurrency_limiter import AdaptiveAsyncConcurrencyLimiter
+from .congestion_control import (
+    ConcurrencyController,
+    ControllerName,
+    WindowSample,
+    create_controller,
+)
+from .hooks import AdjustEvent, TaskOutcome
+from .log_utils import setup_colored_logger
+
+
+@dataclass
+class _Allocation:
+    permits: int
+    want: int
+    running: int
+    expires_at: float
+
+    @property
+    def held(self) -> int:
+        # 名额减少后客户端正在执行的调用不会立即结束，在它们结束前仍占用名额
+        return max(self.permits, self.running)
+
+
+@dataclass
+class _Report:
+    """一段时间内的调用结果统计"""
+
+    succeed_count: int = 0
+    overload_count: int = 0
+    failed_count: int = 0
+    latency_sum: float = 0.0
+    min_latency: float = math.inf
+
+    @property
+    def finished_count(self) -> int:
+        return self.succeed_count + self.overload_count + self.failed_count
+
+    def merge(
+        self,
+        succeed: int,
+        overload: int,
+        failed: int,
+        latency_sum: float,
+        min_latency: float | None,
+    ) -> None:
+        self.succeed_count += succeed
+        self.overload_count += overload
+        self.failed_count += failed
+        self.latency_sum += latency_sum
+        if min_latency is not None and min_latency < self.min_latency:
+            self.min_latency = min_latency
+
+    def to_message(self) -> dict[str, Any]:
+        return {
+            "succeed": self.succeed_count,
+            "overload": self.overload_count,
+            "failed": self.failed_count,
+            "latency_sum": self.latency_sum,
+            "min_latency": None if self.min_latency == math.inf else self.min_latency,
+        }
+
+
+@dataclass
+class _Resource:
+    limit: int
+    controller: ConcurrencyController
+    allocations: dict[str, _Allocation] = field(default_factory=dict)
+    window: _Report = field(default_factory=_Report)
+    # 本轮所有客户端上报的正在执行的调用数之和的最大值
+    peak_running: int = 0
+
+
+class LimitCoordinator:
+    """多台机器共享自适应并发上限的协调服务
+
+    一个小型 asyncio 服务（TCP 或 Unix socket），按资源名称（例如合作方 API）维护自适应并发上限。
+    CoordinatedAdaptiveLimiter 客户端定期同步：上报自上次同步以来的成功/过载/失败数和延迟，
+    并申请自己需要的名额数；协调服务按剩余名额分配，分配总数不超过上限。名额不足时为低于平均份额的客户端预留名额，
+    占用较多的客户端在下一次同步时让出，因此每个客户端很快都能分到平均份额。
+    客户端同时上报正在执行的调用数，名额减少后仍在执行的调用在结束前继续计入它的占用。
+    一轮调用完成（所有客户端上报的完成数超过当前上限）后，由并发度控制算法调整该资源的上限；
+    一轮中上报的正在执行的调用数之和没有达到上限时不提高上限，
+    因此整个集群的并发数会收敛到后端的真实容量，而不是 N 倍。
+
+    协议为每行一个 JSON 对象的请求/响应。超过 lease_seconds 没有同步的客户端的名额会被收回。
+
+    Args:
+        host: 监听地址
+        port: 监听端口，0 表示随机端口
+        path: Unix socket 路径，设置后忽略 host/port
+        max_concurrency: 每个资源的最大并发数
+        min_concurrency: 每个资源的最小并发数
+        initial_concurrency: 每个资源的初始并发数
+        adjust_overload_rate: 触发并发度调整的过载率阈值
+        controller: 并发度控制算法名称，或返回 ConcurrencyController 的工厂函数
+        latency_tolerance: controller="gradient" 时可容忍的延迟升高倍数
+        lease_seconds: 客户端名额的有效期（秒）
+        log_level: 日志级别
+        log_prefix: 日志前缀
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        path: str | None = None,
+        max_concurrency: int = 256,
+        min_concurrency: int = 1,
+        initial_concurrency: int = 1,
+        adjust_overload_rate: float = 0.1,
+        controller: ControllerName | Callable[[], ConcurrencyController] = "aimd",
+        latency_tolerance: float = 1.5,
+        lease_seconds: float = 5,
+        log_level: str = "INFO",
+        log_prefix: str = "",
+    ):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.initial_concurrency = initial_concurrency
+        self.adjust_overload_rate = adjust_overload_rate
+        self.controller = controller
+        self.latency_tolerance = latency_tolerance
+        self.lease_seconds = lease_seconds
+        self.log_prefix = log_prefix
+
+        self.logger = setup_colored_logger(
+            logger_name=f"coordinator_{id(self)}",
+            log_level=log_level,
+        )
+
+        self.resources: dict[str, _Resource] = {}
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def address(self) -> str | tuple[str, int]:
+        """客户端连接使用的地址：Unix socket 路径或 (host, port)"""
+        if self.path is not None:
+            return self.path
+        assert self._server is not None, "协调服务尚未启动"
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return host, port
+
+    def resource_limit(self, name: str) -> int:
+        """资源当前的并发上限"""
+        return self._resource(name).limit
+
+    async def start(self) -> None:
+        if self.path is not None:
+            self._server = await asyncio.start_unix_server(
+                self._handle_client, path=self.path
+            )
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_client, self.host, self.port
+            )
+        self.logger.info(f"{self.log_prefix} -- 协调服务已启动: {self.address}")
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # 关闭服务不会断开已建立的连接，需要逐个关闭
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _resource(self, name: str) -> _Resource:
+        resource = self.resources.get(name)
+        if resource is None:
+            controller = (
+                create_controller(self.controller, self.latency_tolerance)
+                if isinstance(self.controller, str)
+                else self.controller()
+            )
+            resource = self.resources[name] = _Resource(
+                self.initial_concurrency, controller
+            )
+        return resource
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        clients: set[tuple[str, str]] = set()
+        task = asyncio.current_task()
+        assert task is not None
+        self._connections[task] = writer
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    clients.add((request["resource"], request["client"]))
+                    response = self.sync(**request)
+                except (ValueError, KeyError, TypeError) as e:
+                    response = {"error": str(e)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # 连接断开时立即收回这个连接上所有客户端的名额
+            for resource_name, client in clients:
+                self._resource(resource_name).allocations.pop(client, None)
+            self._connections.pop(task, None)
+            writer.close()
+
+    def sync(
+        self,
+        resource: str,
+        client: str,
+        want: int,
+        running: int = 0,
+        succeed: int = 0,
+        overload: int = 0,
+        failed: int = 0,
+        latency_sum: float = 0.0,
+        min_latency: float | None = None,
+    ) -> dict[str, Any]:
+        """处理一次客户端同步：记录上报的结果，返回分配给该客户端的名额数"""
+        state = self._resource(resource)
+        now = asyncio.get_running_loop().time()
+
+        state.window.merge(succeed, overload, failed, latency_sum, min_latency)
+        others_running = sum(
+            a.running for name, a in state.allocations.items() if name != client
+        )
+        state.peak_running = max(state.peak_running, others_running + running)
+        if state.window.finished_count > state.limit:
+            self._adjust(resource, state, now)
+
+        for name, allocation in list(state.allocations.items()):
+            if allocation.expires_at < now:
+                del state.allocations[name]
+        state.allocations.pop(client, None)
+        if want <= 0:
+            return {"allocation": 0, "limit": state.limit}
+
+        others = state.allocations.values()
+        available = state.limit - sum(a.held for a in others)
+        fair_share = max(1, state.limit // (len(state.allocations) + 1))
+        # 为低于平均份额且仍有需求的其他客户端预留名额，它们下一次同步时可以拿到
+        reserved = sum(max(0, min(a.want, fair_share) - a.held) for a in others)
+        permits = min(want, max(available - reserved, min(fair_share, available)))
+        permits = max(0, permits)
+        state.allocations[client] = _Allocation(
+            permits, want, running, now + self.lease_seconds
+        )
+        return {"allocation": permits, "limit": state.limit}
+
+    def _adjust(self, name: str, state: _Resource, now: float) -> None:
+        window = state.window
+        overload_rate = window.overload_count / window.finished_count
+        sample = WindowSample(
+            current_limit=state.limit,
+            finished_count=window.finished_count,
+            succeed_count=window.succeed_count,
+            overload_count=window.overload_count,
+            failed_count=window.failed_count,
+            running_count=sum(a.permits for a in state.allocations.values()),
+            latency_sum=window.latency_sum,
+            min_latency=None if window.min_latency == math.inf else window.min_latency,
+            overloaded=overload_rate > self.adjust_overload_rate,
+            timestamp=now,
+        )
+        if not sample.overloaded and state.peak_running < state.limit:
+            # 并发上限没有被用满，无法说明后端还能承受更高的并发
+            state.window = _Report()
+            state.peak_running = 0
+            return
+        new_limit = max(
+            self.min_concurrency,
+            min(self.max_concurrency, int(state.controller.next_limit(sample))),
+        )
+        if sample.overloaded:
+            self.logger.info(
+                f"{self.log_prefix}[{name}] -- 检测到过载，降低并发数至 {new_limit}"
+            )
+        elif new_limit != state.limit:
+            self.logger.info(
+                f"{self.log_prefix}[{name}] -- 系统运行正常，调整并发数从 {state.limit} 到 {new_limit}"
+            )
+        state.limit = new_limit
+        state.window = _Report()
+        state.peak_running = 0
+
+
+class CoordinatedAdaptiveLimiter(AdaptiveAsyncConcurrencyLimiter):
+    """从 LimitCoordinator 租用名额的自适应并发限制器
+
+    每隔 sync_interval_seconds 与协调服务同步一次：上报本地的调用结果，
+    并按当前的在途与排队调用数申请名额，本地并发上限等于分到的名额数。
+    分到 0 个名额（例如空闲时，或客户端数多于上限时）时新的调用等待之后的同步，
+    不会突破整个集群的并发上限。
+    协调服务不可达时退回本地自适应控制（与 AdaptiveAsyncConcurrencyLimiter 相同），
+    之后每次同步都会尝试重新连接，连接恢复后重新由协调服务决定并发上限。
+
+    Args:
+        coordinator_address: 协调服务地址，(host, port) 或 Unix socket 路径
+        resource: 资源名称，使用相同名称的客户端共享同一个并发上限
+        sync_interval_seconds: 同步间隔（秒）
+        coordinator_timeout_seconds: 单次同步的超时时间（秒）
+        client_id: 客户端标识，默认随机生成
+        **kwargs: 传给 AdaptiveAsyncConcurrencyLimiter 的参数，用于退回本地控制时
+    """
+
+    def __init__(
+        self,
+        coordinator_address: str | tuple[str, int],
+        resource: str,
+        sync_interval_seconds: float = 0.1,
+        coordinator_timeout_seconds: float = 1,
+        client_id: str | None = None,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.coordinator_address = coordinator_address
+        self.resource = resource
+        self.sync_interval_seconds = sync_interval_seconds
+        self.coordinator_timeout_seconds = coordinator_timeout_seconds
+        self.client_id = client_id or uuid.uuid4().hex
+        self.coordinated = False
+
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._sync_task: asyncio.Task | None = None
+        self._closing = False
+        self._unreported = _Report()
+
+    def _record_window_outcome(
+        self, outcome: TaskOutcome, latency: float | None, now: float
+    ) -> None:
+        super()._record_window_outcome(outcome, latency, now)
+        # 上报给协调服务的结果单独累计，不清空本地控制使用的本轮统计，
+        # 协调服务不可达时本地自适应控制照常按轮调整
+        if outcome == "succeed":
+            self._unreported.merge(1, 0, 0, latency or 0.0, latency)
+        elif outcome == "overload":
+            self._unreported.merge(0, 1, 0, 0.0, None)
+        elif outcome == "failed":
+            self._unreported.merge(0, 0, 1, 0.0, None)
+
+    def _adjust_concurrency(self, sample: WindowSample | None = None) -> None:
+        # 与协调服务连接正常时并发上限由协调服务决定
+        if not self.coordinated:
+            super()._adjust_concurrency(sample)
+
+    def submit(self, coro: Coroutine, priority: int = 0):
+        self._ensure_sync_task()
+        return super().submit(coro, priority=priority)
+
+    async def asubmit(self, coro: Coroutine, priority: int = 0) -> asyncio.Future:
+        self._ensure_sync_task()
+        return await super().asubmit(coro, priority=priority)
+
+    def _ensure_sync_task(self) -> None:
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def _sync_loop(self) -> None:
+        # 取消可能被 wait_for 吞掉（连接失败与取消同时发生时），因此同时检查 _closing
+        while not self._closing:
+            await self.sync()
+            await asyncio.sleep(self.sync_interval_seconds)
+
+    async def sync(self) -> None:
+        """与协调服务同步一次，失败时退回本地控制"""
+        with self._state_lock:
+            sample = self.window_sample()
+            report, self._unreported = self._unreported, _Report()
+        # 已提交的调用（包括还没开始等待名额的）与 asubmit 队列中的调用
+        want = len(self.submitted_tasks) + self.pending_count
+        try:
+            response = await asyncio.wait_for(
+                self._request(
+                    {
+                        "resource": self.resource,
+                        "client": self.client_id,
+                        "want": want,
+                        "running": self.current_running_count,
+                        **report.to_message(),
+                    }
+                ),
+                self.coordinator_timeout_seconds,
+            )
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            self._disconnect()
+            if self.coordinated:
+                self.coordinated = False
+                self.logger.warning(
+                    f"{self.log_prefix} -- 无法连接协调服务（{e!r}），退回本地自适应控制"
+                )
+                # 协调服务可能只分到了 0 个名额，本地控制至少从 min_concurrency 开始
+                self._apply_limit(
+                    max(self.workers_lock.initial_value, self.min_concurrency, 1),
+                    sample,
+                )
+            return
+
+        if not self.coordinated:
+            self.coordinated = True
+            self.logger.info(f"{self.log_prefix} -- 已连接协调服务，由协调服务分配名额")
+        if self.in_cooldown:
+            # 服务端要求退避期间保持探测规模的并发上限，暂停结束后由下一次同步恢复
+            return
+        # 名额按分配结果原样使用（可以为 0），保证整个集群的并发数不超过上限
+        self._apply_limit(
+            min(int(response["allocation"]), self.max_concurrency), sample
+        )
+
+    def _apply_limit(self, new_limit: int, sample: WindowSample) -> None:
+        with self._state_lock:
+            old_limit = self.workers_lock.initial_value
+            if self._closed or new_limit == old_limit:
+                return
+            if new_limit > old_limit:
+                self.metrics.limit_increase_total += 1
+            else:
+                self.metrics.limit_decrease_total += 1
+            self._set_limit(new_limit)
+        if self.hooks:
+            self._fire("on_adjust", AdjustEvent(self, old_limit, new_limit, sample))
+
+    async def _request(self, message: dict[str, Any]) -> dict[str, Any]:
+        if self._writer is None:
+            if isinstance(self.coordinator_address, str):
+                self._reader, self._writer = await asyncio.open_unix_connection(
+                    self.coordinator_address
+                )
+            else:
+                self._reader, self._writer = await asyncio.open_connection(
+                    *self.coordinator_address
+                )
+        assert self._reader is not None
+        self._writer.write(json.dumps(message).encode() + b"\n")
+        await self._writer.drain()
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionResetError("协调服务关闭了连接")
+        response = json.loads(line)
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response
+
+    def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def shutdown(self):
+        """关闭限制器，归还在协调服务上的名额"""
+        self._closing = True
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            await asyncio.gather(self._sync_task, return_exceptions=True)
+            self._sync_task = None
+        await super().shutdown()
+        if self._writer is not None:
+            with contextlib.suppress(OSError, asyncio.TimeoutError, ValueError):
+                await asyncio.wait_for(
+                    self._request(
+                        {"resource": self.resource, "client": self.client_id, "want": 0}
+                    ),
+                    self.coordinator_timeout_seconds,
+                )
+            self._disconnect()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="adaptio 并发上限协调服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7878)
+    parser.add_argument("--path", default=None, help="Unix socket 路径")
+    parser.add_argument("--max-concurrency", type=int, default=256)
+    parser.add_argument("--min-concurrency", type=int, default=1)
+    parser.add_argument("--initial-concurrency", type=int, default=1)
+    parser.add_argument("--controller", default="aimd")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+
+    asyncio.run(
+        LimitCoordinator(
+            host=args.host,
+            port=args.port,
+            path=args.path,
+            max_concurrency=args.max_concurrency,
+            min_concurrency=args.min_concurrency,
+            initial_concurrency=args.initial_concurrency,
+            controller=args.controller,
+            log_level=args.log_level,
+        ).serve_forever()
+    )
@@ -0,0 +1,86 @@
+import math
+from collections import deque
+
+_RECOMPUTE_EVERY = 16
+
+
+class HedgePolicy:
+    """对冲请求（hedged requests）策略，用于降低幂等调用的尾延迟
+
+    调用超过最近延迟的 percentile 分位数仍未结束时，再发起一次相同的调用，
+    采用先成功的结果并取消另一个。对冲调用只使用限制器当前空闲的名额（不排队），
+    并受额度限制：每次主调用积累 budget_ratio 个额度，最多积累 max_budget 个，
+    每次对冲消耗 1 个，因此对冲调用最多约占主调用的 budget_ratio，不会造成过载。
+
+    同一个 HedgePolicy 可以被多个被装饰的函数共享，此时它们共享延迟样本与额度。
+
+    Args:
+        percentile: 触发对冲的延迟分位数
+        min_delay: 最短的对冲等待时间（秒）
+        max_delay: 最长的对冲等待时间（秒），None 表示不限制
+        budget_ratio: 对冲调用数相对主调用数的比例上限
+        max_budget: 最多积累的对冲额度，决定短时间内最多能连续对冲多少次
+        min_samples: 收集到这么多延迟样本之前不对冲
+        window: 用最近多少个延迟样本估计分位数
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_delay: float = 0.0,
+        max_delay: float | None = None,
+        budget_ratio: float = 0.05,
+        max_budget: float = 10,
+        min_samples: int = 20,
+        window: int = 1000,
+    ):
+        if not 0 < percentile < 1:
+            raise ValueError(f"{percentile=} 必须在 (0, 1) 区间内")
+        if budget_ratio < 0:
+            raise ValueError(f"{budget_ratio=} 不能为负数")
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.max_budget = max_budget
+        self.min_samples = min_samples
+        self.budget = 0.0
+        self.hedged_total = 0
+        self.hedge_won_total = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._delay: float | None = None
+        self._new_samples = 0
+
+    def observe(self, latency: float) -> None:
+        """记录一次成功调用的延迟（秒）"""
+        self._latencies.append(latency)
+        self._new_samples += 1
+
+    def delay(self) -> float | None:
+        """当前的对冲等待时间（秒），样本不足时为 None"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        if self._delay is None or self._new_samples >= _RECOMPUTE_EVERY:
+            # 分位数变化很慢，攒够一批新样本再重新排序
+            values = sorted(self._latencies)
+            value = values[
+                min(len(values) - 1, math.ceil(self.percentile * len(values)) - 1)
+            ]
+            value = max(self.min_delay, value)
+            if self.max_delay is not None:
+                value = min(self.max_delay, value)
+            self._delay = value
+            self._new_samples = 0
+        return self._delay
+
+    def on_primary(self) -> None:
+        """发起了一次主调用，积累对冲额度"""
+        self.budget = min(self.max_budget, self.budget + self.budget_ratio)
+
+    def try_spend(self) -> bool:
+        """额度足够时消耗一次对冲额度"""
+        # 容忍累加 budget_ratio 时的浮点误差
+        if self.budget < 1 - 1e-9:
+            return False
+        self.budget -= 1
+        return True
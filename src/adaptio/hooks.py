@@ -0,0 +1,140 @@
+import logging
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Literal
+
+from .congestion_control import WindowSample
+
+if TYPE_CHECKING:
+    from .adaptive_async_concurrency_limiter import AdaptiveAsyncConcurrencyLimiter
+
+TaskOutcome = Literal["succeed", "overload", "failed", "cancelled", "rejected"]
+
+
+@dataclass
+class TaskTrace:
+    """一次提交到限制器的调用的时间线，所有时间戳都是事件循环时间（单调时钟，秒）
+
+    只有注册了钩子时才会创建，未注册钩子的限制器没有这部分开销。
+
+    Args:
+        limiter: 执行这次调用的限制器
+        priority: 提交时的优先级
+        enqueued_at: 提交的时间
+        admitted_at: 通过熔断器与暂停检查、开始等待名额的时间
+        acquired_at: 获得 workers_lock 名额的时间
+        started_at: 开始执行的时间
+        finished_at: 结束的时间
+        outcome: 结果，未结束时为 None
+        error: 调用抛出的异常
+        data: 供钩子保存自己的状态（例如 span）
+    """
+
+    limiter: "AdaptiveAsyncConcurrencyLimiter"
+    priority: int
+    enqueued_at: float
+    admitted_at: float | None = None
+    acquired_at: float | None = None
+    started_at: float | None = None
+    finished_at: float | None = None
+    outcome: TaskOutcome | None = None
+    error: BaseException | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def queue_wait(self) -> float | None:
+        """通过检查后等待 workers_lock 名额的时间"""
+        if self.acquired_at is None or self.admitted_at is None:
+            return None
+        return self.acquired_at - self.admitted_at
+
+    @property
+    def admission_wait(self) -> float | None:
+        """等待熔断器半开或全局暂停结束的时间"""
+        if self.admitted_at is None:
+            return None
+        return self.admitted_at - self.enqueued_at
+
+    @property
+    def service_time(self) -> float | None:
+        """在后端执行的时间"""
+        if self.finished_at is None or self.started_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+@dataclass(frozen=True)
+class RetryEvent:
+    """with_adaptive_retry 即将因过载异常重试
+
+    Args:
+        function: 被装饰函数的限定名
+        attempt: 第几次重试，从 1 开始
+        delay: 重试前将要等待的时间（秒）
+        error: 触发重试的过载异常
+        timestamp: 事件循环时间（秒）
+    """
+
+    function: str
+    attempt: int
+    delay: float
+    error: BaseException
+    timestamp: float
+
+
+@dataclass(frozen=True)
+class AdjustEvent:
+    """限制器根据一轮统计样本调整了并发上限（新旧上限可能相同）
+
+    Args:
+        limiter: 调整并发上限的限制器
+        old_limit: 调整前的并发上限
+        new_limit: 调整后的并发上限
+        sample: 用于调整的统计样本
+    """
+
+    limiter: "AdaptiveAsyncConcurrencyLimiter"
+    old_limit: int
+    new_limit: int
+    sample: WindowSample
+
+    @property
+    def timestamp(self) -> float:
+        return self.sample.timestamp
+
+
+class LimiterHooks:
+    """插桩钩子基类，按需覆盖其中的方法，默认什么都不做
+
+    钩子在事件循环中同步调用，应当尽量轻量；钩子抛出的异常会被记录到日志，不会影响调用本身。
+    on_adjust 在 thread_safe 限制器的状态锁内调用，不能再调用限制器的方法。
+    """
+
+    def on_enqueue(self, trace: TaskTrace) -> None:
+        """调用提交到限制器，开始等待名额"""
+
+    def on_acquire(self, trace: TaskTrace) -> None:
+        """调用获得了 workers_lock 名额"""
+
+    def on_complete(self, trace: TaskTrace) -> None:
+        """调用结束，trace.outcome 给出结果"""
+
+    def on_retry(self, event: RetryEvent) -> None:
+        """with_adaptive_retry 即将等待 event.delay 秒后重试"""
+
+    def on_adjust(self, event: AdjustEvent) -> None:
+        """限制器调整了并发上限"""
+
+
+def fire_hooks(
+    hooks: Sequence[LimiterHooks],
+    method: str,
+    event: Any,
+    logger: logging.Logger,
+) -> None:
+    """依次调用每个钩子的 method，钩子的异常只记录日志"""
+    for hook in hooks:
+        try:
+            getattr(hook, method)(event)
+        except Exception:
+            logger.exception(f"钩子 {hook!r}.{method} 执行失败")
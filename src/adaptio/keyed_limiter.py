@@ -0,0 +1,228 @@
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Coroutine, Hashable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from .adaptive_async_concurrency_limiter import (
+    AdaptiveAsyncConcurrencyLimiter,
+    ServiceOverloadError,
+)
+from .congestion_control import ConcurrencyController, ControllerName
+from .log_utils import setup_colored_logger
+
+
+@dataclass
+class _KeyEntry:
+    limiter: AdaptiveAsyncConcurrencyLimiter
+    last_used: float
+    # 正在通过 hold 持有该限制器的调用数（例如等待重试的调用）
+    holders: int = 0
+
+
+class KeyedAdaptiveLimiter:
+    """按 key（例如目标主机、租户）隔离的自适应并发限制器集合
+
+    每个 key 第一次出现时按需创建一个 AdaptiveAsyncConcurrencyLimiter，
+    不同 key 各自学习自己的并发上限，一个慢主机不会拖低其他主机的并发数。
+    所有 key 共享同一个 logger，因此 key 的数量不会导致 logger 泄漏。
+
+    空闲的 key 会被回收：
+    - 超过 max_keys 时按最近最少使用（LRU）的顺序回收
+    - 超过 idle_ttl_seconds 未被使用的 key 也会被回收
+    仍有任务在执行、或仍被 hold 持有（例如 with_adaptive_retry 两次重试之间）的 key 不会被回收；
+    被回收的限制器的定时检查任务会被取消。被回收的 key 学到的并发上限会被记住
+    （最多 remember_evicted 个），再次出现时以它作为初始并发数，而不是从头探测。
+
+    可以直接作为 with_adaptive_retry 的 scheduler 使用，此时用 key_func 从被装饰函数的参数中计算 key。
+
+    Args:
+        key_func: 从被装饰函数的参数计算 key 的函数，例如 lambda url, **kwargs: urlsplit(url).hostname
+        max_keys: 同时保留的 key 数量上限
+        idle_ttl_seconds: key 空闲多久后被回收（秒），None 表示只按 max_keys 回收
+        remember_evicted: 记住多少个已回收 key 的并发上限，0 表示不记住
+        max_concurrency: 每个 key 的最大并发数
+        min_concurrency: 每个 key 的最小并发数
+        initial_concurrency: 新 key 的初始并发数
+        adjust_overload_rate: 触发并发度调整的过载率阈值
+        overload_exception: 用于标识过载的异常类型
+        controller: 每个 key 使用的并发度控制算法，可以是内置算法名称，
+            或者返回 ConcurrencyController 的工厂函数（控制算法有状态，不能在 key 之间共享）
+        latency_tolerance: controller="gradient" 时可容忍的延迟升高倍数
+        log_level: 日志级别
+        log_prefix: 日志前缀，每个 key 的日志前缀为 "{log_prefix}[{key}]"
+        clock: 单调时钟函数，默认为 time.monotonic
+        **limiter_kwargs: 传给每个 AdaptiveAsyncConcurrencyLimiter 的其他参数
+    """
+
+    def __init__(
+        self,
+        key_func: Callable[..., Hashable] | None = None,
+        max_keys: int = 1024,
+        idle_ttl_seconds: float | None = 300,
+        remember_evicted: int = 4096,
+        max_concurrency: int = 256,
+        min_concurrency: int = 1,
+        initial_concurrency: int = 1,
+        adjust_overload_rate: float = 0.1,
+        overload_exception: type[BaseException] = ServiceOverloadError,
+        controller: ControllerName | Callable[[], ConcurrencyController] = "aimd",
+        latency_tolerance: float = 1.5,
+        log_level: str = "INFO",
+        log_prefix: str = "",
+        clock: Callable[[], float] = time.monotonic,
+        **limiter_kwargs: Any,
+    ):
+        if max_keys < 1:
+            raise ValueError(f"{log_prefix} -- {max_keys=} 不能小于 1")
+        if not min_concurrency <= initial_concurrency <= max_concurrency:
+            raise ValueError(
+                f"{log_prefix} -- {initial_concurrency=} 必须在 "
+                f"[{min_concurrency=}, {max_concurrency=}] 区间内"
+            )
+
+        self.key_func = key_func
+        self.max_keys = max_keys
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.remember_evicted = remember_evicted
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.initial_concurrency = initial_concurrency
+        self.adjust_overload_rate = adjust_overload_rate
+        self.overload_exception = overload_exception
+        self.controller = controller
+        self.latency_tolerance = latency_tolerance
+        self.log_prefix = log_prefix
+        self.limiter_kwargs = limiter_kwargs
+        self._clock = clock
+
+        self.logger = setup_colored_logger(
+            logger_name=f"keyed_scheduler_{id(self)}",
+            log_level=log_level,
+        )
+
+        self._entries: OrderedDict[Hashable, _KeyEntry] = OrderedDict()
+        self._remembered_limits: OrderedDict[Hashable, int] = OrderedDict()
+        self.evicted_count = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> AdaptiveAsyncConcurrencyLimiter:
+        """获取 key 对应的限制器，不存在时创建"""
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.last_used = now
+            self._entries.move_to_end(key)
+            return entry.limiter
+
+        limiter = self._create_limiter(key)
+        self._entries[key] = _KeyEntry(limiter, now)
+        self._evict(now, keep=key)
+        return limiter
+
+    def for_call(self, *args: Any, **kwargs: Any) -> AdaptiveAsyncConcurrencyLimiter:
+        """用 key_func 从调用参数计算 key 并返回对应的限制器"""
+        if self.key_func is None:
+            raise ValueError(
+                f"{self.log_prefix} -- 未设置 key_func，无法根据调用参数确定 key"
+            )
+        return self.get(self.key_func(*args, **kwargs))
+
+    @contextlib.contextmanager
+    def hold(self, key: Hashable) -> Iterator[AdaptiveAsyncConcurrencyLimiter]:
+        """在 with 块内持有 key 对应的限制器，期间即使没有在执行的任务也不会被回收"""
+        limiter = self.get(key)
+        entry = self._entries[key]
+        entry.holders += 1
+        try:
+            yield limiter
+        finally:
+            entry.holders -= 1
+            entry.last_used = self._clock()
+
+    def hold_for_call(
+        self, *args: Any, **kwargs: Any
+    ) -> contextlib.AbstractContextManager[AdaptiveAsyncConcurrencyLimiter]:
+        """用 key_func 从调用参数计算 key 并持有对应的限制器"""
+        if self.key_func is None:
+            raise ValueError(
+                f"{self.log_prefix} -- 未设置 key_func，无法根据调用参数确定 key"
+            )
+        return self.hold(self.key_func(*args, **kwargs))
+
+    def submit(self, coro: Coroutine, key: Hashable, priority: int = 0):
+        """把 coro 提交给 key 对应的限制器"""
+        return self.get(key).submit(coro, priority=priority)
+
+    def _create_limiter(self, key: Hashable) -> AdaptiveAsyncConcurrencyLimiter:
+        initial_concurrency = self._remembered_limits.pop(key, self.initial_concurrency)
+        initial_concurrency = max(
+            self.min_concurrency, min(self.max_concurrency, initial_concurrency)
+        )
+        return AdaptiveAsyncConcurrencyLimiter(
+            max_concurrency=self.max_concurrency,
+            min_concurrency=self.min_concurrency,
+            initial_concurrency=initial_concurrency,
+            adjust_overload_rate=self.adjust_overload_rate,
+            overload_exception=self.overload_exception,
+            controller=(
+                self.controller
+                if isinstance(self.controller, str)
+                else self.controller()
+            ),
+            latency_tolerance=self.latency_tolerance,
+            log_prefix=f"{self.log_prefix}[{key}]",
+            logger=self.logger,
+            **self.limiter_kwargs,
+        )
+
+    @staticmethod
+    def _is_idle(entry: _KeyEntry) -> bool:
+        limiter = entry.limiter
+        return (
+            not entry.holders
+            and not limiter.submitted_tasks
+            and not limiter.pending_count
+        )
+
+    def _evict(self, now: float, keep: Hashable) -> None:
+        """回收过期和超出数量上限的空闲 key，按最近使用时间从旧到新检查"""
+        expired_before = (
+            None if self.idle_ttl_seconds is None else now - self.idle_ttl_seconds
+        )
+        remaining = len(self._entries)
+        evicted_keys = []
+        for key, entry in self._entries.items():
+            over_capacity = remaining > self.max_keys
+            expired = expired_before is not None and entry.last_used < expired_before
+            if key == keep or (not over_capacity and not expired):
+                break
+            if self._is_idle(entry):
+                evicted_keys.append(key)
+                remaining -= 1
+        for key in evicted_keys:
+            self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        entry.limiter._stop_control_task()
+        self.evicted_count += 1
+        if self.remember_evicted <= 0:
+            return
+        self._remembered_limits[key] = entry.limiter.workers_lock.initial_value
+        self._remembered_limits.move_to_end(key)
+        while len(self._remembered_limits) > self.remember_evicted:
+            self._remembered_limits.popitem(last=False)
+
+    async def shutdown(self):
+        """关闭所有 key 的限制器，等待所有任务完成"""
+        limiters = [entry.limiter for entry in self._entries.values()]
+        await asyncio.gather(*(limiter.shutdown() for limiter in limiters))
+        self._entries.clear()
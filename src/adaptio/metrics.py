@@ -0,0 +1,218 @@
+import math
+from bisect import bisect_left
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .adaptive_async_concurrency_limiter import AdaptiveAsyncConcurrencyLimiter
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+
+
+class Histogram:
+    """固定分桶的直方图，observe 只做一次二分查找和两次加法
+
+    Args:
+        buckets: 各个桶的上界（秒），最后自动追加 +Inf 桶
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS):
+        self.bounds = sorted(buckets)
+        if not self.bounds:
+            raise ValueError("buckets 不能为空")
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list[tuple[float, int]]:
+        """(上界, 不超过该上界的观测数) 列表，最后一项的上界为 +Inf"""
+        result = []
+        total = 0
+        for bound, count in zip([*self.bounds, math.inf], self.counts, strict=True):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> float | None:
+        """按桶内线性插值估算分位数，没有观测时返回 None"""
+        if not 0 <= q <= 1:
+            raise ValueError(f"{q=} 必须在 [0, 1] 区间内")
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        lower = 0.0
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts, strict=False):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        # 落在 +Inf 桶中，只能给出最大的有限上界
+        return self.bounds[-1]
+
+
+class LimiterMetrics:
+    """AdaptiveAsyncConcurrencyLimiter 的累计指标，不会随统计窗口清零
+
+    Args:
+        latency_buckets: 调用延迟直方图的分桶上界（秒）
+        queue_wait_buckets: 排队等待名额时间直方图的分桶上界（秒）
+    """
+
+    def __init__(
+        self,
+        latency_buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+        queue_wait_buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        self.submitted_total = 0
+        self.succeed_total = 0
+        self.overload_total = 0
+        self.failed_total = 0
+        self.cancelled_total = 0
+        self.rejected_total = 0
+        self.limit_increase_total = 0
+        self.limit_decrease_total = 0
+        self.latency = Histogram(latency_buckets)
+        self.queue_wait = Histogram(queue_wait_buckets)
+
+
+@dataclass(frozen=True)
+class LimiterStats:
+    """限制器某一时刻的状态快照
+
+    Args:
+        current_limit: 当前的并发上限
+        in_flight: 正在执行的调用数
+        queue_depth: 等待名额的调用数（包括 asubmit 等待队列中的调用）
+        submitted_total: 累计提交的调用数
+        succeed_total: 累计成功的调用数
+        overload_total: 累计触发过载异常的调用数
+        failed_total: 累计因其他异常失败的调用数
+        cancelled_total: 累计执行中被取消的调用数
+        rejected_total: 累计被熔断器拒绝的调用数
+        limit_increase_total: 累计提高并发上限的次数
+        limit_decrease_total: 累计降低并发上限的次数
+        latency_p50: 调用延迟的 p50 估计值（秒），没有完成的调用时为 None
+        latency_p99: 调用延迟的 p99 估计值（秒）
+        queue_wait_p50: 排队等待名额时间的 p50 估计值（秒）
+        queue_wait_p99: 排队等待名额时间的 p99 估计值（秒）
+    """
+
+    current_limit: int
+    in_flight: int
+    queue_depth: int
+    submitted_total: int
+    succeed_total: int
+    overload_total: int
+    failed_total: int
+    cancelled_total: int
+    rejected_total: int
+    limit_increase_total: int
+    limit_decrease_total: int
+    latency_p50: float | None
+    latency_p99: float | None
+    queue_wait_p50: float | None
+    queue_wait_p99: float | None
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+def render_prometheus(
+    limiters: Mapping[str, "AdaptiveAsyncConcurrencyLimiter"],
+    namespace: str = "adaptio",
+    openmetrics: bool = False,
+) -> str:
+    """把限制器的指标渲染为 Prometheus 文本格式，不依赖 prometheus_client
+
+    Args:
+        limiters: 名称到限制器的映射，名称作为 limiter 标签的值
+        namespace: 指标名前缀
+        openmetrics: 是否输出 OpenMetrics 格式（计数器的 TYPE 行不带 _total 后缀，末尾有 # EOF）
+    """
+    lines: list[str] = []
+    snapshots = [
+        (f'limiter="{_escape_label(name)}"', limiter, limiter.stats())
+        for name, limiter in limiters.items()
+    ]
+
+    def family(name: str, kind: str, help_text: str) -> str:
+        full_name = f"{namespace}_{name}"
+        type_name = (
+            full_name.removesuffix("_total")
+            if openmetrics and kind == "counter"
+            else full_name
+        )
+        lines.append(f"# HELP {type_name} {help_text}")
+        lines.append(f"# TYPE {type_name} {kind}")
+        return full_name
+
+    name = family("concurrency_limit", "gauge", "Current adaptive concurrency limit.")
+    lines.extend(f"{name}{{{lb}}} {s.current_limit}" for lb, _, s in snapshots)
+    name = family("in_flight", "gauge", "Calls currently executing.")
+    lines.extend(f"{name}{{{lb}}} {s.in_flight}" for lb, _, s in snapshots)
+    name = family("queue_depth", "gauge", "Calls waiting for a permit.")
+    lines.extend(f"{name}{{{lb}}} {s.queue_depth}" for lb, _, s in snapshots)
+
+    name = family("submitted_total", "counter", "Calls submitted to the limiter.")
+    lines.extend(f"{name}{{{lb}}} {s.submitted_total}" for lb, _, s in snapshots)
+    name = family("calls_total", "counter", "Finished calls by outcome.")
+    for lb, _, s in snapshots:
+        for outcome, value in (
+            ("succeed", s.succeed_total),
+            ("overload", s.overload_total),
+            ("failed", s.failed_total),
+            ("cancelled", s.cancelled_total),
+            ("rejected", s.rejected_total),
+        ):
+            lines.append(f'{name}{{{lb},outcome="{outcome}"}} {value}')
+    name = family(
+        "limit_adjustments_total", "counter", "Concurrency limit changes by direction."
+    )
+    for lb, _, s in snapshots:
+        lines.append(f'{name}{{{lb},direction="increase"}} {s.limit_increase_total}')
+        lines.append(f'{name}{{{lb},direction="decrease"}} {s.limit_decrease_total}')
+
+    for metric, attr, help_text in (
+        ("call_latency_seconds", "latency", "Latency of executed calls."),
+        ("queue_wait_seconds", "queue_wait", "Time spent waiting for a permit."),
+    ):
+        name = family(metric, "histogram", help_text)
+        for lb, limiter, _ in snapshots:
+            histogram: Histogram = getattr(limiter.metrics, attr)
+            for bound, count in histogram.cumulative_counts():
+                lines.append(
+                    f'{name}_bucket{{{lb},le="{_format_bound(bound)}"}} {count}'
+                )
+            lines.append(f"{name}_sum{{{lb}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{lb}}} {histogram.count}")
+
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
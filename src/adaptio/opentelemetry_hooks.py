@@ -0,0 +1,82 @@
+from typing import Any
+
+from .hooks import AdjustEvent, LimiterHooks, RetryEvent, TaskTrace
+
+_SPAN_KEY = "otel_span"
+
+
+class OpenTelemetryHooks(LimiterHooks):
+    """把限制器的插桩事件转换为 OpenTelemetry span
+
+    每次调用对应一个 span，从提交开始到结束为止，父 span 为提交时的当前 span；
+    获得名额时记录一个事件，结束时把排队、等待和执行时间以及结果写入 span 属性。
+    重试和并发上限调整作为事件记录在当前 span 上。需要安装 opentelemetry-api。
+
+    Args:
+        tracer: 使用的 Tracer，默认为 trace.get_tracer("adaptio")
+        span_name: 每次调用的 span 名称
+    """
+
+    def __init__(self, tracer: Any = None, span_name: str = "adaptio.task"):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetryHooks 需要安装 opentelemetry-api: pip install adaptio[otel]"
+            ) from e
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("adaptio")
+        self.span_name = span_name
+
+    def on_enqueue(self, trace: TaskTrace) -> None:
+        trace.data[_SPAN_KEY] = self.tracer.start_span(
+            self.span_name,
+            attributes={
+                "adaptio.limiter": trace.limiter.log_prefix,
+                "adaptio.priority": trace.priority,
+            },
+        )
+
+    def on_acquire(self, trace: TaskTrace) -> None:
+        span = trace.data.get(_SPAN_KEY)
+        if span is not None and trace.queue_wait is not None:
+            span.add_event("adaptio.acquired", {"adaptio.queue_wait": trace.queue_wait})
+
+    def on_complete(self, trace: TaskTrace) -> None:
+        span = trace.data.pop(_SPAN_KEY, None)
+        if span is None:
+            return
+        attributes: dict[str, Any] = {"adaptio.outcome": trace.outcome or "unknown"}
+        for name in ("queue_wait", "admission_wait", "service_time"):
+            value = getattr(trace, name)
+            if value is not None:
+                attributes[f"adaptio.{name}"] = value
+        span.set_attributes(attributes)
+        if trace.outcome in ("overload", "failed", "rejected") and trace.error:
+            span.record_exception(trace.error)
+            span.set_status(
+                self._trace.Status(self._trace.StatusCode.ERROR, repr(trace.error))
+            )
+        span.end()
+
+    def on_retry(self, event: RetryEvent) -> None:
+        self._trace.get_current_span().add_event(
+            "adaptio.retry",
+            {
+                "adaptio.function": event.function,
+                "adaptio.attempt": event.attempt,
+                "adaptio.delay": event.delay,
+                "adaptio.error": repr(event.error),
+            },
+        )
+
+    def on_adjust(self, event: AdjustEvent) -> None:
+        self._trace.get_current_span().add_event(
+            "adaptio.limit_adjusted",
+            {
+                "adaptio.limiter": event.limiter.log_prefix,
+                "adaptio.old_limit": event.old_limit,
+                "adaptio.new_limit": event.new_limit,
+                "adaptio.overload_rate": event.sample.overload_rate,
+            },
+        )
@@ -1,5 +1,8 @@
 import functools
+import math
+import time
 from collections.abc import Callable, Coroutine
+from email.utils import parsedate_to_datetime
 from typing import Any, TypeVar
 
 import aiohttp
@@ -7,19 +10,54 @@ import aiohttp
 from .adaptive_async_concurrency_limiter import ServiceOverloadError
 
 OVERLOAD_STATUS_CODES = (503, 429)
+MAX_RETRY_AFTER_SECONDS = 60.0
 
 T = TypeVar("T")
 
 
+def parse_retry_after(
+    value: str | None, max_seconds: float = MAX_RETRY_AFTER_SECONDS
+) -> float | None:
+    """解析 HTTP Retry-After 头，支持秒数和 HTTP 日期两种格式
+
+    Args:
+        value: Retry-After 头的值
+        max_seconds: 等待时间的上限，避免异常的头（如 "inf" 或很远的日期）让调用无限期暂停
+
+    Returns:
+        需要等待的秒数（不超过 max_seconds），无法解析时返回 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = retry_at.timestamp() - time.time()
+    if math.isnan(seconds):
+        return None
+    return min(max(0.0, seconds), max_seconds)
+
+
 def raise_on_aiohttp_overload(
     overload_status_codes: tuple[int, ...] = OVERLOAD_STATUS_CODES,
+    max_retry_after: float = MAX_RETRY_AFTER_SECONDS,
 ) -> Callable[
     [Callable[..., Coroutine[Any, Any, T]]], Callable[..., Coroutine[Any, Any, T]]
 ]:
     """将 aiohttp 的特定状态码错误转换为 ServiceOverloadError。
 
+    如果响应带有 Retry-After 头，会解析为 ServiceOverloadError.retry_after，
+    with_adaptive_retry 重试前至少会等待这么长时间。
+
     Args:
         overload_status_codes: 要视为过载的 HTTP 状态码元组，默认为 (503, 429)
+        max_retry_after: Retry-After 解析结果的上限（秒），默认与 with_adaptive_retry 的
+            max_retry_interval_seconds 一致，为 60
 
     Returns:
         装饰器函数，用于包装异步函数
@@ -38,7 +76,11 @@ def raise_on_aiohttp_overload(
                 return await func(*args, **kwargs)
             except aiohttp.ClientResponseError as e:
                 if e.status in overload_status_codes:
-                    raise ServiceOverloadError(e) from e
+                    retry_after = parse_retry_after(
+                        e.headers.get("Retry-After") if e.headers else None,
+                        max_retry_after,
+                    )
+                    raise ServiceOverloadError(e, retry_after=retry_after) from e
                 raise e
 
         return wrapper
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Coroutine, Hashable
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Any, TypeVar
+
+from .adaptive_async_concurrency_limiter import ServiceOverloadError
+from .circuit_breaker import CircuitOpenError
+
+R = TypeVar("R")
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    error: BaseException | None
+    traceback: TracebackType | None
+    expires_at: float
+    stale_until: float
+    refreshing: bool = False
+
+    def result(self) -> Any:
+        if self.error is not None:
+            # 恢复原始 traceback，避免每次命中都在同一个异常对象上追加栈帧
+            raise self.error.with_traceback(self.traceback)
+        return self.value
+
+
+class ResultCache:
+    """被装饰函数的结果缓存，有 TTL 且按最近最少使用（LRU）限制条目数
+
+    与 with_adaptive_retry 一起使用时，缓存位于限制器之前：命中缓存的调用直接返回，
+    不占用并发名额，也不计入限制器的统计，并发名额只留给未命中的调用。
+
+    - 结果在 ttl_seconds 内有效；stale_seconds > 0 时，过期后的 stale_seconds 内仍先返回旧结果，
+      同时在后台刷新（每个 key 同一时刻只有一次刷新，刷新失败时保留旧结果）
+    - error_ttl_seconds > 0 时，非过载异常也会被缓存这么久（负缓存），命中时抛出同一个异常
+    - 过载异常（ServiceOverloadError 与限制器的 overload_exception）、CircuitOpenError
+      与取消永远不会被缓存
+
+    并发的未命中调用会各自执行，需要合并时可以同时使用 SingleFlight。
+    同一个 ResultCache 可以被多个被装饰的函数共享，不同函数的结果不会混用。
+
+    Args:
+        ttl_seconds: 结果的有效期（秒）
+        max_entries: 最多缓存的条目数，超出时淘汰最近最少使用的条目
+        stale_seconds: 过期后仍可返回旧结果并在后台刷新的时长（秒），0 表示不启用
+        error_ttl_seconds: 非过载异常的缓存时长（秒），0 表示不缓存异常
+        key_func: 从被装饰函数的参数计算 key 的函数，
+            None 表示用全部位置参数与关键字参数作为 key，参数不可哈希时该次调用不使用缓存
+        clock: 单调时钟函数，默认为 time.monotonic
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int = 1024,
+        stale_seconds: float = 0,
+        error_ttl_seconds: float = 0,
+        key_func: Callable[..., Hashable] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if ttl_seconds <= 0:
+            raise ValueError(f"{ttl_seconds=} 必须大于 0")
+        if max_entries < 1:
+            raise ValueError(f"{max_entries=} 不能小于 1")
+        if stale_seconds < 0 or error_ttl_seconds < 0:
+            raise ValueError(f"{stale_seconds=} 与 {error_ttl_seconds=} 不能为负数")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self.error_ttl_seconds = error_ttl_seconds
+        self.key_func = key_func
+        self._clock = clock
+        self.hit_total = 0
+        self.stale_hit_total = 0
+        self.miss_total = 0
+        self.refresh_failed_total = 0
+        self._entries: OrderedDict[Hashable, _CacheEntry] = OrderedDict()
+        self._refresh_tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, *args: Any, **kwargs: Any) -> Hashable | None:
+        """计算调用的 key，参数不可哈希时返回 None"""
+        if self.key_func is not None:
+            return self.key_func(*args, **kwargs)
+        key = (args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def clear(self) -> None:
+        """丢弃全部缓存条目"""
+        self._entries.clear()
+
+    async def get_or_call(
+        self,
+        key: Hashable,
+        call: Callable[[], Coroutine[Any, Any, R]],
+        overload_exception: type[BaseException] = ServiceOverloadError,
+    ) -> R:
+        """命中缓存时直接返回（或抛出缓存的异常），否则执行 call() 并缓存结果
+
+        Args:
+            key: 缓存 key
+            call: 未命中时执行的调用
+            overload_exception: 不应被缓存的过载异常类型
+        """
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now < entry.expires_at:
+                self.hit_total += 1
+                self._entries.move_to_end(key)
+                return entry.result()
+            if now < entry.stale_until:
+                self.stale_hit_total += 1
+                self._entries.move_to_end(key)
+                if not entry.refreshing:
+                    entry.refreshing = True
+                    task = asyncio.get_running_loop().create_task(
+                        self._refresh(key, entry, call, overload_exception)
+                    )
+                    # 持有后台任务的引用，避免被垃圾回收
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(self._refresh_tasks.discard)
+                return entry.result()
+            del self._entries[key]
+
+        self.miss_total += 1
+        try:
+            value = await call()
+        except (Exception, ServiceOverloadError, overload_exception) as e:
+            # 过载异常可能继承自 BaseException，同样要捕获，但不缓存
+            if (
+                self.error_ttl_seconds
+                and isinstance(e, Exception)
+                and not isinstance(
+                    e, (ServiceOverloadError, CircuitOpenError, overload_exception)
+                )
+            ):
+                expires_at = self._clock() + self.error_ttl_seconds
+                self._store(
+                    key, _CacheEntry(None, e, e.__traceback__, expires_at, expires_at)
+                )
+            raise
+        self._store_value(key, value)
+        return value
+
+    async def _refresh(
+        self,
+        key: Hashable,
+        entry: _CacheEntry,
+        call: Callable[[], Coroutine[Any, Any, Any]],
+        overload_exception: type[BaseException],
+    ) -> None:
+        try:
+            value = await call()
+        except (Exception, ServiceOverloadError, overload_exception):
+            # 保留旧结果，之后的命中会再次尝试刷新
+            self.refresh_failed_total += 1
+            return
+        finally:
+            entry.refreshing = False
+        self._store_value(key, value)
+
+    def _store_value(self, key: Hashable, value: Any) -> None:
+        expires_at = self._clock() + self.ttl_seconds
+        self._store(
+            key,
+            _CacheEntry(value, None, None, expires_at, expires_at + self.stale_seconds),
+        )
+
+    def _store(self, key: Hashable, entry: _CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,386 @@
+import asyncio
+import contextlib
+import math
+import os
+import struct
+import tempfile
+import time
+from collections.abc import Coroutine
+from multiprocessing import resource_tracker, shared_memory
+
+from .adaptive_async_concurrency_limiter import ServiceOverloadError
+from .congestion_control import (
+    ConcurrencyController,
+    ControllerName,
+    WindowSample,
+    create_controller,
+)
+from .log_utils import setup_colored_logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+_MAGIC = 0x414441505449  # "ADAPTI"
+# magic, limit, in_flight, finished, succeed, overload, failed, latency_sum, min_latency
+_HEADER = struct.Struct("<qqqqqqqdd")
+# pid, in_flight
+_SLOT = struct.Struct("<qq")
+(
+    _F_MAGIC,
+    _F_LIMIT,
+    _F_IN_FLIGHT,
+    _F_FINISHED,
+    _F_SUCCEED,
+    _F_OVERLOAD,
+    _F_FAILED,
+    _F_LATENCY_SUM,
+    _F_MIN_LATENCY,
+) = range(9)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedMemoryLimiter:
+    """同一台机器上多个进程共享的自适应并发限制器
+
+    当前并发上限、在途调用数和本轮统计计数器保存在 multiprocessing.shared_memory 中，
+    所有使用相同 name 的进程（例如 gunicorn / uvicorn 的多个 worker）共享同一个自适应并发上限，
+    不需要任何外部服务。读写共享状态时通过 fcntl.flock 文件锁保证原子性，因此只支持 POSIX 系统。
+
+    - 进程之间没有唤醒通知，名额已满时以 poll_interval_seconds 为间隔轮询
+    - 每个进程在共享内存中占用一个槽位，记录自己的在途调用数；
+      进程异常退出后，它占用的名额会在其他进程获取名额失败时被回收
+    - 并发度控制算法的状态保存在各进程内，由完成这一轮调用的进程负责调整共享的并发上限
+
+    它可以直接作为 with_adaptive_retry 的 scheduler 使用。共享内存不会随进程退出而删除，
+    需要时调用 unlink() 清理。
+
+    Args:
+        name: 共享状态的名称，使用相同名称的限制器共享同一个并发上限
+        max_concurrency: 最大允许的并发数
+        min_concurrency: 最小允许的并发数
+        initial_concurrency: 初始并发数（只在第一个创建共享状态的进程中生效）
+        adjust_overload_rate: 触发并发度调整的过载率阈值
+        overload_exception: 用于标识过载的异常类型
+        controller: 并发度控制算法，与 AdaptiveAsyncConcurrencyLimiter 的同名参数一致
+        latency_tolerance: controller="gradient" 时可容忍的延迟升高倍数
+        max_processes: 共享同一个限制器的最大进程数
+        poll_interval_seconds: 名额已满时的轮询间隔（秒）
+        log_level: 日志级别
+        log_prefix: 日志前缀
+
+    Raises:
+        RuntimeError: 当前系统不支持 fcntl 或进程槽位已满时抛出
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 256,
+        min_concurrency: int = 1,
+        initial_concurrency: int = 1,
+        adjust_overload_rate: float = 0.1,
+        overload_exception: type[BaseException] = ServiceOverloadError,
+        controller: ControllerName | ConcurrencyController = "aimd",
+        latency_tolerance: float = 1.5,
+        max_processes: int = 64,
+        poll_interval_seconds: float = 0.005,
+        log_level: str = "INFO",
+        log_prefix: str = "",
+    ):
+        if fcntl is None:
+            raise RuntimeError("SharedMemoryLimiter 依赖 fcntl，仅支持 POSIX 系统")
+        if not min_concurrency <= initial_concurrency <= max_concurrency:
+            raise ValueError(
+                f"{log_prefix} -- {initial_concurrency=} 必须在 "
+                f"[{min_concurrency=}, {max_concurrency=}] 区间内"
+            )
+
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.adjust_overload_rate = adjust_overload_rate
+        self.overload_exception = overload_exception
+        self.controller = (
+            create_controller(controller, latency_tolerance=latency_tolerance)
+            if isinstance(controller, str)
+            else controller
+        )
+        self.max_processes = max_processes
+        self.poll_interval_seconds = poll_interval_seconds
+        self.log_prefix = log_prefix
+
+        self.logger = setup_colored_logger(
+            logger_name=f"shm_scheduler_{id(self)}",
+            log_level=log_level,
+        )
+
+        self.submitted_tasks: set[asyncio.Future] = set()
+        self._lock_path = os.path.join(tempfile.gettempdir(), f"adaptio-{name}.lock")
+        self._lock_fd = -1
+        self._lock_fd_pid = 0
+        size = _HEADER.size + _SLOT.size * max_processes
+        with self._locked():
+            self._shm = self._open_shared_memory(size)
+            if self._get(_F_MAGIC) != _MAGIC:
+                self._shm.buf[:size] = bytes(size)
+                self._set(_F_LIMIT, initial_concurrency)
+                self._set(_F_MIN_LATENCY, math.inf)
+                self._set(_F_MAGIC, _MAGIC)
+            self._pid = os.getpid()
+            self._slot = self._claim_slot()
+        self._last_sweep = 0.0
+
+    def _open_shared_memory(self, size: int) -> shared_memory.SharedMemory:
+        shm_name = f"adaptio-{self.name}"
+        try:
+            shm = shared_memory.SharedMemory(name=shm_name, create=True, size=size)
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            if shm.size < size:
+                shm.close()
+                raise ValueError(
+                    f"{self.log_prefix} -- 共享状态 {shm_name} 已存在，"
+                    f"但大小不足，请使用相同的 max_processes"
+                ) from None
+        # 共享状态属于所有进程，不能在某个进程退出时被 resource_tracker 删除
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+        return shm
+
+    def _locked(self) -> "_FileLock":
+        # fork 出的子进程与父进程共享同一个打开的文件，flock 无法互斥，需要重新打开
+        if self._lock_fd_pid != os.getpid():
+            self._lock_fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._lock_fd_pid = os.getpid()
+        return _FileLock(self._lock_fd)
+
+    def _offset(self, field: int) -> int:
+        return field * 8
+
+    def _get(self, field: int):
+        fmt = "<d" if field >= _F_LATENCY_SUM else "<q"
+        return struct.unpack_from(fmt, self._shm.buf, self._offset(field))[0]
+
+    def _set(self, field: int, value) -> None:
+        fmt = "<d" if field >= _F_LATENCY_SUM else "<q"
+        struct.pack_into(fmt, self._shm.buf, self._offset(field), value)
+
+    def _add(self, field: int, delta) -> None:
+        self._set(field, self._get(field) + delta)
+
+    def _slot_offset(self, slot: int) -> int:
+        return _HEADER.size + slot * _SLOT.size
+
+    def _read_slot(self, slot: int) -> tuple[int, int]:
+        return _SLOT.unpack_from(self._shm.buf, self._slot_offset(slot))
+
+    def _write_slot(self, slot: int, pid: int, in_flight: int) -> None:
+        _SLOT.pack_into(self._shm.buf, self._slot_offset(slot), pid, in_flight)
+
+    def _claim_slot(self) -> int:
+        """为当前进程占用一个槽位，优先复用空槽位和已退出进程的槽位"""
+        free_slot = None
+        for slot in range(self.max_processes):
+            pid, in_flight = self._read_slot(slot)
+            if pid == self._pid:
+                return slot
+            if free_slot is None and (pid == 0 or not _pid_alive(pid)):
+                free_slot = slot
+        if free_slot is None:
+            raise RuntimeError(
+                f"{self.log_prefix} -- 共享限制器 {self.name} 的进程槽位已满（{self.max_processes}）"
+            )
+        self._reclaim(free_slot)
+        self._write_slot(free_slot, self._pid, 0)
+        return free_slot
+
+    def _reclaim(self, slot: int) -> None:
+        pid, in_flight = self._read_slot(slot)
+        if in_flight:
+            self._add(_F_IN_FLIGHT, -in_flight)
+            self.logger.warning(
+                f"{self.log_prefix} -- 回收已退出进程 {pid} 占用的 {in_flight} 个名额"
+            )
+        self._write_slot(slot, 0, 0)
+
+    def _sweep_dead_processes(self) -> None:
+        for slot in range(self.max_processes):
+            pid, _ = self._read_slot(slot)
+            if pid and pid != self._pid and not _pid_alive(pid):
+                self._reclaim(slot)
+
+    @property
+    def current_concurrency(self) -> int:
+        """所有进程共享的当前并发上限"""
+        return self._get(_F_LIMIT)
+
+    @property
+    def running_count(self) -> int:
+        """所有进程的在途调用数"""
+        return self._get(_F_IN_FLIGHT)
+
+    def try_acquire(self) -> bool:
+        """尝试立即获取一个名额"""
+        with self._locked():
+            if os.getpid() != self._pid:
+                # fork 之后的子进程需要自己的槽位
+                self._pid = os.getpid()
+                self._slot = self._claim_slot()
+            if self._get(_F_IN_FLIGHT) >= self._get(_F_LIMIT):
+                now = time.monotonic()
+                if now - self._last_sweep < 1:
+                    return False
+                self._last_sweep = now
+                self._sweep_dead_processes()
+                if self._get(_F_IN_FLIGHT) >= self._get(_F_LIMIT):
+                    return False
+            self._add(_F_IN_FLIGHT, 1)
+            pid, in_flight = self._read_slot(self._slot)
+            self._write_slot(self._slot, pid, in_flight + 1)
+            return True
+
+    async def acquire(self) -> bool:
+        """获取名额，名额已满时轮询等待"""
+        while not self.try_acquire():
+            await asyncio.sleep(self.poll_interval_seconds)
+        return True
+
+    def release(self, outcome: str | None = None, latency: float | None = None) -> None:
+        """归还名额，并把调用结果（"succeed" / "overload" / "failed"）计入共享统计"""
+        with self._locked():
+            self._add(_F_IN_FLIGHT, -1)
+            pid, in_flight = self._read_slot(self._slot)
+            self._write_slot(self._slot, pid, max(0, in_flight - 1))
+            if outcome is None:
+                return
+            self._add(_F_FINISHED, 1)
+            if outcome == "succeed":
+                self._add(_F_SUCCEED, 1)
+                if latency is not None:
+                    self._add(_F_LATENCY_SUM, latency)
+                    if latency < self._get(_F_MIN_LATENCY):
+                        self._set(_F_MIN_LATENCY, latency)
+            elif outcome == "overload":
+                self._add(_F_OVERLOAD, 1)
+            else:
+                self._add(_F_FAILED, 1)
+            if self._get(_F_FINISHED) > self._get(_F_LIMIT):
+                self._adjust_concurrency()
+                self._reset_counters()
+
+    def _reset_counters(self) -> None:
+        for field in (_F_FINISHED, _F_SUCCEED, _F_OVERLOAD, _F_FAILED):
+            self._set(field, 0)
+        self._set(_F_LATENCY_SUM, 0.0)
+        self._set(_F_MIN_LATENCY, math.inf)
+
+    def window_sample(self) -> WindowSample:
+        """生成所有进程最近一轮调用的统计样本"""
+        finished = self._get(_F_FINISHED)
+        overload = self._get(_F_OVERLOAD)
+        min_latency = self._get(_F_MIN_LATENCY)
+        return WindowSample(
+            current_limit=self._get(_F_LIMIT),
+            finished_count=finished,
+            succeed_count=self._get(_F_SUCCEED),
+            overload_count=overload,
+            failed_count=self._get(_F_FAILED),
+            running_count=self._get(_F_IN_FLIGHT),
+            latency_sum=self._get(_F_LATENCY_SUM),
+            min_latency=None if min_latency == math.inf else min_latency,
+            overloaded=finished > 0 and overload / finished > self.adjust_overload_rate,
+            timestamp=time.monotonic(),
+        )
+
+    def _adjust_concurrency(self) -> None:
+        sample = self.window_sample()
+        new_concurrency = max(
+            self.min_concurrency,
+            min(self.max_concurrency, int(self.controller.next_limit(sample))),
+        )
+        if sample.overloaded:
+            self.logger.info(
+                f"{self.log_prefix} -- 检测到过载，降低共享并发数至 {new_concurrency}"
+            )
+        elif new_concurrency != sample.current_limit:
+            self.logger.info(
+                f"{self.log_prefix} -- 系统运行正常，调整共享并发数从 {sample.current_limit} 到 {new_concurrency}"
+            )
+        self._set(_F_LIMIT, new_concurrency)
+
+    def submit(self, coro: Coroutine):
+        async def _task_wrapper():
+            try:
+                await self.acquire()
+            except asyncio.CancelledError:
+                coro.close()
+                raise
+            outcome = None
+            start_time = time.monotonic()
+            try:
+                result = await coro
+                outcome = "succeed"
+                return result
+            except self.overload_exception:
+                outcome = "overload"
+                raise
+            except Exception:
+                outcome = "failed"
+                raise
+            finally:
+                self.release(outcome, time.monotonic() - start_time)
+
+        def _on_done(task):
+            self.submitted_tasks.remove(task)
+
+        task = asyncio.create_task(_task_wrapper())
+        task.add_done_callback(_on_done)
+        self.submitted_tasks.add(task)
+        return task
+
+    async def shutdown(self):
+        """等待本进程提交的所有任务完成并释放槽位"""
+        if self.submitted_tasks:
+            await asyncio.gather(*self.submitted_tasks, return_exceptions=True)
+        self.submitted_tasks.clear()
+        self.close()
+
+    def close(self) -> None:
+        """释放本进程的槽位并关闭共享内存映射，不影响其他进程"""
+        if self._shm.buf is None:
+            return
+        with self._locked():
+            if os.getpid() == self._pid:
+                self._reclaim(self._slot)
+        self._shm.close()
+        os.close(self._lock_fd)
+        self._lock_fd_pid = 0
+
+    def unlink(self) -> None:
+        """删除共享状态，之后新建的同名限制器会重新开始学习"""
+        with contextlib.suppress(FileNotFoundError):
+            shm = shared_memory.SharedMemory(name=f"adaptio-{self.name}")
+            shm.close()
+            shm.unlink()
+
+
+class _FileLock:
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+
+    def __enter__(self):
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
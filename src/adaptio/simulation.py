@@ -0,0 +1,464 @@
+import asyncio
+import json
+import math
+import random
+import selectors
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import asdict, dataclass, field
+from typing import Any, Protocol
+
+from .adaptive_async_concurrency_limiter import (
+    AdaptiveAsyncConcurrencyLimiter,
+    ServiceOverloadError,
+)
+
+
+class _VirtualTimeSelector(selectors.BaseSelector):
+    """把事件循环等待定时器的时间换成推进虚拟时钟
+
+    真实的 I/O 事件（例如 call_soon_threadsafe 的唤醒）仍然会被立即处理。
+    """
+
+    def __init__(self, selector: selectors.BaseSelector):
+        self._selector = selector
+        self.loop: VirtualTimeEventLoop | None = None
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def select(self, timeout=None):
+        if timeout is None:
+            # 没有任何定时器，只能等待真实的 I/O
+            return self._selector.select(None)
+        ready = self._selector.select(0)
+        if not ready and timeout > 0 and self.loop is not None:
+            self.loop.advance(timeout)
+        return ready
+
+    def close(self):
+        self._selector.close()
+
+    def get_map(self):
+        return self._selector.get_map()
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """使用虚拟时钟的事件循环
+
+    loop.time() 返回虚拟时间；没有就绪的回调时，事件循环不会真的睡眠，
+    而是把虚拟时钟直接推进到下一个定时器，因此 asyncio.sleep(3600) 瞬间完成。
+    限制器、with_adaptive_retry 和 AdjustableSemaphore 都使用 loop.time()，
+    可以不加修改地在其中运行；需要 clock 参数的组件（CircuitBreaker、TokenBucket 等）应传入 lambda: asyncio.get_running_loop().time()。
+    """
+
+    def __init__(self) -> None:
+        self._virtual_now = 0.0
+        selector = _VirtualTimeSelector(selectors.DefaultSelector())
+        super().__init__(selector)
+        selector.loop = self
+
+    def time(self) -> float:
+        return self._virtual_now
+
+    def advance(self, seconds: float) -> None:
+        """把虚拟时钟向前推进 seconds 秒"""
+        self._virtual_now += seconds
+
+
+class SimulatedBackend:
+    """容量有限的模拟后端
+
+    同时处理的请求数达到容量时立即抛出过载异常，否则按负载计算延迟：
+    base_latency * (1 + latency_slope * (in_flight / capacity) ** 2)，再乘以 [1 - jitter, 1 + jitter] 内的随机数。
+
+    Args:
+        capacity: 容量，或者以虚拟时间（秒）为参数返回容量的函数，见 step_schedule
+        base_latency: 空载时的延迟（秒）
+        latency_slope: 延迟随负载升高的幅度
+        jitter: 延迟的随机波动比例
+        rejection_latency: 拒绝请求所需的时间（秒）
+        retry_after: 过载异常携带的 retry_after（秒），None 表示不携带
+        overload_exception: 过载时抛出的异常类型，需要接受 retry_after 关键字参数
+        seed: 随机数种子
+    """
+
+    def __init__(
+        self,
+        capacity: int | Callable[[float], int],
+        base_latency: float = 0.05,
+        latency_slope: float = 1.0,
+        jitter: float = 0.2,
+        rejection_latency: float = 0.001,
+        retry_after: float | None = None,
+        overload_exception: type[ServiceOverloadError] = ServiceOverloadError,
+        seed: int = 0,
+    ):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.latency_slope = latency_slope
+        self.jitter = jitter
+        self.rejection_latency = rejection_latency
+        self.retry_after = retry_after
+        self.overload_exception = overload_exception
+        self.rng = random.Random(seed)
+        self.in_flight = 0
+        self.requests_total = 0
+        self.rejected_total = 0
+
+    def current_capacity(self) -> int:
+        if callable(self.capacity):
+            return self.capacity(asyncio.get_running_loop().time())
+        return self.capacity
+
+    async def call(self) -> None:
+        """处理一次请求"""
+        self.requests_total += 1
+        capacity = self.current_capacity()
+        if self.in_flight >= capacity:
+            self.rejected_total += 1
+            await asyncio.sleep(self.rejection_latency)
+            raise self.overload_exception(
+                "simulated overload", retry_after=self.retry_after
+            )
+        self.in_flight += 1
+        try:
+            load = self.in_flight / capacity
+            latency = self.base_latency * (1 + self.latency_slope * load**2)
+            await asyncio.sleep(
+                latency * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+            )
+        finally:
+            self.in_flight -= 1
+
+
+def step_schedule(steps: list[tuple[float, int]]) -> Callable[[float], int]:
+    """分段常数的容量计划，steps 为 (开始时间, 容量) 列表，按开始时间排序"""
+
+    def capacity(now: float) -> int:
+        current = steps[0][1]
+        for start, value in steps:
+            if now < start:
+                break
+            current = value
+        return current
+
+    return capacity
+
+
+class Workload(Protocol):
+    """负载模型：在 simulation.deadline 之前反复调用 simulation.call"""
+
+    async def run(self, simulation: "Simulation") -> None: ...
+
+
+class ClosedLoopWorkload:
+    """闭环负载：固定数量的调用方，每个调用方完成一次调用后等待 think_time 秒再发起下一次
+
+    Args:
+        callers: 调用方数量
+        think_time: 两次调用之间的等待时间（秒）
+    """
+
+    def __init__(self, callers: int, think_time: float = 0):
+        self.callers = callers
+        self.think_time = think_time
+
+    async def run(self, simulation: "Simulation") -> None:
+        loop = asyncio.get_running_loop()
+
+        async def caller() -> None:
+            while loop.time() < simulation.deadline:
+                await simulation.call()
+                if self.think_time:
+                    await asyncio.sleep(self.think_time)
+
+        await asyncio.gather(*(caller() for _ in range(self.callers)))
+
+
+class OpenLoopWorkload:
+    """开环负载：调用按泊松过程到达，不等待之前的调用完成
+
+    Args:
+        rate: 每秒到达的调用数，或者以虚拟时间（秒）为参数返回到达率的函数
+        seed: 随机数种子
+    """
+
+    def __init__(self, rate: float | Callable[[float], float], seed: int = 0):
+        self.rate = rate
+        self.rng = random.Random(seed)
+
+    async def run(self, simulation: "Simulation") -> None:
+        loop = asyncio.get_running_loop()
+        tasks: set[asyncio.Task] = set()
+        try:
+            while (now := loop.time()) < simulation.deadline:
+                rate = self.rate(now) if callable(self.rate) else self.rate
+                if rate <= 0:
+                    await asyncio.sleep(1)
+                    continue
+                await asyncio.sleep(self.rng.expovariate(rate))
+                task = asyncio.create_task(simulation.call())
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@dataclass
+class TracePoint:
+    """一次采样：虚拟时间和各个探针的取值"""
+
+    time: float
+    values: dict[str, float]
+
+
+@dataclass
+class SimulationResult:
+    """一次模拟的结果
+
+    Args:
+        duration: 模拟的虚拟时长（秒）
+        wall_seconds: 实际耗时（秒）
+        succeed_count: 调用方看到的成功调用数
+        failed_count: 调用方看到的失败调用数（包括重试耗尽）
+        backend_requests: 后端收到的请求数
+        backend_rejections: 后端拒绝的请求数
+        latencies: 成功调用的延迟（秒，含排队与重试）
+        trace: 按 sample_interval 采样的探针取值
+    """
+
+    duration: float
+    wall_seconds: float
+    succeed_count: int
+    failed_count: int
+    backend_requests: int
+    backend_rejections: int
+    latencies: list[float] = field(repr=False)
+    trace: list[TracePoint] = field(repr=False)
+
+    @property
+    def goodput(self) -> float:
+        """每秒虚拟时间成功完成的调用数"""
+        return self.succeed_count / self.duration
+
+    @property
+    def overload_ratio(self) -> float:
+        """后端请求中被拒绝的比例"""
+        if not self.backend_requests:
+            return 0.0
+        return self.backend_rejections / self.backend_requests
+
+    def latency_percentile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def series(self, name: str) -> list[tuple[float, float]]:
+        """某个探针随时间变化的序列 [(虚拟时间, 取值), ...]"""
+        return [(point.time, point.values[name]) for point in self.trace]
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        del data["latencies"]
+        data.update(
+            goodput=self.goodput,
+            overload_ratio=self.overload_ratio,
+            latency_p50=self.latency_percentile(0.5),
+            latency_p99=self.latency_percentile(0.99),
+        )
+        return json.dumps(data)
+
+
+def limiter_probes(
+    limiter: AdaptiveAsyncConcurrencyLimiter,
+) -> dict[str, Callable[[], float]]:
+    """常用的限制器探针：并发上限、执行中与排队中的调用数"""
+    return {
+        "limit": lambda: limiter.workers_lock.initial_value,
+        "in_flight": lambda: limiter.current_running_count,
+        "queue_depth": lambda: (
+            limiter.workers_lock.waiting_count + limiter.pending_count
+        ),
+    }
+
+
+class Simulation:
+    """在虚拟时间中驱动真实的限制器代码，可复现地模拟长时间的流量
+
+    Args:
+        call: 每次调用执行的函数，例如 lambda: limiter.submit(backend.call())
+            或被 with_adaptive_retry 装饰的 backend.call
+        backend: 模拟后端
+        workload: 负载模型
+        duration: 模拟的虚拟时长（秒）
+        probes: 需要采样的探针，名称到无参函数的映射，见 limiter_probes
+            后端的容量与执行中的请求数总会被采样（capacity、backend_in_flight）
+        sample_interval: 采样间隔（虚拟秒）
+        seed: 全局 random 的种子（退避策略的随机抖动使用全局 random）
+    """
+
+    def __init__(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        backend: SimulatedBackend,
+        workload: Workload,
+        duration: float,
+        probes: Mapping[str, Callable[[], float]] | None = None,
+        sample_interval: float = 1.0,
+        seed: int = 0,
+    ):
+        self._call = call
+        self.backend = backend
+        self.workload = workload
+        self.duration = duration
+        self.probes = dict(probes or {})
+        self.sample_interval = sample_interval
+        self.seed = seed
+        self.deadline = math.inf
+        self._latencies: list[float] = []
+        self._failed_count = 0
+
+    async def call(self) -> None:
+        """供负载模型调用：执行一次调用并记录结果"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            await self._call()
+        except (Exception, self.backend.overload_exception):
+            self._failed_count += 1
+            return
+        self._latencies.append(loop.time() - start)
+
+    def run(self) -> SimulationResult:
+        """在新的 VirtualTimeEventLoop 中运行模拟"""
+        random.seed(self.seed)
+        loop = VirtualTimeEventLoop()
+        wall_start = time.perf_counter()
+        try:
+            trace = loop.run_until_complete(self._run())
+        finally:
+            # 与 asyncio.run 一样取消剩余的后台任务（例如限制器的定时调整任务）
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(
+                    asyncio.gather(*pending, return_exceptions=True)
+                )
+            loop.close()
+        return SimulationResult(
+            duration=self.duration,
+            wall_seconds=time.perf_counter() - wall_start,
+            succeed_count=len(self._latencies),
+            failed_count=self._failed_count,
+            backend_requests=self.backend.requests_total,
+            backend_rejections=self.backend.rejected_total,
+            latencies=self._latencies,
+            trace=trace,
+        )
+
+    async def _run(self) -> list[TracePoint]:
+        loop = asyncio.get_running_loop()
+        self.deadline = loop.time() + self.duration
+        probes = {
+            "capacity": self.backend.current_capacity,
+            "backend_in_flight": lambda: self.backend.in_flight,
+            **self.probes,
+        }
+        trace: list[TracePoint] = []
+
+        async def sample() -> None:
+            while True:
+                trace.append(
+                    TracePoint(
+                        loop.time(), {name: probe() for name, probe in probes.items()}
+                    )
+                )
+                await asyncio.sleep(self.sample_interval)
+
+        sampler = asyncio.create_task(sample())
+        workload = asyncio.create_task(self.workload.run(self))
+        await asyncio.sleep(self.duration)
+        for task in (workload, sampler):
+            task.cancel()
+        await asyncio.gather(workload, sampler, return_exceptions=True)
+        return trace
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .congestion_control import AIMDController, create_controller
+
+    parser = argparse.ArgumentParser(description="在虚拟时间中模拟自适应并发控制")
+    parser.add_argument(
+        "--capacity",
+        default="32",
+        help='后端容量，或 "开始秒数:容量" 组成的计划，例如 0:32,1800:64',
+    )
+    parser.add_argument("--callers", type=int, default=256)
+    parser.add_argument("--duration", type=float, default=3600)
+    parser.add_argument("--base-latency", type=float, default=0.05)
+    parser.add_argument("--controller", default="aimd")
+    parser.add_argument("--decrease-factor", type=float, default=0.75)
+    parser.add_argument("--max-increase-step", type=int, default=16)
+    parser.add_argument("--adjust-overload-rate", type=float, default=0.1)
+    parser.add_argument("--max-concurrency", type=int, default=256)
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="把结果与采样轨迹写入 JSON 文件")
+    args = parser.parse_args()
+
+    capacity: int | Callable[[float], int]
+    if ":" in args.capacity:
+        capacity = step_schedule(
+            [
+                (float(start), int(value))
+                for start, value in (
+                    part.split(":") for part in args.capacity.split(",")
+                )
+            ]
+        )
+    else:
+        capacity = int(args.capacity)
+
+    backend = SimulatedBackend(capacity, base_latency=args.base_latency, seed=args.seed)
+    limiter = AdaptiveAsyncConcurrencyLimiter(
+        max_concurrency=args.max_concurrency,
+        adjust_overload_rate=args.adjust_overload_rate,
+        controller=(
+            AIMDController(args.decrease_factor, args.max_increase_step)
+            if args.controller == "aimd"
+            else create_controller(args.controller)
+        ),
+        log_level="WARNING",
+    )
+    result = Simulation(
+        lambda: limiter.submit(backend.call()),
+        backend,
+        ClosedLoopWorkload(args.callers),
+        duration=args.duration,
+        probes=limiter_probes(limiter),
+        sample_interval=args.sample_interval,
+        seed=args.seed,
+    ).run()
+
+    limits = [value for _, value in result.series("limit")]
+    print(
+        f"模拟 {result.duration:.0f} 秒（实际耗时 {result.wall_seconds:.1f} 秒）: "
+        f"goodput {result.goodput:.1f}/s, 过载比例 {result.overload_ratio:.1%}, "
+        f"并发上限均值 {sum(limits) / len(limits):.1f}"
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(result.to_json())
@@ -0,0 +1,78 @@
+import asyncio
+from collections.abc import Callable, Coroutine, Hashable
+from typing import Any, TypeVar
+
+R = TypeVar("R")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """合并相同参数的并发调用（singleflight）
+
+    同一时刻参数相同的调用只真正执行一次，其余调用等待同一个结果，
+    成功时都拿到同一个返回值，失败时都收到同一个异常。调用结束后立即忘记结果，不做缓存。
+
+    与 with_adaptive_retry 一起使用时，合并发生在重试循环之外：
+    一组相同的调用只占用一个并发名额，过载时也只重试一次，而不是每个等待者各自重试。
+
+    某个等待者被取消不会影响其他等待者；所有等待者都被取消后，正在执行的调用也会被取消。
+    同一个 SingleFlight 可以被多个被装饰的函数共享，不同函数的调用不会被合并。
+
+    Args:
+        key_func: 从被装饰函数的参数计算 key 的函数，例如 lambda user_id, **kwargs: user_id
+            None 表示用全部位置参数与关键字参数作为 key，参数不可哈希时该次调用不合并
+    """
+
+    def __init__(self, key_func: Callable[..., Hashable] | None = None):
+        self.key_func = key_func
+        self.shared_total = 0
+        self._flights: dict[Hashable, _Flight] = {}
+
+    def key(self, *args: Any, **kwargs: Any) -> Hashable | None:
+        """计算调用的 key，参数不可哈希时返回 None"""
+        if self.key_func is not None:
+            return self.key_func(*args, **kwargs)
+        key = (args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    @property
+    def in_flight(self) -> int:
+        """正在执行的调用组数"""
+        return len(self._flights)
+
+    async def do(self, key: Hashable, call: Callable[[], Coroutine[Any, Any, R]]) -> R:
+        """key 相同的调用正在执行时等待它的结果，否则执行 call()"""
+        loop = asyncio.get_running_loop()
+        # 不同事件循环的 future 不能互相等待
+        flight_key = (id(loop), key)
+        flight = self._flights.get(flight_key)
+        if flight is None or flight.task.get_loop() is not loop:
+            flight = _Flight(loop.create_task(call()))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(flight_key, flight))
+        else:
+            self.shared_total += 1
+        flight.waiters += 1
+        try:
+            # shield 使单个等待者被取消时不会取消共享的调用
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                self._forget(flight_key, flight)
+                flight.task.cancel()
+
+    def _forget(self, flight_key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
@@ -0,0 +1,100 @@
+import math
+from dataclasses import dataclass
+
+
+@dataclass
+class WindowTotals:
+    """滑动窗口内的汇总结果
+
+    Args:
+        succeed_count: 成功的调用数
+        overload_count: 触发过载异常的调用数
+        failed_count: 因其他异常失败的调用数
+        latency_sum: 成功调用的延迟总和（秒）
+        min_latency: 成功调用的最小延迟（秒），没有成功调用时为 inf
+    """
+
+    succeed_count: int = 0
+    overload_count: int = 0
+    failed_count: int = 0
+    latency_sum: float = 0.0
+    min_latency: float = math.inf
+
+    @property
+    def finished_count(self) -> int:
+        return self.succeed_count + self.overload_count + self.failed_count
+
+
+class _Bucket:
+    __slots__ = ("index", "totals")
+
+    def __init__(self) -> None:
+        self.index = -1
+        self.totals = WindowTotals()
+
+
+class SlidingWindowStats:
+    """按时间分桶的滑动窗口统计，用环形缓冲区保存最近 window_seconds 秒的调用结果
+
+    窗口被等分为 bucket_count 个桶，每个桶记录自己所属的时间区间编号；
+    写入或读取时，编号过期的桶被视为空桶，因此不需要定时清理，record 与 totals 都是 O(bucket_count) 以内。
+
+    Args:
+        window_seconds: 窗口长度（秒）
+        bucket_count: 桶的数量，越多则窗口滑动得越平滑
+    """
+
+    def __init__(self, window_seconds: float, bucket_count: int = 10):
+        if window_seconds <= 0:
+            raise ValueError(f"{window_seconds=} 必须大于 0")
+        if bucket_count < 1:
+            raise ValueError(f"{bucket_count=} 必须至少为 1")
+        self.window_seconds = window_seconds
+        self.bucket_width = window_seconds / bucket_count
+        self._buckets = [_Bucket() for _ in range(bucket_count)]
+
+    def record(self, now: float, outcome: str, latency: float | None = None) -> None:
+        """记录一次在 now 时刻结束的调用
+
+        Args:
+            now: 结束时间（秒）
+            outcome: "succeed"、"overload" 或 "failed"
+            latency: 成功调用的延迟（秒）
+        """
+        index = int(now // self.bucket_width)
+        bucket = self._buckets[index % len(self._buckets)]
+        if bucket.index != index:
+            bucket.index = index
+            bucket.totals = WindowTotals()
+        totals = bucket.totals
+        if outcome == "succeed":
+            totals.succeed_count += 1
+            if latency is not None:
+                totals.latency_sum += latency
+                if latency < totals.min_latency:
+                    totals.min_latency = latency
+        elif outcome == "overload":
+            totals.overload_count += 1
+        else:
+            totals.failed_count += 1
+
+    def totals(self, now: float) -> WindowTotals:
+        """汇总 now 之前 window_seconds 秒内的调用结果"""
+        oldest = int(now // self.bucket_width) - len(self._buckets) + 1
+        result = WindowTotals()
+        for bucket in self._buckets:
+            if bucket.index < oldest:
+                continue
+            totals = bucket.totals
+            result.succeed_count += totals.succeed_count
+            result.overload_count += totals.overload_count
+            result.failed_count += totals.failed_count
+            result.latency_sum += totals.latency_sum
+            result.min_latency = min(result.min_latency, totals.min_latency)
+        return result
+
+    def clear(self) -> None:
+        """丢弃窗口内的全部数据，例如并发上限降低之后，旧的过载证据不应再次触发调整"""
+        for bucket in self._buckets:
+            bucket.index = -1
+            bucket.totals = WindowTotals()
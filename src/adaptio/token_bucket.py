@@ -0,0 +1,94 @@
+import asyncio
+import time
+from collections.abc import Callable
+
+
+class TokenBucket:
+    """令牌桶限速器
+
+    按 rate（每秒令牌数）匀速补充令牌，桶中最多累积 capacity 个令牌，
+    因此空闲一段时间后允许最多 capacity 个请求的突发。
+
+    实现上采用 GCRA 式的“预约”：acquire 时直接扣减令牌，令牌数可以为负，
+    负数部分就是需要等待的时间 (-tokens / rate)。获取令牌只需要读一次时钟，
+    不需要加锁，也不会让所有调用串行地经过同一个 sleep。
+
+    Args:
+        rate: 每秒补充的令牌数（即目标 QPS）
+        capacity: 桶容量（允许的最大突发请求数），默认为 1
+        clock: 单调时钟函数，默认为 time.monotonic
+
+    Raises:
+        ValueError: 当 rate 不为正数或 capacity 小于 1 时抛出
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError(f"{rate=} 必须为正数")
+        if capacity < 1:
+            raise ValueError(f"{capacity=} 不能小于 1")
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._last_refill = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._last_refill) * self.rate
+        )
+        self._last_refill = now
+
+    @property
+    def tokens(self) -> float:
+        """当前可用的令牌数，为负数时表示已预约、尚未补足的令牌"""
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """尝试立即获取令牌，令牌不足时返回 False 且不做任何扣减"""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def reserve(self, tokens: float = 1) -> float:
+        """预约令牌并返回需要等待的秒数（0 表示可以立即执行）"""
+        self._refill()
+        self._tokens -= tokens
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """获取令牌，令牌不足时等待到预约的时间点"""
+        delay = self.reserve(tokens)
+        if delay <= 0:
+            return
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # 取消时归还预约的令牌，避免拖慢后面的请求
+            self._tokens += tokens
+            raise
+
+    def set_rate(self, rate: float) -> None:
+        """动态调整补充速率，已经累积的令牌按旧速率结算"""
+        if rate <= 0:
+            raise ValueError(f"{rate=} 必须为正数")
+        self._refill()
+        self.rate = rate
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return None
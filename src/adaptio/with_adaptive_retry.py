@@ -1,6 +1,7 @@
 import asyncio
+import contextlib
 import logging
-from collections.abc import Callable, Coroutine
+from collections.abc import Callable, Coroutine, Sequence
 from functools import wraps
 from typing import Any, TypeVar
 
@@ -8,22 +9,62 @@ from adaptio.adaptive_async_concurrency_limiter import (
     AdaptiveAsyncConcurrencyLimiter,
     ServiceOverloadError,
 )
+from adaptio.adaptive_rate_limiter import AdaptiveRateLimiter
+from adaptio.backoff import BackoffName, BackoffPolicy, create_backoff, retry_delay
+from adaptio.circuit_breaker import CircuitBreaker
+from adaptio.congestion_control import ConcurrencyController, ControllerName
+from adaptio.hedging import HedgePolicy
+from adaptio.hooks import LimiterHooks, RetryEvent, fire_hooks
+from adaptio.keyed_limiter import KeyedAdaptiveLimiter
+from adaptio.result_cache import ResultCache
+from adaptio.shared_memory_limiter import SharedMemoryLimiter
+from adaptio.singleflight import SingleFlight
 
 R = TypeVar("R")
 
+Scheduler = AdaptiveAsyncConcurrencyLimiter | AdaptiveRateLimiter | SharedMemoryLimiter
+SchedulerSpec = Scheduler | KeyedAdaptiveLimiter
+
+
+def _schedule(
+    scheduler: Scheduler, coro: Coroutine[Any, Any, R], priority: int
+) -> asyncio.Future[R]:
+    if isinstance(scheduler, AdaptiveAsyncConcurrencyLimiter):
+        return scheduler.submit(coro, priority=priority)
+    return scheduler.submit(coro)
+
+
+async def _submit_to(
+    scheduler: Scheduler, coro: Coroutine[Any, Any, R], priority: int
+) -> R:
+    return await _schedule(scheduler, coro, priority)
+
 
 def with_adaptive_retry(
-    scheduler: AdaptiveAsyncConcurrencyLimiter | None = None,
+    scheduler: SchedulerSpec | Sequence[SchedulerSpec] | None = None,
     max_retries: int = 1024,
     retry_interval_seconds: float = 1,
+    backoff: BackoffName | BackoffPolicy = "constant",
+    max_retry_interval_seconds: float = 60,
     max_concurrency: int = 256,
     min_concurrency: int = 1,
     initial_concurrency: int = 1,
     adjust_overload_rate: float = 0.1,
     overload_exception: type[BaseException] = ServiceOverloadError,
+    controller: ControllerName | ConcurrencyController = "aimd",
+    latency_tolerance: float = 1.5,
     log_level: str = "INFO",
     log_prefix: str = "",
     ignore_loop_bound_exception: bool = False,
+    global_cooldown: bool = False,
+    cooldown_probe_ratio: float = 0.1,
+    circuit_breaker: CircuitBreaker | None = None,
+    priority: int = 0,
+    thread_safe: bool = False,
+    hooks: Sequence[LimiterHooks] = (),
+    hedge: HedgePolicy | None = None,
+    singleflight: SingleFlight | None = None,
+    cache: ResultCache | None = None,
 ) -> Callable[
     [Callable[..., Coroutine[Any, Any, R]]], Callable[..., Coroutine[Any, Any, R]]
 ]:
@@ -32,15 +73,29 @@ def with_adaptive_retry(
     当函数触发过载异常时，会自动重试并通过 AdaptiveConcurrencyLimiter 动态调整并发数。
 
     Args:
-        scheduler: AdaptiveConcurrencyLimiter 实例。如果为 None，则为每个装饰的函数创建独立的限制器
+        scheduler: AdaptiveConcurrencyLimiter、AdaptiveRateLimiter 或 SharedMemoryLimiter 实例。如果为 None，则为每个装饰的函数创建独立的限制器
+            也可以传入多个调度器组成的序列，调用会依次经过每个调度器（例如先按自适应 QPS 限速，再受自适应并发数限制），
+            此时以第一个调度器的 overload_exception 判断是否需要重试
+            也可以传入 KeyedAdaptiveLimiter，每次调用时用它的 key_func 从调用参数计算 key，
+            使用该 key 对应的限制器（例如按目标主机隔离并发）
         max_retries: 最大重试次数
-        retry_interval_seconds: 重试间隔时间（秒）
+        retry_interval_seconds: 重试间隔时间（秒），对于指数退避类策略是第一次重试的等待时间
+        backoff: 重试等待时间策略，可以是内置策略名称或实现了 BackoffPolicy 协议的对象
+            "constant": 固定等待 retry_interval_seconds（默认）
+            "exponential": 指数退避
+            "full_jitter": 指数退避并在 [0, 退避时间] 内随机，避免重试同时发生
+            "decorrelated_jitter": 去相关抖动，在 [retry_interval_seconds, 上次等待时间 * 3] 内随机
+            如果过载异常带有 retry_after 属性（例如来自 Retry-After 响应头），等待时间不会小于它
+        max_retry_interval_seconds: 退避策略的最长等待时间（秒）
         max_concurrency: 当 scheduler 为 None 时使用的最大并发数
         min_concurrency: 当 scheduler 为 None 时使用的最小并发数
         initial_concurrency: 当 scheduler 为 None 时使用的初始并发数
         adjust_overload_rate: 当 scheduler 为 None 时使用的过载调整率
             意思是在最近一轮并发调用中，若触发过载错误的调用数量超过这个比例，才会进行降低并发数操作
         overload_exception: 当 scheduler 为 None 时检测的过载异常类型
+        controller: 当 scheduler 为 None 时使用的并发控制算法，
+            可选 "aimd"、"gradient"、"reno"、"cubic"、"vegas" 或实现了 ConcurrencyController 协议的对象
+        latency_tolerance: 当 scheduler 为 None 且 controller="gradient" 时可容忍的延迟升高倍数
         log_level: 当 scheduler 为 None 时使用的日志级别
         log_prefix: 当 scheduler 为 None 时使用的日志前缀
         ignore_loop_bound_exception: 是否忽略循环边界异常
@@ -49,47 +104,224 @@ def with_adaptive_retry(
             但是，如果你将此选项设置为True，它将忽略异常，并且除了打印一条 warning 外没有其他动作。
             通常情况下很难在实际应用中出发这个错误，除非刻意写出在同步函数中使用多线程调用异步函数的代码。
             https://github.com/python/cpython/blob/v3.13.3/Lib/asyncio/mixins.py#L20
+        global_cooldown: 当 scheduler 为 None 时，过载异常带有 retry_after 时是否暂停整个限制器，默认为 False
+        cooldown_probe_ratio: 当 scheduler 为 None 时，暂停结束后用于探测的并发数比例
+        circuit_breaker: 当 scheduler 为 None 时使用的熔断器
+            熔断器打开时抛出的 CircuitOpenError 不是过载异常，不会被重试，而是直接交给调用方
+        priority: 被装饰函数的调用在 AdaptiveAsyncConcurrencyLimiter 中的优先级，数值越小越先获得名额
+            例如交互式请求与后台任务共享同一个 scheduler 时，可以为后台任务设置 priority=1
+        thread_safe: 当 scheduler 为 None 时，是否允许在多个线程的多个事件循环中调用被装饰的函数，
+            所有事件循环共享同一个自适应并发上限
+        hooks: 插桩钩子，每次因过载重试前调用 on_retry；
+            当 scheduler 为 None 时同时注册到创建的限制器上（on_enqueue/on_acquire/on_complete/on_adjust）
+        hedge: 对冲请求策略，None 表示不对冲，只应用于幂等的调用
+            调用超过 HedgePolicy 学到的延迟分位数仍未结束时，如果（第一个）AdaptiveAsyncConcurrencyLimiter
+            有空闲名额且对冲额度足够，就再发起一次相同的调用，采用先成功的结果并取消另一个；
+            两次调用都触发过载异常时才按常规重试
+        singleflight: 合并相同参数的并发调用，None 表示不合并
+            key 相同的调用正在执行（包括排队与过载重试）时，新的调用直接等待它的结果或异常，不再占用并发名额
+        cache: 结果缓存，None 表示不缓存
+            命中缓存的调用直接返回，不经过限制器；未命中时才按 singleflight 与重试逻辑执行，过载异常永远不会被缓存
 
     Returns:
         装饰后的异步函数，具有自适应重试能力
     """
     # 如果没有传入 scheduler，则创建一个新的限制器实例
-    _scheduler = scheduler or AdaptiveAsyncConcurrencyLimiter(
-        max_concurrency=max_concurrency,
-        min_concurrency=min_concurrency,
-        initial_concurrency=initial_concurrency,
-        adjust_overload_rate=adjust_overload_rate,
-        overload_exception=overload_exception,
-        log_level=log_level,
-        log_prefix=log_prefix,
-        ignore_loop_bound_exception=ignore_loop_bound_exception,
+    schedulers: tuple[SchedulerSpec, ...]
+    if scheduler is None:
+        schedulers = (
+            AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=max_concurrency,
+                min_concurrency=min_concurrency,
+                initial_concurrency=initial_concurrency,
+                adjust_overload_rate=adjust_overload_rate,
+                overload_exception=overload_exception,
+                controller=controller,
+                latency_tolerance=latency_tolerance,
+                log_level=log_level,
+                log_prefix=log_prefix,
+                ignore_loop_bound_exception=ignore_loop_bound_exception,
+                global_cooldown=global_cooldown,
+                cooldown_probe_ratio=cooldown_probe_ratio,
+                circuit_breaker=circuit_breaker,
+                hooks=hooks,
+                thread_safe=thread_safe,
+            ),
+        )
+    elif isinstance(scheduler, Sequence):
+        schedulers = tuple(scheduler)
+        if not schedulers:
+            raise ValueError("scheduler 序列不能为空")
+    else:
+        schedulers = (scheduler,)
+    _scheduler = schedulers[0]
+    backoff_policy = (
+        create_backoff(backoff, retry_interval_seconds, max_retry_interval_seconds)
+        if isinstance(backoff, str)
+        else backoff
     )
 
+    keyed = any(isinstance(s, KeyedAdaptiveLimiter) for s in schedulers)
+    retry_hooks = tuple(hooks)
+
+    def _chain(
+        coro: Coroutine[Any, Any, R], call_schedulers: Sequence[Scheduler]
+    ) -> Coroutine[Any, Any, R]:
+        # 先经过前面的调度器，再进入后面的调度器
+        for inner_scheduler in reversed(call_schedulers[1:]):
+            coro = _submit_to(inner_scheduler, coro, priority)
+        return coro
+
+    def _submit(
+        coro: Coroutine[Any, Any, R], call_schedulers: Sequence[Scheduler]
+    ) -> asyncio.Future[R]:
+        return _schedule(call_schedulers[0], _chain(coro, call_schedulers), priority)
+
     def decorator(
         func: Callable[..., Coroutine[Any, Any, R]],
     ) -> Callable[..., Coroutine[Any, Any, R]]:
-        if not _scheduler.log_prefix:
-            _scheduler.log_prefix = getattr(func, "__name__", "unnamed_function")
+        for s in schedulers:
+            if not s.log_prefix:
+                s.log_prefix = getattr(func, "__name__", "unnamed_function")
 
-        @wraps(func)
-        async def wrapper(*args: Any, **kwargs: Any) -> R:
+        def _try_hedge(
+            args: tuple, kwargs: dict, call_schedulers: Sequence[Scheduler]
+        ) -> asyncio.Future[R] | None:
+            """只在有空闲名额且有对冲额度时发起对冲调用"""
+            assert hedge is not None
+            limiter = call_schedulers[0]
+            if (
+                not isinstance(limiter, AdaptiveAsyncConcurrencyLimiter)
+                or limiter.workers_lock.locked()
+                or not hedge.try_spend()
+            ):
+                return None
+            coro = _chain(func(*args, **kwargs), call_schedulers)
+            task = limiter.try_submit(coro, priority=priority)
+            if task is None:
+                # 检查之后名额被其他调用拿走了
+                coro.close()
+                hedge.budget += 1
+                return None
+            hedge.hedged_total += 1
+            return task
+
+        async def _hedged_call(
+            args: tuple, kwargs: dict, call_schedulers: Sequence[Scheduler]
+        ) -> R:
+            assert hedge is not None
+            loop = asyncio.get_running_loop()
+            started_at = loop.time()
+            primary = _submit(func(*args, **kwargs), call_schedulers)
+            hedge.on_primary()
+            attempts = [primary]
+            try:
+                delay = hedge.delay()
+                if delay is not None:
+                    done, _ = await asyncio.wait(attempts, timeout=delay)
+                    if not done:
+                        hedged = _try_hedge(args, kwargs, call_schedulers)
+                        if hedged is not None:
+                            attempts.append(hedged)
+                errors: dict[asyncio.Future, BaseException] = {}
+                pending: set[asyncio.Future] = set(attempts)
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        if task.cancelled():
+                            errors[task] = asyncio.CancelledError()
+                        elif (error := task.exception()) is not None:
+                            errors[task] = error
+                        else:
+                            hedge.observe(loop.time() - started_at)
+                            if task is not primary:
+                                hedge.hedge_won_total += 1
+                            return task.result()
+                # 都失败时以主调用的异常为准
+                raise errors.get(primary) or next(iter(errors.values()))
+            finally:
+                for task in attempts:
+                    if not task.done():
+                        task.cancel()
+                    elif not task.cancelled():
+                        # 标记异常已被处理，避免输失的调用打印 "exception was never retrieved"
+                        task.exception()
+
+        async def _call_with_retry(*args: Any, **kwargs: Any) -> R:
+            if not keyed:
+                return await _retry_loop(args, kwargs, schedulers)  # type: ignore[arg-type]
+            with contextlib.ExitStack() as held:
+                # 在整个重试过程中持有 key 对应的限制器，等待重试期间它不会被回收
+                call_schedulers = [
+                    held.enter_context(s.hold_for_call(*args, **kwargs))
+                    if isinstance(s, KeyedAdaptiveLimiter)
+                    else s
+                    for s in schedulers
+                ]
+                return await _retry_loop(args, kwargs, call_schedulers)
+
+        async def _retry_loop(
+            args: tuple, kwargs: dict, call_schedulers: Sequence[Scheduler]
+        ) -> R:
             retries = 0
+            delay = 0.0
             # 为装饰器创建独立的 logger
             retry_logger = logging.getLogger(f"retry_{id(func)}")
             while True:
                 try:
-                    task = _scheduler.submit(func(*args, **kwargs))
+                    if hedge is not None:
+                        return await _hedged_call(args, kwargs, call_schedulers)
+                    task = _submit(func(*args, **kwargs), call_schedulers)
                     return await task  # type: ignore
-                except _scheduler.overload_exception:
+                except _scheduler.overload_exception as e:
                     retries += 1
                     if retries > max_retries:
                         retry_logger.error(
                             f"{_scheduler.log_prefix} -- 重试次数已达上限({retries}次)，服务仍处于过载状态"
                         )
                         raise
-                    await asyncio.sleep(retry_interval_seconds)
+                    delay = retry_delay(backoff_policy, retries, delay, e)
+                    if retry_hooks:
+                        fire_hooks(
+                            retry_hooks,
+                            "on_retry",
+                            RetryEvent(
+                                function=func.__qualname__,
+                                attempt=retries,
+                                delay=delay,
+                                error=e,
+                                timestamp=asyncio.get_running_loop().time(),
+                            ),
+                            retry_logger,
+                        )
+                    await asyncio.sleep(delay)
                     continue
 
+        async def _call_deduplicated(*args: Any, **kwargs: Any) -> R:
+            if singleflight is not None:
+                key = singleflight.key(*args, **kwargs)
+                if key is not None:
+                    # 整个重试循环只为一组相同的调用执行一次
+                    return await singleflight.do(
+                        (func, key), lambda: _call_with_retry(*args, **kwargs)
+                    )
+            return await _call_with_retry(*args, **kwargs)
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> R:
+            if cache is not None:
+                key = cache.key(*args, **kwargs)
+                if key is not None:
+                    # 命中缓存时不经过限制器，也不占用并发名额
+                    return await cache.get_or_call(
+                        (func, key),
+                        lambda: _call_deduplicated(*args, **kwargs),
+                        _scheduler.overload_exception,
+                    )
+            return await _call_deduplicated(*args, **kwargs)
+
         return wrapper
 
     return decorator
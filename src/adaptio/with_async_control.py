@@ -4,6 +4,7 @@ from functools import wraps
 from typing import Any, TypeVar
 
 from adaptio.log_utils import setup_colored_logger
+from adaptio.token_bucket import TokenBucket
 
 T = TypeVar("T")
 
@@ -27,6 +28,7 @@ def with_async_control(
     | Callable[[Exception], bool] = Exception,
     max_concurrency: int = 0,
     max_qps: float = 0,
+    max_burst: float = 1,
     retry_n: int = 0,
     retry_delay: float = 1.0,
 ) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Coroutine[Any, Any, T]]]:
@@ -36,7 +38,8 @@ def with_async_control(
     参数:
         cared_exception: 需要捕获的异常类型或者一个输入为异常对象的函数
         max_concurrency: 最大并发数
-        max_qps: 每秒最大请求数 (0表示不限制)
+        max_qps: 每秒最大请求数 (0表示不限制)，通过令牌桶（TokenBucket）实现
+        max_burst: 令牌桶容量，即空闲后允许的最大突发请求数
         retry_n: 重试次数
         retry_delay: 重试间隔时间(秒)
 
@@ -52,16 +55,19 @@ def with_async_control(
         concurrency_sem = (
             asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else FakeLock()
         )
-        qps_lock = asyncio.Lock()
+        rate_limiter = (
+            TokenBucket(max_qps, capacity=max_burst)
+            if max_qps > 1e-5  # 避免浮点数精度问题
+            else None
+        )
 
         @wraps(func)
         async def wrapper(*args, **kwargs) -> T:
             async with concurrency_sem:
                 for attempt in range(retry_n + 1):
                     try:
-                        if max_qps > 1e-5:  # 避免浮点数精度问题
-                            async with qps_lock:
-                                await asyncio.sleep(1 / max_qps)
+                        if rate_limiter is not None:
+                            await rate_limiter.acquire()
                         return await func(*args, **kwargs)
                     except Exception as e:
                         if retry_n <= 0:
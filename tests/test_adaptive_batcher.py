@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+
+from adaptio import AdaptiveBatcher, ServiceOverloadError, with_adaptive_batching
+
+
+class TestAdaptiveBatcher(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_calls_are_batched(self):
+        async def test_batching():
+            batches: list[list[int]] = []
+
+            @with_adaptive_batching(initial_batch_size=4, max_linger_seconds=0.01)
+            async def double(items: list[int]) -> list[int]:
+                batches.append(items)
+                return [i * 2 for i in items]
+
+            results = await asyncio.gather(*[double(i) for i in range(10)])
+            self.assertEqual(results, [i * 2 for i in range(10)])
+            self.assertEqual(sum(len(b) for b in batches), 10)
+            # 前两批达到 batch_size 立即发出，剩余的在等待 max_linger_seconds 后发出
+            self.assertEqual(batches[0], [0, 1, 2, 3])
+            self.assertLess(len(batches), 10)
+            # 没有过载时批次逐渐变大
+            self.assertGreater(double.batcher.batch_size, 4)  # type: ignore[attr-defined]
+
+        self.loop.run_until_complete(test_batching())
+
+    def test_only_overloaded_items_are_retried(self):
+        async def test_batching():
+            calls: list[list[int]] = []
+            batch_sizes: list[int] = []
+
+            async def lookup(items: list[int]) -> list[int | BaseException]:
+                calls.append(items)
+                batch_sizes.append(batcher.batch_size)
+                results: list[int | BaseException] = []
+                for i in items:
+                    if i == 1 and len(calls) == 1:
+                        results.append(ServiceOverloadError("overloaded"))
+                    elif i == 2:
+                        results.append(KeyError(i))
+                    else:
+                        results.append(i)
+                return results
+
+            batcher = AdaptiveBatcher(
+                lookup,
+                initial_batch_size=4,
+                max_linger_seconds=0.01,
+                retry_interval_seconds=0.01,
+            )
+            results = await asyncio.gather(
+                *[batcher.submit(i) for i in range(4)], return_exceptions=True
+            )
+            self.assertEqual(results[0], 0)
+            self.assertEqual(results[1], 1)
+            self.assertIsInstance(results[2], KeyError)
+            self.assertEqual(results[3], 3)
+            # 第二次调用只包含过载的项目
+            self.assertEqual(calls, [[0, 1, 2, 3], [1]])
+            # 一批中有 1/4 的项目过载，超过阈值，重试时批次已经缩小
+            self.assertEqual(batch_sizes, [4, 3])
+            await batcher.shutdown()
+
+        self.loop.run_until_complete(test_batching())
+
+    def test_whole_batch_errors(self):
+        async def test_batching():
+            attempts = 0
+
+            async def failing(items: list[int]) -> list[int]:
+                nonlocal attempts
+                attempts += 1
+                if attempts == 1:
+                    raise ServiceOverloadError("overloaded")
+                raise ValueError("测试错误")
+
+            batcher = AdaptiveBatcher(
+                failing,
+                initial_batch_size=2,
+                max_linger_seconds=0.01,
+                retry_interval_seconds=0.01,
+            )
+            results = await asyncio.gather(
+                batcher.submit(1), batcher.submit(2), return_exceptions=True
+            )
+            # 整批过载后批次缩小为 1，两个项目分别重试
+            self.assertEqual(attempts, 3)
+            self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+        self.loop.run_until_complete(test_batching())
+
+    def test_max_retries_exceeded(self):
+        async def test_batching():
+            async def always_overloaded(items: list[int]) -> list[int]:
+                raise ServiceOverloadError("overloaded")
+
+            batcher = AdaptiveBatcher(
+                always_overloaded,
+                initial_batch_size=1,
+                max_linger_seconds=0.01,
+                max_retries=2,
+                retry_interval_seconds=0.01,
+            )
+            with self.assertRaises(ServiceOverloadError):
+                await batcher.submit(1)
+
+        self.loop.run_until_complete(test_batching())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,14 @@
 import asyncio
+import threading
 import unittest
 
-from adaptio import AdaptiveAsyncConcurrencyLimiter
+from adaptio import (
+    AdaptiveAsyncConcurrencyLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    ServiceOverloadError,
+    VirtualTimeEventLoop,
+)
 
 
 class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
@@ -54,6 +61,643 @@ class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
 
         self.loop.run_until_complete(test_error())
 
+    def test_gradient_controller_reacts_to_latency(self):
+        async def test_gradient():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=256, initial_concurrency=64, controller="gradient"
+            )
+
+            # 延迟与基准一致时应继续提升并发数
+            scheduler.controller.baseline_latency = 0.01  # type: ignore[attr-defined]
+            scheduler.current_succeed_count = 10
+            scheduler.current_finished_count = 10
+            scheduler.current_latency_sum = 0.1
+            await scheduler.adjust_concurrency()
+            self.assertGreater(scheduler.workers_lock.initial_value, 64)
+            scheduler.reset_counters()
+
+            # 延迟升高到基准的数倍时，即使没有过载也应降低并发数
+            before = scheduler.workers_lock.initial_value
+            for _ in range(5):
+                scheduler.controller.baseline_latency = 0.01  # type: ignore[attr-defined]
+                scheduler.current_succeed_count = 10
+                scheduler.current_finished_count = 10
+                scheduler.current_latency_sum = 1.0
+                await scheduler.adjust_concurrency()
+                scheduler.reset_counters()
+            self.assertLess(scheduler.workers_lock.initial_value, before)
+
+        self.loop.run_until_complete(test_gradient())
+
+    def test_gradient_controller_measures_latency(self):
+        async def test_gradient():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=4, initial_concurrency=4, controller="gradient"
+            )
+
+            async def sample_task():
+                await asyncio.sleep(0.05)
+
+            await asyncio.gather(*[scheduler.submit(sample_task()) for _ in range(4)])
+            self.assertEqual(scheduler.current_succeed_count, 4)
+            self.assertGreaterEqual(scheduler.current_latency_sum, 0.2)
+
+        self.loop.run_until_complete(test_gradient())
+
+    def test_invalid_controller(self):
+        with self.assertRaises(ValueError):
+            AdaptiveAsyncConcurrencyLimiter(controller="unknown")  # type: ignore[arg-type]
+
+    def test_aimd_attributes_forward_to_controller(self):
+        limiter = AdaptiveAsyncConcurrencyLimiter(log_level="ERROR")
+        self.assertEqual((limiter.increase_step, limiter.decrease_factor), (1, 0.75))
+        limiter.decrease_factor = 0.5
+        limiter.increase_step = 4
+        self.assertEqual(limiter.controller.decrease_factor, 0.5)  # type: ignore[attr-defined]
+        self.assertEqual(limiter.controller.increase_step, 4)  # type: ignore[attr-defined]
+
+        # 其他算法没有这两个参数，设置时报错而不是静默无效
+        reno = AdaptiveAsyncConcurrencyLimiter(controller="reno", log_level="ERROR")
+        with self.assertRaises(AttributeError):
+            reno.decrease_factor = 0.5
+        self.assertFalse(hasattr(reno, "increase_step"))
+
+    def test_bounded_submission_queue(self):
+        async def test_asubmit():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=2, initial_concurrency=2, max_pending=3
+            )
+            max_tasks = 0
+            max_pending = 0
+
+            async def sample_task(task_id):
+                nonlocal max_tasks, max_pending
+                max_tasks = max(max_tasks, len(scheduler.submitted_tasks))
+                max_pending = max(max_pending, scheduler.pending_count)
+                await asyncio.sleep(0.01)
+                return task_id
+
+            futures = [await scheduler.asubmit(sample_task(i)) for i in range(20)]
+            # 提交方被背压挂起，队列长度不超过 max_pending
+            self.assertLessEqual(scheduler.pending_count, 3)
+            results = await asyncio.gather(*futures)
+
+            self.assertEqual(results, list(range(20)))
+            # 只有获得名额的任务才会被创建为 Task
+            self.assertLessEqual(max_tasks, 2)
+            self.assertLessEqual(max_pending, 3)
+            await scheduler.shutdown()
+
+        self.loop.run_until_complete(test_asubmit())
+
+    def test_asubmit_propagates_errors_and_shutdown_drains(self):
+        async def test_asubmit():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=1, initial_concurrency=1, max_pending=1
+            )
+            finished = []
+
+            async def failing_task():
+                raise ValueError("测试错误")
+
+            async def sample_task(task_id):
+                await asyncio.sleep(0.01)
+                finished.append(task_id)
+
+            future = await scheduler.asubmit(failing_task())
+            with self.assertRaises(ValueError):
+                await future
+
+            for i in range(3):
+                await scheduler.asubmit(sample_task(i))
+            await scheduler.shutdown()
+            self.assertEqual(finished, [0, 1, 2])
+            coro = sample_task(3)
+            with self.assertRaises(RuntimeError):
+                await scheduler.asubmit(coro)
+            coro.close()
+
+        self.loop.run_until_complete(test_asubmit())
+
+    def test_map_streams_lazily(self):
+        async def test_map():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=4, initial_concurrency=4
+            )
+            pulled = 0
+            max_in_flight = 0
+
+            async def source():
+                nonlocal pulled
+                for i in range(50):
+                    pulled += 1
+                    yield i
+
+            async def sample_task(i):
+                nonlocal max_in_flight
+                # 已拉取但尚未产出的输入数不应超过并发上限太多
+                max_in_flight = max(max_in_flight, pulled - len(results))
+                await asyncio.sleep(0.001 * (i % 3))
+                return i * 2
+
+            results = []
+            async for result in scheduler.map(sample_task, source()):
+                results.append(result)
+
+            self.assertEqual(results, [i * 2 for i in range(50)])
+            self.assertLessEqual(max_in_flight, 8)
+
+            unordered = [
+                r async for r in scheduler.map_unordered(sample_task, range(20))
+            ]
+            self.assertEqual(sorted(unordered), [i * 2 for i in range(20)])
+
+        self.loop.run_until_complete(test_map())
+
+    def test_map_retries_overload_and_handles_errors(self):
+        async def test_map():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=2, initial_concurrency=2
+            )
+            attempts: dict[int, int] = {}
+
+            async def flaky_task(i):
+                attempts[i] = attempts.get(i, 0) + 1
+                if attempts[i] == 1 and i % 2 == 0:
+                    raise ServiceOverloadError("Service overloaded")
+                if i == 5:
+                    raise ValueError("测试错误")
+                return i
+
+            results = [
+                r
+                async for r in scheduler.map(
+                    flaky_task,
+                    range(8),
+                    return_exceptions=True,
+                    retry_interval_seconds=0.01,
+                )
+            ]
+            self.assertEqual(results[:5], [0, 1, 2, 3, 4])
+            self.assertIsInstance(results[5], ValueError)
+            self.assertEqual(results[6:], [6, 7])
+            self.assertEqual(attempts[0], 2)
+
+            with self.assertRaises(ValueError):
+                async for _ in scheduler.map(
+                    flaky_task, range(8), retry_interval_seconds=0.01
+                ):
+                    pass
+
+        self.loop.run_until_complete(test_map())
+
+    def test_global_cooldown_on_retry_after(self):
+        async def test_cooldown():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=8, initial_concurrency=8, global_cooldown=True
+            )
+            loop = asyncio.get_running_loop()
+            start_times: list[float] = []
+
+            async def rejected_task():
+                raise ServiceOverloadError("Too many requests", retry_after=0.2)
+
+            async def sample_task():
+                start_times.append(loop.time())
+                await asyncio.sleep(0.01)
+
+            start = loop.time()
+            with self.assertRaises(ServiceOverloadError):
+                await scheduler.submit(rejected_task())
+            self.assertTrue(scheduler.in_cooldown)
+            self.assertGreater(scheduler.cooldown_remaining, 0)
+            # 暂停期间并发数降到探测规模
+            self.assertEqual(scheduler.workers_lock.initial_value, 1)
+
+            await asyncio.gather(*[scheduler.submit(sample_task()) for _ in range(4)])
+            # 所有调用都在暂停结束后才开始
+            self.assertGreaterEqual(min(start_times) - start, 0.19)
+            # 第一个探测调用成功后才放开其余调用
+            self.assertGreaterEqual(sorted(start_times)[1] - min(start_times), 0.009)
+            self.assertFalse(scheduler.in_cooldown)
+            self.assertEqual(scheduler.workers_lock.initial_value, 8)
+
+        self.loop.run_until_complete(test_cooldown())
+
+    def test_global_cooldown_disabled(self):
+        async def test_cooldown():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=8, initial_concurrency=8, global_cooldown=False
+            )
+
+            async def rejected_task():
+                raise ServiceOverloadError("Too many requests", retry_after=10)
+
+            with self.assertRaises(ServiceOverloadError):
+                await scheduler.submit(rejected_task())
+            self.assertFalse(scheduler.in_cooldown)
+            self.assertEqual(scheduler.workers_lock.initial_value, 8)
+
+        self.loop.run_until_complete(test_cooldown())
+
+    def test_circuit_breaker_fails_fast(self):
+        async def test_breaker():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=4,
+                initial_concurrency=4,
+                circuit_breaker=CircuitBreaker(minimum_calls=2, open_seconds=0.1),
+            )
+            backend_calls = 0
+            backend_down = True
+
+            async def sample_task():
+                nonlocal backend_calls
+                backend_calls += 1
+                if backend_down:
+                    raise ServiceOverloadError("down")
+                return "ok"
+
+            for _ in range(2):
+                with self.assertRaises(ServiceOverloadError):
+                    await scheduler.submit(sample_task())
+            self.assertEqual(scheduler.circuit_state, "open")
+
+            # 熔断期间不再调用后端
+            with self.assertRaises(CircuitOpenError) as ctx:
+                await scheduler.submit(sample_task())
+            self.assertEqual(backend_calls, 2)
+            self.assertGreater(ctx.exception.retry_after, 0)
+
+            await asyncio.sleep(0.1)
+            self.assertEqual(scheduler.circuit_state, "half_open")
+            backend_down = False
+            self.assertEqual(await scheduler.submit(sample_task()), "ok")
+            self.assertEqual(scheduler.circuit_state, "closed")
+
+        self.loop.run_until_complete(test_breaker())
+
+    def test_circuit_breaker_waits_with_deadline(self):
+        async def test_breaker():
+            breaker = CircuitBreaker(
+                minimum_calls=1, open_seconds=0.05, max_wait_seconds=1
+            )
+            scheduler = AdaptiveAsyncConcurrencyLimiter(circuit_breaker=breaker)
+
+            async def overloaded_task():
+                raise ServiceOverloadError("down")
+
+            async def sample_task():
+                return "ok"
+
+            with self.assertRaises(ServiceOverloadError):
+                await scheduler.submit(overloaded_task())
+            self.assertEqual(scheduler.circuit_state, "open")
+            # 等待熔断结束后作为探测调用执行
+            self.assertEqual(await scheduler.submit(sample_task()), "ok")
+            self.assertEqual(scheduler.circuit_state, "closed")
+
+        self.loop.run_until_complete(test_breaker())
+
+    def test_cancel_during_cooldown_returns_probe_slot(self):
+        async def test_breaker():
+            breaker = CircuitBreaker(
+                minimum_calls=1, open_seconds=0.05, max_wait_seconds=0
+            )
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                initial_concurrency=4,
+                circuit_breaker=breaker,
+                global_cooldown=True,
+                log_level="ERROR",
+            )
+
+            async def overloaded_task():
+                raise ServiceOverloadError("down", retry_after=0.3)
+
+            async def sample_task():
+                return "ok"
+
+            with self.assertRaises(ServiceOverloadError):
+                await scheduler.submit(overloaded_task())
+            await asyncio.sleep(0.1)
+            self.assertEqual(scheduler.circuit_state, "half_open")
+            self.assertTrue(scheduler.in_cooldown)
+
+            # 探测调用在等待暂停结束时被取消，不会留下占用的探测名额
+            probe = scheduler.submit(sample_task())
+            await asyncio.sleep(0.05)
+            probe.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+
+            await asyncio.sleep(0.3)
+            self.assertEqual(await scheduler.submit(sample_task()), "ok")
+            self.assertEqual(scheduler.circuit_state, "closed")
+
+        self.loop.run_until_complete(test_breaker())
+
+    def test_circuit_breaker_rejects_without_waiting_for_permit(self):
+        async def test_breaker():
+            breaker = CircuitBreaker(minimum_calls=1, open_seconds=0.05)
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=1,
+                initial_concurrency=1,
+                circuit_breaker=breaker,
+                log_level="ERROR",
+            )
+            loop = asyncio.get_running_loop()
+
+            async def overloaded_task():
+                raise ServiceOverloadError("down")
+
+            async def sample_task():
+                return "ok"
+
+            with self.assertRaises(ServiceOverloadError):
+                await scheduler.submit(overloaded_task())
+            self.assertEqual(scheduler.circuit_state, "open")
+            # 唯一的名额被占用时，熔断器打开仍然立即拒绝，而不是先排队等名额
+            await scheduler.workers_lock.acquire()
+            start = loop.time()
+            with self.assertRaises(CircuitOpenError):
+                await scheduler.submit(sample_task())
+            self.assertLess(loop.time() - start, 0.01)
+
+            # 探测调用通过了熔断器，却在等待名额时被取消：探测名额必须归还
+            await asyncio.sleep(0.05)
+            probe = scheduler.submit(sample_task())
+            await asyncio.sleep(0.01)
+            self.assertEqual(scheduler.workers_lock.waiting_count, 1)
+            probe.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+            scheduler.workers_lock.release()
+            self.assertEqual(await scheduler.submit(sample_task()), "ok")
+            self.assertEqual(scheduler.circuit_state, "closed")
+
+        self.loop.run_until_complete(test_breaker())
+
+    def test_cooldown_waiters_do_not_hold_permits(self):
+        async def test_cooldown():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=4,
+                initial_concurrency=4,
+                global_cooldown=True,
+                log_level="ERROR",
+            )
+
+            async def rejected_task():
+                raise ServiceOverloadError("Too many requests", retry_after=0.2)
+
+            async def sample_task():
+                return "ok"
+
+            with self.assertRaises(ServiceOverloadError):
+                await scheduler.submit(rejected_task())
+            waiters = [scheduler.submit(sample_task()) for _ in range(4)]
+            await asyncio.sleep(0.1)
+            # 等待暂停结束的调用不占用名额
+            self.assertEqual(scheduler.workers_lock.get_value(), 1)
+            self.assertEqual(await asyncio.gather(*waiters), ["ok"] * 4)
+            # 暂停结束后清零，之后的调用不再等待
+            self.assertEqual(scheduler._cooldown_until, 0)
+
+        self.loop.run_until_complete(test_cooldown())
+
+    def test_submit_priority(self):
+        async def test_priority():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=1, priority_weights={0: 1000}
+            )
+            order: list[str] = []
+
+            async def sample_task(name: str):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+            batch = [
+                scheduler.submit(sample_task(f"batch{i}"), priority=1) for i in range(3)
+            ]
+            await asyncio.sleep(0)
+            interactive = scheduler.submit(sample_task("user"))
+            await asyncio.gather(*batch, interactive)
+            # 第一个后台调用已在执行，交互式调用排在其余后台调用之前
+            self.assertEqual(order, ["batch0", "user", "batch1", "batch2"])
+
+        self.loop.run_until_complete(test_priority())
+
+    def test_asubmit_priority(self):
+        async def test_priority():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=1, max_pending=8
+            )
+            order: list[str] = []
+
+            async def sample_task(name: str):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+            futures = [
+                await scheduler.asubmit(sample_task(f"batch{i}"), priority=1)
+                for i in range(3)
+            ]
+            await asyncio.sleep(0.001)
+            # 分发器正拿着 batch1 等待名额，后到的交互式调用仍应先执行
+            futures.append(await scheduler.asubmit(sample_task("user")))
+            await asyncio.gather(*futures)
+            self.assertEqual(order, ["batch0", "user", "batch1", "batch2"])
+            await scheduler.shutdown()
+
+        self.loop.run_until_complete(test_priority())
+
+    def test_asubmit_priority_is_weighted_fair(self):
+        async def test_priority():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=2, initial_concurrency=2, max_pending=100
+            )
+            order: list[int] = []
+
+            async def sample_task(priority: int):
+                order.append(priority)
+                await asyncio.sleep(0.001)
+
+            futures = [
+                await scheduler.asubmit(sample_task(1), priority=1) for _ in range(10)
+            ]
+            futures += [await scheduler.asubmit(sample_task(0)) for _ in range(40)]
+            await asyncio.gather(*futures)
+            # 与 submit 相同按 4:1 分配名额，后台调用不会等到所有交互式调用结束
+            self.assertGreaterEqual(order[2:42].count(1), 5)
+            await scheduler.shutdown()
+
+        self.loop.run_until_complete(test_priority())
+
+    def test_thread_safe_limiter_shared_across_loops(self):
+        scheduler = AdaptiveAsyncConcurrencyLimiter(
+            max_concurrency=4, initial_concurrency=4, thread_safe=True
+        )
+        lock = threading.Lock()
+        running = 0
+        max_running = 0
+
+        async def sample_task():
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            await asyncio.sleep(0.005)
+            with lock:
+                running -= 1
+
+        async def run_tasks():
+            await asyncio.gather(*[scheduler.submit(sample_task()) for _ in range(20)])
+
+        threads = [
+            threading.Thread(target=asyncio.run, args=(run_tasks(),)) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 所有线程共享同一个并发上限
+        self.assertLessEqual(max_running, 4)
+        self.assertEqual(
+            scheduler.workers_lock.get_value(), scheduler.workers_lock.initial_value
+        )
+        self.assertEqual(scheduler.current_running_count, 0)
+
+
+class TestTimerDrivenControl(unittest.TestCase):
+    def setUp(self):
+        self.loop = VirtualTimeEventLoop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _slow_backend(self, capacity: int, latency: float):
+        in_flight = 0
+
+        async def call():
+            nonlocal in_flight
+            if in_flight >= capacity:
+                await asyncio.sleep(0.01)
+                raise ServiceOverloadError()
+            in_flight += 1
+            try:
+                await asyncio.sleep(latency)
+            finally:
+                in_flight -= 1
+
+        return call
+
+    def test_reacts_to_overload_before_slow_calls_finish(self):
+        async def limit_after_two_seconds(control_interval):
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=16,
+                initial_concurrency=16,
+                control_interval=control_interval,
+                log_level="ERROR",
+            )
+            call = self._slow_backend(capacity=4, latency=120)
+            tasks = [scheduler.submit(call()) for _ in range(16)]
+            await asyncio.sleep(2)
+            limit = scheduler.workers_lock.initial_value
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await scheduler.shutdown()
+            return limit
+
+        # 按完成数分轮时，要等到慢调用结束才会调整
+        self.assertEqual(
+            self.loop.run_until_complete(limit_after_two_seconds(None)), 16
+        )
+        self.assertLess(self.loop.run_until_complete(limit_after_two_seconds(1)), 16)
+
+    def test_slow_calls_increase_only_when_limit_is_used(self):
+        async def run():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=64,
+                initial_concurrency=4,
+                control_interval=1,
+                log_level="ERROR",
+            )
+            for _ in range(3):
+                await scheduler.submit(asyncio.sleep(30))
+            limit = scheduler.workers_lock.initial_value
+            tasks = [scheduler.submit(asyncio.sleep(30)) for _ in range(64)]
+            await asyncio.sleep(45)
+            limit_while_saturated = scheduler.workers_lock.initial_value
+            await asyncio.gather(*tasks)
+            await scheduler.shutdown()
+            return limit, limit_while_saturated
+
+        limit_while_underused, limit_while_saturated = self.loop.run_until_complete(
+            run()
+        )
+        self.assertEqual(limit_while_underused, 4)
+        self.assertGreater(limit_while_saturated, 4)
+
+    def test_idle_decay(self):
+        async def run():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                min_concurrency=2,
+                initial_concurrency=32,
+                control_interval=1,
+                stats_window_seconds=5,
+                idle_decay=0.5,
+                log_level="ERROR",
+            )
+            await scheduler.submit(asyncio.sleep(0.1))
+            await asyncio.sleep(4)
+            # 滑动窗口内仍有调用，不算空闲
+            limit_before_idle = scheduler.workers_lock.initial_value
+            await asyncio.sleep(60)
+            limit_after_idle = scheduler.workers_lock.initial_value
+            await scheduler.shutdown()
+            return limit_before_idle, limit_after_idle
+
+        limit_before_idle, limit_after_idle = self.loop.run_until_complete(run())
+        self.assertEqual(limit_before_idle, 32)
+        self.assertEqual(limit_after_idle, 2)
+
+    def test_invalid_control_interval(self):
+        with self.assertRaises(ValueError):
+            AdaptiveAsyncConcurrencyLimiter(control_interval=0)
+
+
+class TestControlEpochs(unittest.TestCase):
+    def setUp(self):
+        self.loop = VirtualTimeEventLoop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_stale_overloads_do_not_cascade(self):
+        async def run():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=16, initial_concurrency=16, log_level="ERROR"
+            )
+
+            async def call(i):
+                started_at = self.loop.time()
+                # 前 16 个调用在过载期间放行，陆续在调整之后才结束
+                await asyncio.sleep(1 + i * 0.25 if i < 16 else 1)
+                if started_at < 0.5:
+                    raise ServiceOverloadError()
+
+            await asyncio.gather(
+                *[scheduler.submit(call(i)) for i in range(200)],
+                return_exceptions=True,
+            )
+            await scheduler.shutdown()
+            return scheduler.metrics.limit_decrease_total, scheduler.control_epoch
+
+        limit_decrease_total, control_epoch = self.loop.run_until_complete(run())
+        # 一次过载只降低一次并发上限，之后的提高不开始新的控制周期
+        self.assertEqual(limit_decrease_total, 1)
+        self.assertEqual(control_epoch, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
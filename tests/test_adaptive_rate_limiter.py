@@ -0,0 +1,141 @@
+import asyncio
+import unittest
+
+from adaptio import (
+    AdaptiveAsyncConcurrencyLimiter,
+    AdaptiveRateLimiter,
+    ServiceOverloadError,
+    with_adaptive_retry,
+)
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_rate_is_limited(self):
+        async def test_scheduler():
+            scheduler = AdaptiveRateLimiter(initial_qps=20, max_qps=20, max_burst=1)
+
+            async def sample_task(task_id):
+                return task_id
+
+            start = asyncio.get_running_loop().time()
+            results = await asyncio.gather(
+                *[scheduler.submit(sample_task(i)) for i in range(6)]
+            )
+            elapsed = asyncio.get_running_loop().time() - start
+
+            self.assertEqual(results, list(range(6)))
+            # 第一个请求立即放行，其余 5 个按 20 QPS 间隔放行
+            self.assertGreaterEqual(elapsed, 0.24)
+
+        self.loop.run_until_complete(test_scheduler())
+
+    def test_adjust_rate(self):
+        async def test_adjust():
+            scheduler = AdaptiveRateLimiter(initial_qps=10, max_qps=100)
+
+            scheduler.current_finished_count = 10
+            scheduler.current_succeed_count = 10
+            scheduler.adjust_rate()
+            self.assertEqual(scheduler.current_qps, 11)
+            scheduler.reset_counters()
+
+            scheduler.current_finished_count = 10
+            scheduler.current_overload_count = 5
+            scheduler.adjust_rate()
+            self.assertEqual(scheduler.current_qps, 8)
+            self.assertEqual(scheduler.increase_step, 1)
+
+        self.loop.run_until_complete(test_adjust())
+
+    def test_custom_controller(self):
+        class FixedStepController:
+            def __init__(self):
+                self.samples = []
+
+            def next_limit(self, sample):
+                self.samples.append(sample)
+                return sample.current_limit - 3 if sample.overloaded else 1000
+
+        async def test_adjust():
+            controller = FixedStepController()
+            scheduler = AdaptiveRateLimiter(
+                initial_qps=10, max_qps=100, controller=controller
+            )
+
+            scheduler.current_finished_count = 10
+            scheduler.current_succeed_count = 10
+            scheduler.adjust_rate()
+            # 返回值被截断到 max_qps
+            self.assertEqual(scheduler.current_qps, 100)
+            scheduler.reset_counters()
+
+            scheduler.current_finished_count = 10
+            scheduler.current_overload_count = 5
+            scheduler.adjust_rate()
+            self.assertEqual(scheduler.current_qps, 97)
+            self.assertEqual(
+                [(s.current_limit, s.overloaded) for s in controller.samples],
+                [(10, False), (100, True)],
+            )
+            with self.assertRaises(AttributeError):
+                scheduler.increase_step = 2
+
+        self.loop.run_until_complete(test_adjust())
+
+    def test_overload_lowers_rate(self):
+        async def test_overload():
+            scheduler = AdaptiveRateLimiter(initial_qps=100, max_qps=100, max_burst=10)
+
+            async def overloaded_task():
+                raise ServiceOverloadError("Service overloaded")
+
+            tasks = [scheduler.submit(overloaded_task()) for _ in range(101)]
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.assertLess(scheduler.current_qps, 100)
+
+        self.loop.run_until_complete(test_overload())
+
+    def test_with_rate_and_concurrency_limits(self):
+        async def test_retry():
+            rate_scheduler = AdaptiveRateLimiter(initial_qps=50, max_qps=50)
+            concurrency_scheduler = AdaptiveAsyncConcurrencyLimiter(
+                initial_concurrency=2, max_concurrency=2
+            )
+            attempts = 0
+            running = 0
+            max_running = 0
+
+            @with_adaptive_retry(
+                scheduler=[rate_scheduler, concurrency_scheduler],
+                retry_interval_seconds=0.01,
+            )
+            async def sample_task(task_id):
+                nonlocal attempts, running, max_running
+                attempts += 1
+                running += 1
+                max_running = max(max_running, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+                if attempts == 1:
+                    raise ServiceOverloadError("Service overloaded")
+                return task_id
+
+            results = await asyncio.gather(*[sample_task(i) for i in range(5)])
+            self.assertEqual(results, list(range(5)))
+            self.assertEqual(attempts, 6)
+            self.assertLessEqual(max_running, 2)
+            self.assertEqual(rate_scheduler.log_prefix, "sample_task")
+            self.assertEqual(concurrency_scheduler.log_prefix, "sample_task")
+
+        self.loop.run_until_complete(test_retry())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,9 @@
 import asyncio
+import threading
 import unittest
 import warnings
 
-from adaptio import AdjustableSemaphore
+from adaptio import AdjustableSemaphore, ThreadSafeAdjustableSemaphore
 
 
 class TestAdjustableSemaphore(unittest.TestCase):
@@ -69,6 +70,229 @@ class TestAdjustableSemaphore(unittest.TestCase):
 
         self.loop.run_until_complete(test_sem())
 
+    def test_fifo_wakeup_order(self):
+        async def test_sem():
+            sem = AdjustableSemaphore(initial_value=1)
+            order: list[int] = []
+
+            async def task(i: int):
+                async with sem:
+                    order.append(i)
+                    await asyncio.sleep(0.01)
+
+            await asyncio.gather(*[task(i) for i in range(5)])
+            self.assertEqual(order, [0, 1, 2, 3, 4])
+            self.assertEqual(sem.get_value(), 1)
+
+        self.loop.run_until_complete(test_sem())
+
+    def test_sync_fast_path_and_release(self):
+        async def test_sem():
+            sem = AdjustableSemaphore(initial_value=2)
+            self.assertFalse(sem.locked())
+            self.assertTrue(await sem.acquire())
+            self.assertTrue(await sem.acquire())
+            self.assertTrue(sem.locked())
+            self.assertEqual(sem.get_value(), 0)
+
+            # release 是同步方法
+            sem.release()
+            sem.release()
+            self.assertEqual(sem.get_value(), 2)
+
+        self.loop.run_until_complete(test_sem())
+
+    def test_shrink_below_running_count(self):
+        async def test_sem():
+            sem = AdjustableSemaphore(initial_value=3)
+            for _ in range(3):
+                await sem.acquire()
+
+            # 缩容后计数为负，需要归还足够的名额才会放行新的等待者
+            await sem.set_value(1)
+            self.assertEqual(sem.get_value(), -2)
+
+            waiter = asyncio.create_task(sem.acquire())
+            await asyncio.sleep(0)
+            sem.release()
+            sem.release()
+            await asyncio.sleep(0)
+            self.assertFalse(waiter.done())
+            self.assertEqual(sem.get_value(), 0)
+
+            sem.release()
+            await asyncio.sleep(0)
+            self.assertTrue(waiter.done())
+            self.assertEqual(sem.get_value(), 0)
+
+            # 扩容时精确唤醒与新增名额数量相同的等待者
+            waiters = [asyncio.create_task(sem.acquire()) for _ in range(3)]
+            await asyncio.sleep(0)
+            await sem.set_value(3)
+            await asyncio.sleep(0)
+            self.assertEqual(sum(w.done() for w in waiters), 2)
+            sem.release()
+            await asyncio.gather(*waiters)
+
+        self.loop.run_until_complete(test_sem())
+
+    def test_cancelled_waiter_passes_permit_on(self):
+        async def test_sem():
+            sem = AdjustableSemaphore(initial_value=1)
+            await sem.acquire()
+
+            first = asyncio.create_task(sem.acquire())
+            second = asyncio.create_task(sem.acquire())
+            await asyncio.sleep(0)
+
+            # first 已被唤醒但尚未运行时被取消，名额应转交给 second
+            sem.release()
+            first.cancel()
+            await asyncio.gather(first, return_exceptions=True)
+            await asyncio.sleep(0)
+            self.assertTrue(first.cancelled())
+            self.assertTrue(second.done())
+            self.assertEqual(sem.get_value(), 0)
+
+        self.loop.run_until_complete(test_sem())
+
+    def test_cancelled_priority_class_leaves_schedule(self):
+        async def test_sem():
+            sem = AdjustableSemaphore(initial_value=1)
+            await sem.acquire()
+
+            batch = [asyncio.create_task(sem.acquire(1)) for _ in range(2)]
+            user = asyncio.create_task(sem.acquire(0))
+            await asyncio.sleep(0)
+            for task in batch:
+                task.cancel()
+            await asyncio.gather(*batch, return_exceptions=True)
+            # 整个优先级的等待者都被取消后不再参与调度
+            self.assertEqual([p for _, p in sem._schedule], [0])
+
+            sem.release()
+            await user
+            self.assertEqual(sem._schedule, [])
+            sem.release()
+            self.assertEqual(sem.get_value(), 1)
+
+        self.loop.run_until_complete(test_sem())
+
+    def test_priority_wakeup_order(self):
+        async def test_sem():
+            sem = AdjustableSemaphore(initial_value=1, priority_weights={0: 1000})
+            await sem.acquire()
+            order: list[str] = []
+
+            async def task(name: str, priority: int):
+                async with sem.prioritized(priority):
+                    order.append(name)
+
+            tasks = [asyncio.create_task(task(f"batch{i}", 1)) for i in range(3)]
+            await asyncio.sleep(0)
+            tasks += [asyncio.create_task(task(f"user{i}", 0)) for i in range(2)]
+            await asyncio.sleep(0)
+            self.assertEqual(sem.waiting_count, 5)
+
+            sem.release()
+            await asyncio.gather(*tasks)
+            # 后到的高优先级调用先获得名额，同一优先级内 FIFO
+            self.assertEqual(order, ["user0", "user1", "batch0", "batch1", "batch2"])
+
+        self.loop.run_until_complete(test_sem())
+
+    def test_extreme_priorities(self):
+        async def test_sem():
+            sem = AdjustableSemaphore(initial_value=1)
+            await sem.acquire()
+            order: list[int] = []
+
+            async def task(priority: int):
+                async with sem.prioritized(priority):
+                    order.append(priority)
+
+            # 默认权重在这些优先级下会下溢为 0 或溢出，边界之外仍按数值大小排序
+            priorities = [1000, -600, 600, -1000]
+            tasks = [asyncio.create_task(task(p)) for p in priorities]
+            await asyncio.sleep(0)
+            sem.release()
+            await asyncio.gather(*tasks)
+            self.assertEqual(order, sorted(priorities))
+            self.assertEqual(sem.get_value(), 1)
+
+        self.loop.run_until_complete(test_sem())
+
+    def test_weighted_fair_sharing(self):
+        async def test_sem():
+            sem = AdjustableSemaphore(initial_value=1, priority_weights={0: 3, 1: 1})
+            await sem.acquire()
+            order: list[int] = []
+
+            async def task(priority: int):
+                async with sem.prioritized(priority):
+                    order.append(priority)
+
+            tasks = [asyncio.create_task(task(p)) for p in [0] * 20 + [1] * 20]
+            await asyncio.sleep(0)
+            sem.release()
+            await asyncio.gather(*tasks)
+            # 名额紧张时按 3:1 分配，低优先级不会被饿死
+            self.assertEqual(order[:8].count(1), 2)
+            self.assertEqual(sorted(order), [0] * 20 + [1] * 20)
+
+        self.loop.run_until_complete(test_sem())
+
+    def test_thread_safe_semaphore_across_threads(self):
+        sem = ThreadSafeAdjustableSemaphore(initial_value=3)
+        lock = threading.Lock()
+        running = 0
+        max_running = 0
+
+        async def worker():
+            nonlocal running, max_running
+            async with sem:
+                with lock:
+                    running += 1
+                    max_running = max(max_running, running)
+                await asyncio.sleep(0.005)
+                with lock:
+                    running -= 1
+
+        async def run_workers():
+            await asyncio.gather(*[worker() for _ in range(20)])
+
+        # 每个线程运行自己的事件循环，共享同一个信号量
+        threads = [
+            threading.Thread(target=asyncio.run, args=(run_workers(),))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(max_running, 3)
+        self.assertEqual(sem.get_value(), 3)
+
+    def test_thread_safe_cancelled_waiter_returns_permit(self):
+        async def test_sem():
+            sem = ThreadSafeAdjustableSemaphore(initial_value=1)
+            await sem.acquire()
+            waiter = asyncio.create_task(sem.acquire())
+            await asyncio.sleep(0)
+
+            # 从另一个线程释放名额，名额送达前等待者被取消
+            thread = threading.Thread(target=sem.release)
+            thread.start()
+            thread.join()
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            await asyncio.sleep(0)
+            self.assertEqual(sem.get_value(), 1)
+            self.assertFalse(sem.locked())
+
+        self.loop.run_until_complete(test_sem())
+
     def test_semaphore_across_event_loops(self):
         """测试在多次调用asyncio.run()之间重用信号量的行为"""
 
@@ -213,6 +437,28 @@ class TestAdjustableSemaphore(unittest.TestCase):
             self.assertEqual(len(results), 2)
             self.assertTrue(all(results))
 
+    def test_ignored_loop_bound_exception_does_not_inflate_value(self):
+        """忽略循环绑定异常时没有拿到名额，退出 async with 时也不能归还名额"""
+        sem = AdjustableSemaphore(initial_value=1, ignore_loop_bound_exception=True)
+
+        async def task(priority):
+            async with sem.prioritized(priority) if priority else sem:
+                await asyncio.sleep(0.01)
+
+        async def run_tasks():
+            await asyncio.gather(*(task(i % 2) for i in range(4)))
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            asyncio.run(run_tasks())
+            self.assertEqual(sem.get_value(), 1)
+            # 第二个事件循环中排队的任务触发循环绑定异常
+            asyncio.run(run_tasks())
+            self.assertEqual(sem.get_value(), 1)
+            asyncio.run(run_tasks())
+            self.assertEqual(sem.get_value(), 1)
+        self.assertEqual(sem._unacquired_contexts, {})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from adaptio import (
+    ConstantBackoff,
+    DecorrelatedJitterBackoff,
+    ExponentialBackoff,
+    FullJitterBackoff,
+    ServiceOverloadError,
+)
+from adaptio.backoff import create_backoff, retry_delay
+
+
+class TestBackoff(unittest.TestCase):
+    def test_constant(self):
+        policy = ConstantBackoff(0.5)
+        self.assertEqual([policy.next_delay(i, 0) for i in range(1, 4)], [0.5] * 3)
+
+    def test_exponential(self):
+        policy = ExponentialBackoff(base=1, max_delay=5)
+        self.assertEqual(
+            [policy.next_delay(i, 0) for i in range(1, 6)], [1, 2, 4, 5, 5]
+        )
+
+    def test_full_jitter(self):
+        policy = FullJitterBackoff(base=1, max_delay=8)
+        for attempt in range(1, 10):
+            delay = policy.next_delay(attempt, 0)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(8, 2 ** (attempt - 1)))
+
+    def test_decorrelated_jitter(self):
+        policy = DecorrelatedJitterBackoff(base=1, max_delay=10)
+        delay = 0.0
+        for attempt in range(1, 20):
+            previous = delay
+            delay = policy.next_delay(attempt, previous)
+            self.assertGreaterEqual(delay, 1)
+            self.assertLessEqual(delay, min(10, max(1, previous * 3)))
+
+    def test_retry_after_is_lower_bound(self):
+        policy = ConstantBackoff(1)
+        error = ServiceOverloadError("overloaded", retry_after=30)
+        self.assertEqual(retry_delay(policy, 1, 0, error), 30)
+        self.assertEqual(retry_delay(policy, 1, 0, ServiceOverloadError()), 1)
+
+    def test_create_backoff(self):
+        self.assertIsInstance(create_backoff("exponential", 1, 60), ExponentialBackoff)
+        with self.assertRaises(ValueError):
+            create_backoff("unknown", 1, 60)  # type: ignore[arg-type]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+from adaptio import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_trips_on_failure_rate(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            failure_rate_threshold=0.5, minimum_calls=4, open_seconds=10, clock=clock
+        )
+        breaker.record_success()
+        breaker.record_overload()
+        breaker.record_success()
+        # 调用数不足 minimum_calls 时不熔断
+        self.assertEqual(breaker.state, "closed")
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow_request())
+        self.assertEqual(breaker.retry_after, 10)
+        self.assertEqual(breaker.open_count, 1)
+
+    def test_half_open_probes(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            minimum_calls=1, open_seconds=5, half_open_max_calls=2, clock=clock
+        )
+        breaker.record_overload()
+        self.assertEqual(breaker.state, "open")
+
+        clock.now = 5
+        self.assertEqual(breaker.state, "half_open")
+        self.assertTrue(breaker.allow_request())
+        self.assertTrue(breaker.allow_request())
+        # 探测名额用完
+        self.assertFalse(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "half_open")
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.allow_request())
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(minimum_calls=1, open_seconds=5, clock=clock)
+        breaker.record_overload()
+        clock.now = 5
+        self.assertTrue(breaker.allow_request())
+        breaker.record_overload()
+        self.assertEqual(breaker.state, "open")
+        self.assertEqual(breaker.open_count, 2)
+
+    def test_cancelled_probe_returns_slot(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(minimum_calls=1, open_seconds=5, clock=clock)
+        breaker.record_overload()
+        clock.now = 5
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        breaker.record_cancelled()
+        self.assertTrue(breaker.allow_request())
+
+    def test_ignore_failures(self):
+        breaker = CircuitBreaker(minimum_calls=2, trip_on_failures=False)
+        for _ in range(10):
+            breaker.record_failure()
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(breaker.failure_rate, 0)
+
+    def test_sliding_window(self):
+        breaker = CircuitBreaker(
+            failure_rate_threshold=0.5, minimum_calls=4, window_size=4
+        )
+        for _ in range(4):
+            breaker.record_success()
+        breaker.record_overload()
+        self.assertEqual(breaker.failure_rate, 0.25)
+        # 早期的成功被挤出窗口
+        breaker.record_success()
+        breaker.record_success()
+        breaker.record_success()
+        self.assertEqual(breaker.failure_rate, 0.25)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            CircuitBreaker(failure_rate_threshold=0)
+        with self.assertRaises(ValueError):
+            CircuitBreaker(minimum_calls=10, window_size=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import unittest
+
+from adaptio import (
+    AdaptiveAsyncConcurrencyLimiter,
+    AIMDController,
+    CubicController,
+    RenoController,
+    VegasController,
+    WindowSample,
+)
+
+
+def make_sample(
+    current_limit: int,
+    overloaded: bool = False,
+    avg_latency: float = 0.1,
+    min_latency: float | None = None,
+    timestamp: float = 0.0,
+) -> WindowSample:
+    return WindowSample(
+        current_limit=current_limit,
+        finished_count=10,
+        succeed_count=10,
+        overload_count=5 if overloaded else 0,
+        failed_count=0,
+        running_count=current_limit,
+        latency_sum=avg_latency * 10,
+        min_latency=avg_latency if min_latency is None else min_latency,
+        overloaded=overloaded,
+        timestamp=timestamp,
+    )
+
+
+class TestCongestionControllers(unittest.TestCase):
+    def test_aimd(self):
+        controller = AIMDController()
+        self.assertEqual(controller.next_limit(make_sample(10)), 11)
+        self.assertEqual(controller.next_limit(make_sample(11)), 13)
+        self.assertEqual(controller.next_limit(make_sample(13)), 17)
+        # 过载时乘以下降因子并重置步长
+        self.assertEqual(controller.next_limit(make_sample(16, overloaded=True)), 12)
+        self.assertEqual(controller.next_limit(make_sample(12)), 13)
+
+    def test_reno_slow_start_and_ssthresh(self):
+        controller = RenoController()
+        self.assertEqual(controller.next_limit(make_sample(4)), 8)
+        self.assertEqual(controller.next_limit(make_sample(8)), 16)
+        self.assertEqual(controller.next_limit(make_sample(16, overloaded=True)), 8)
+        self.assertEqual(controller.ssthresh, 8)
+        # 超过 ssthresh 后进入拥塞避免
+        self.assertEqual(controller.next_limit(make_sample(8)), 9)
+        self.assertEqual(controller.next_limit(make_sample(9)), 10)
+
+    def test_cubic_grows_back_towards_w_max(self):
+        controller = CubicController()
+        after_loss = controller.next_limit(make_sample(100, overloaded=True))
+        self.assertEqual(after_loss, 70)
+
+        # 刚降低后增长平缓，接近 K 时回到 W_max 附近，之后加速增长
+        early = controller.next_limit(make_sample(70, timestamp=1.0))
+        near_k = controller.next_limit(make_sample(70, timestamp=controller.k))
+        late = controller.next_limit(make_sample(100, timestamp=controller.k + 10))
+        self.assertLess(early, near_k)
+        self.assertAlmostEqual(near_k, 100, delta=2)
+        self.assertGreater(late, 100)
+
+    def test_vegas_uses_queue_estimate(self):
+        controller = VegasController()
+        # 延迟等于基准时没有排队，应增加并发
+        self.assertEqual(controller.next_limit(make_sample(20, avg_latency=0.1)), 21)
+        # 延迟翻倍意味着约一半的请求在排队，应减少并发
+        self.assertEqual(
+            controller.next_limit(make_sample(20, avg_latency=0.2, min_latency=0.2)),
+            19,
+        )
+        self.assertEqual(controller.next_limit(make_sample(20, overloaded=True)), 18)
+
+
+class TestLimiterWithController(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_custom_controller(self):
+        samples: list[WindowSample] = []
+
+        class FixedController:
+            def next_limit(self, sample: WindowSample) -> int:
+                samples.append(sample)
+                return 1000
+
+        async def test_controller():
+            scheduler = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=8, initial_concurrency=2, controller=FixedController()
+            )
+
+            async def sample_task():
+                await asyncio.sleep(0.01)
+
+            await asyncio.gather(*[scheduler.submit(sample_task()) for _ in range(3)])
+            self.assertEqual(len(samples), 1)
+            self.assertEqual(samples[0].current_limit, 2)
+            self.assertEqual(samples[0].succeed_count, 3)
+            self.assertIsNotNone(samples[0].min_latency)
+            # 返回值会被截断到 max_concurrency
+            self.assertEqual(scheduler.workers_lock.initial_value, 8)
+
+        self.loop.run_until_complete(test_controller())
+
+    def test_controller_by_name(self):
+        for name, controller_type in [
+            ("aimd", AIMDController),
+            ("reno", RenoController),
+            ("cubic", CubicController),
+            ("vegas", VegasController),
+        ]:
+            scheduler = AdaptiveAsyncConcurrencyLimiter(controller=name)  # type: ignore[arg-type]
+            self.assertIsInstance(scheduler.controller, controller_type)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,275 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from adaptio import (
+    CoordinatedAdaptiveLimiter,
+    LimitCoordinator,
+    LimiterHooks,
+    ServiceOverloadError,
+)
+
+
+class TestLimitCoordinator(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_allocations_share_the_limit(self):
+        async def test_sync():
+            coordinator = LimitCoordinator(initial_concurrency=4, log_level="WARNING")
+            first = coordinator.sync(resource="api", client="a", want=10)
+            second = coordinator.sync(resource="api", client="b", want=10)
+
+            # 第一个客户端拿走全部名额，分配总数不超过上限
+            self.assertEqual(first["allocation"], 4)
+            self.assertEqual(second["allocation"], 0)
+            # 第一个客户端下一次同步时让出平均份额，第二个客户端随后拿到
+            first = coordinator.sync(resource="api", client="a", want=10)
+            self.assertEqual(first["allocation"], 2)
+            second = coordinator.sync(resource="api", client="b", want=10)
+            self.assertEqual(second["allocation"], 2)
+
+            # want=0 归还名额
+            coordinator.sync(resource="api", client="a", want=0)
+            second = coordinator.sync(resource="api", client="b", want=10)
+            self.assertEqual(second["allocation"], 4)
+
+        self.loop.run_until_complete(test_sync())
+
+    def test_reports_adjust_the_shared_limit(self):
+        async def test_sync():
+            coordinator = LimitCoordinator(
+                initial_concurrency=8, max_concurrency=16, log_level="WARNING"
+            )
+            coordinator.sync(resource="api", client="a", want=8, overload=5, succeed=4)
+            limit = coordinator.resource_limit("api")
+            self.assertLess(limit, 8)
+
+            # 并发上限没有被用满的一轮不会提高上限
+            coordinator.sync(resource="api", client="b", want=8, succeed=limit + 1)
+            self.assertEqual(coordinator.resource_limit("api"), limit)
+            coordinator.sync(
+                resource="api", client="b", want=8, running=limit, succeed=limit + 1
+            )
+            self.assertGreater(coordinator.resource_limit("api"), limit)
+            # 不同资源的上限互不影响
+            self.assertEqual(coordinator.resource_limit("other"), 8)
+
+        self.loop.run_until_complete(test_sync())
+
+    def test_clients_converge_on_backend_capacity(self):
+        async def test_clients():
+            capacity = 6
+            running = 0
+            peak = 0
+
+            async def backend_call():
+                nonlocal running, peak
+                running += 1
+                peak = max(peak, running)
+                try:
+                    await asyncio.sleep(0.005)
+                    if running > capacity:
+                        raise ServiceOverloadError("too many requests")
+                finally:
+                    running -= 1
+
+            async with LimitCoordinator(
+                initial_concurrency=2, max_concurrency=64, log_level="WARNING"
+            ) as coordinator:
+                clients = [
+                    CoordinatedAdaptiveLimiter(
+                        coordinator.address,
+                        resource="api",
+                        sync_interval_seconds=0.01,
+                        max_concurrency=64,
+                        initial_concurrency=1,
+                        log_level="WARNING",
+                    )
+                    for _ in range(3)
+                ]
+
+                await asyncio.gather(
+                    *(
+                        client.submit(backend_call())
+                        for client in clients
+                        for _ in range(150)
+                    ),
+                    return_exceptions=True,
+                )
+                self.assertTrue(all(client.coordinated for client in clients))
+                # 三个客户端共享一个上限，而不是各自学到一份容量
+                self.assertLess(coordinator.resource_limit("api"), capacity * 3)
+                self.assertLess(peak, capacity * 3)
+                for client in clients:
+                    await client.shutdown()
+                self.assertEqual(coordinator.resources["api"].allocations, {})
+
+        self.loop.run_until_complete(test_clients())
+
+    def test_sync_goes_through_limit_changes_and_respects_cooldown(self):
+        async def test_sync():
+            adjustments = []
+
+            class RecordAdjust(LimiterHooks):
+                def on_adjust(self, event):
+                    adjustments.append((event.old_limit, event.new_limit))
+
+            async with LimitCoordinator(
+                initial_concurrency=8, log_level="WARNING"
+            ) as coordinator:
+                client = CoordinatedAdaptiveLimiter(
+                    coordinator.address,
+                    resource="api",
+                    sync_interval_seconds=0.01,
+                    initial_concurrency=2,
+                    hooks=[RecordAdjust()],
+                    log_level="ERROR",
+                )
+                tasks = [client.submit(asyncio.sleep(0.5)) for _ in range(8)]
+                await asyncio.sleep(0.1)
+                self.assertEqual(client.workers_lock.initial_value, 8)
+                self.assertEqual(adjustments[-1], (2, 8))
+                adjusted = len(adjustments)
+
+                # 服务端要求退避：降到探测规模，开始新的控制周期
+                client._enter_cooldown(60)
+                self.assertEqual(client.workers_lock.initial_value, 1)
+                self.assertEqual(client.control_epoch, 1)
+                # 暂停期间同步不会覆盖探测规模的并发上限
+                await asyncio.sleep(0.1)
+                self.assertEqual(client.workers_lock.initial_value, 1)
+                self.assertEqual(len(adjustments), adjusted)
+
+                await asyncio.gather(*tasks)
+                await client.shutdown()
+
+        self.loop.run_until_complete(test_sync())
+
+    def test_zero_allocations_keep_the_fleet_cap(self):
+        async def test_clients():
+            running = 0
+            peak = 0
+
+            async def backend_call():
+                nonlocal running, peak
+                running += 1
+                peak = max(peak, running)
+                try:
+                    await asyncio.sleep(0.02)
+                finally:
+                    running -= 1
+
+            async with LimitCoordinator(
+                initial_concurrency=1, max_concurrency=1, log_level="WARNING"
+            ) as coordinator:
+                clients = [
+                    CoordinatedAdaptiveLimiter(
+                        coordinator.address,
+                        resource="api",
+                        sync_interval_seconds=0.01,
+                        min_concurrency=0,
+                        initial_concurrency=0,
+                        log_level="WARNING",
+                    )
+                    for _ in range(3)
+                ]
+                await asyncio.gather(
+                    *(
+                        client.submit(backend_call())
+                        for client in clients
+                        for _ in range(3)
+                    )
+                )
+                # 客户端数多于上限时分不到名额的客户端等待，而不是各自至少放行一个
+                self.assertEqual(peak, 1)
+                for client in clients:
+                    await client.shutdown()
+
+        self.loop.run_until_complete(test_clients())
+
+    def test_unix_socket(self):
+        async def test_unix():
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "coordinator.sock")
+                async with LimitCoordinator(
+                    path=path, initial_concurrency=3, log_level="WARNING"
+                ):
+                    client = CoordinatedAdaptiveLimiter(
+                        path, resource="api", log_level="WARNING"
+                    )
+                    await client.sync()
+                    self.assertTrue(client.coordinated)
+                    # 空闲的客户端不占用名额，提交调用后由之后的同步分到名额
+                    self.assertEqual(client.workers_lock.initial_value, 0)
+                    self.assertEqual(
+                        await client.submit(asyncio.sleep(0.01, "ok")), "ok"
+                    )
+                    self.assertEqual(client.workers_lock.initial_value, 1)
+                    await client.shutdown()
+
+        self.loop.run_until_complete(test_unix())
+
+    def test_falls_back_to_local_control(self):
+        async def test_fallback():
+            coordinator = LimitCoordinator(initial_concurrency=3, log_level="WARNING")
+            await coordinator.start()
+            client = CoordinatedAdaptiveLimiter(
+                coordinator.address,
+                resource="api",
+                initial_concurrency=3,
+                max_concurrency=8,
+                log_level="WARNING",
+            )
+            await client.sync()
+            self.assertTrue(client.coordinated)
+            await coordinator.close()
+
+            await client.sync()
+            self.assertFalse(client.coordinated)
+
+            async def sample_task():
+                return "ok"
+
+            # 协调服务不可用时仍然可以工作，并按本地结果调整并发数
+            limit = client.workers_lock.initial_value
+            for _ in range(limit + 1):
+                self.assertEqual(await client.submit(sample_task()), "ok")
+            self.assertGreater(client.workers_lock.initial_value, limit)
+            await client.shutdown()
+
+        self.loop.run_until_complete(test_fallback())
+
+    def test_unreachable_coordinator_keeps_local_rounds(self):
+        async def test_fallback():
+            coordinator = LimitCoordinator(log_level="WARNING")
+            await coordinator.start()
+            address = coordinator.address
+            await coordinator.close()
+
+            client = CoordinatedAdaptiveLimiter(
+                address,
+                resource="api",
+                sync_interval_seconds=0.01,
+                max_concurrency=64,
+                log_level="ERROR",
+            )
+            # 每次同步失败都不会清空本地的本轮统计，本地控制照常提高并发数
+            for _ in range(6):
+                await asyncio.gather(
+                    *(client.submit(asyncio.sleep(0.02)) for _ in range(64))
+                )
+            self.assertFalse(client.coordinated)
+            self.assertGreaterEqual(client.workers_lock.initial_value, 16)
+            await client.shutdown()
+
+        self.loop.run_until_complete(test_fallback())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import asyncio
+import unittest
+
+from adaptio import (
+    AdaptiveAsyncConcurrencyLimiter,
+    HedgePolicy,
+    ServiceOverloadError,
+    VirtualTimeEventLoop,
+    with_adaptive_retry,
+)
+
+
+class TestHedgePolicy(unittest.TestCase):
+    def test_delay_tracks_percentile(self):
+        policy = HedgePolicy(percentile=0.9, min_samples=10, max_delay=5)
+        for _ in range(9):
+            policy.observe(0.1)
+        self.assertIsNone(policy.delay())
+
+        policy.observe(1.0)
+        self.assertAlmostEqual(policy.delay(), 0.1)
+        for _ in range(20):
+            policy.observe(10.0)
+        # 分位数被 max_delay 截断
+        self.assertEqual(policy.delay(), 5)
+
+    def test_budget(self):
+        policy = HedgePolicy(budget_ratio=0.5, max_budget=1)
+        self.assertFalse(policy.try_spend())
+        policy.on_primary()
+        self.assertFalse(policy.try_spend())
+        for _ in range(10):
+            policy.on_primary()
+        self.assertTrue(policy.try_spend())
+        self.assertFalse(policy.try_spend())
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            HedgePolicy(percentile=1)
+        with self.assertRaises(ValueError):
+            HedgePolicy(budget_ratio=-1)
+
+
+class TestHedgedRetry(unittest.TestCase):
+    def setUp(self):
+        self.loop = VirtualTimeEventLoop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _replicas(self):
+        """每 10 次调用中有 1 次落到很慢的副本上"""
+        state = {"calls": 0, "cancelled": 0}
+
+        async def call():
+            state["calls"] += 1
+            try:
+                await asyncio.sleep(5 if state["calls"] % 10 == 0 else 0.1)
+            except asyncio.CancelledError:
+                state["cancelled"] += 1
+                raise
+            return "ok"
+
+        return call, state
+
+    def test_hedge_cuts_tail_latency(self):
+        call, state = self._replicas()
+        # 虚拟时间下快调用的延迟完全相同，用 min_delay 避免恰好在快调用结束时对冲
+        policy = HedgePolicy(
+            percentile=0.8, min_delay=0.2, budget_ratio=0.2, min_samples=10
+        )
+        limiter = AdaptiveAsyncConcurrencyLimiter(
+            max_concurrency=4, initial_concurrency=4, log_level="ERROR"
+        )
+        hedged_call = with_adaptive_retry(scheduler=limiter, hedge=policy)(call)
+
+        async def run():
+            latencies = []
+            for _ in range(100):
+                start = self.loop.time()
+                self.assertEqual(await hedged_call(), "ok")
+                latencies.append(self.loop.time() - start)
+            await limiter.shutdown()
+            return latencies
+
+        latencies = self.loop.run_until_complete(run())
+
+        # 学到分位数之后，慢调用在对冲等待时间加上一次快调用的时间内完成
+        self.assertLess(max(latencies[20:]), 0.5)
+        self.assertGreater(policy.hedged_total, 0)
+        self.assertEqual(policy.hedge_won_total, policy.hedged_total)
+        # 输掉的慢调用被取消
+        self.assertEqual(state["cancelled"], policy.hedge_won_total)
+        self.assertLessEqual(policy.hedged_total, 100 * 0.2)
+
+    def test_no_hedge_without_spare_concurrency(self):
+        call, state = self._replicas()
+        policy = HedgePolicy(percentile=0.8, budget_ratio=1, min_samples=5)
+        limiter = AdaptiveAsyncConcurrencyLimiter(
+            max_concurrency=1, initial_concurrency=1, log_level="ERROR"
+        )
+        hedged_call = with_adaptive_retry(scheduler=limiter, hedge=policy)(call)
+
+        async def run():
+            for _ in range(50):
+                await hedged_call()
+            await limiter.shutdown()
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(policy.hedged_total, 0)
+        self.assertEqual(state["calls"], 50)
+
+    def test_overload_on_both_attempts_is_retried(self):
+        attempts = 0
+
+        async def call():
+            nonlocal attempts
+            attempts += 1
+            if attempts <= 2:
+                await asyncio.sleep(1)
+                raise ServiceOverloadError()
+            return "ok"
+
+        policy = HedgePolicy(min_samples=1, budget_ratio=1)
+        policy.observe(0.1)
+        limiter = AdaptiveAsyncConcurrencyLimiter(
+            max_concurrency=4, initial_concurrency=4, log_level="ERROR"
+        )
+        hedged_call = with_adaptive_retry(
+            scheduler=limiter, hedge=policy, retry_interval_seconds=0.1
+        )(call)
+
+        async def run():
+            policy.on_primary()
+            result = await hedged_call()
+            await limiter.shutdown()
+            return result
+
+        self.assertEqual(self.loop.run_until_complete(run()), "ok")
+        self.assertEqual(policy.hedged_total, 1)
+        self.assertEqual(attempts, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,243 @@
+import asyncio
+import importlib.util
+import unittest
+
+from adaptio import (
+    AdaptiveAsyncConcurrencyLimiter,
+    LimiterHooks,
+    OpenTelemetryHooks,
+    ServiceOverloadError,
+    with_adaptive_retry,
+)
+
+
+class RecordingHooks(LimiterHooks):
+    def __init__(self):
+        self.events = []
+
+    def on_enqueue(self, trace):
+        self.events.append(("enqueue", trace))
+
+    def on_acquire(self, trace):
+        self.events.append(("acquire", trace))
+
+    def on_complete(self, trace):
+        self.events.append(("complete", trace))
+
+    def on_retry(self, event):
+        self.events.append(("retry", event))
+
+    def on_adjust(self, event):
+        self.events.append(("adjust", event))
+
+    def names(self):
+        return [name for name, _ in self.events]
+
+
+class TestHooks(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_task_timeline(self):
+        async def test_trace():
+            hooks = RecordingHooks()
+            limiter = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=1, hooks=[hooks], log_level="WARNING"
+            )
+
+            async def sample_task():
+                await asyncio.sleep(0.02)
+
+            await asyncio.gather(
+                limiter.submit(sample_task()), limiter.submit(sample_task())
+            )
+
+            completed = [trace for name, trace in hooks.events if name == "complete"]
+            self.assertEqual(len(completed), 2)
+            second = completed[1]
+            self.assertEqual(second.outcome, "succeed")
+            # 第二个调用排队等待了第一个调用的执行时间
+            self.assertGreaterEqual(second.queue_wait, 0.015)
+            self.assertLess(second.admission_wait, 0.005)
+            self.assertGreaterEqual(second.service_time, 0.015)
+            self.assertEqual(hooks.names()[:3], ["enqueue", "enqueue", "acquire"])
+            self.assertIn("adjust", hooks.names())
+
+        self.loop.run_until_complete(test_trace())
+
+    def test_outcomes(self):
+        async def test_trace():
+            hooks = RecordingHooks()
+            limiter = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=1, log_level="WARNING"
+            )
+            limiter.add_hook(hooks)
+
+            async def overloaded_task():
+                raise ServiceOverloadError("busy")
+
+            with self.assertRaises(ServiceOverloadError):
+                await limiter.submit(overloaded_task())
+            running = limiter.submit(asyncio.sleep(1))
+            queued = limiter.submit(asyncio.sleep(1))
+            await asyncio.sleep(0.01)
+            queued.cancel()
+            running.cancel()
+            await asyncio.gather(running, queued, return_exceptions=True)
+
+            outcomes = [
+                (trace.outcome, trace.acquired_at is not None)
+                for name, trace in hooks.events
+                if name == "complete"
+            ]
+            self.assertEqual(
+                outcomes,
+                [("overload", True), ("cancelled", False), ("cancelled", True)],
+            )
+
+        self.loop.run_until_complete(test_trace())
+
+    def test_asubmit_cancelled_while_queue_full(self):
+        async def test_trace():
+            hooks = RecordingHooks()
+            limiter = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=1, max_pending=1, hooks=[hooks], log_level="WARNING"
+            )
+            running = await limiter.asubmit(asyncio.sleep(1))
+            queued = await limiter.asubmit(asyncio.sleep(1))
+            # 等待队列已满，调用方在 asubmit 中挂起时被取消
+            blocked = asyncio.create_task(limiter.asubmit(asyncio.sleep(1)))
+            await asyncio.sleep(0.01)
+            blocked.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await blocked
+
+            completed = [trace for name, trace in hooks.events if name == "complete"]
+            self.assertEqual(len(completed), 1)
+            self.assertEqual(completed[0].outcome, "cancelled")
+            self.assertIsNone(completed[0].acquired_at)
+            running.cancel()
+            queued.cancel()
+            await asyncio.gather(running, queued, return_exceptions=True)
+            await limiter.shutdown()
+
+        self.loop.run_until_complete(test_trace())
+
+    def test_no_trace_without_hooks(self):
+        async def test_trace():
+            limiter = AdaptiveAsyncConcurrencyLimiter(log_level="WARNING")
+            self.assertIsNone(limiter._new_trace(0, 0.0))
+
+        self.loop.run_until_complete(test_trace())
+
+    def test_broken_hook_does_not_break_calls(self):
+        class BrokenHooks(LimiterHooks):
+            def on_acquire(self, trace):
+                raise RuntimeError("bug in hook")
+
+        async def test_trace():
+            limiter = AdaptiveAsyncConcurrencyLimiter(
+                hooks=[BrokenHooks()], log_level="CRITICAL"
+            )
+
+            async def sample_task():
+                return "ok"
+
+            self.assertEqual(await limiter.submit(sample_task()), "ok")
+
+        self.loop.run_until_complete(test_trace())
+
+    def test_retry_events(self):
+        async def test_retry():
+            hooks = RecordingHooks()
+            attempts = 0
+
+            @with_adaptive_retry(
+                retry_interval_seconds=0.01, hooks=[hooks], log_level="WARNING"
+            )
+            async def flaky_task():
+                nonlocal attempts
+                attempts += 1
+                if attempts < 3:
+                    raise ServiceOverloadError("busy", retry_after=0.02)
+                return "ok"
+
+            self.assertEqual(await flaky_task(), "ok")
+            retries = [event for name, event in hooks.events if name == "retry"]
+            self.assertEqual([event.attempt for event in retries], [1, 2])
+            self.assertEqual(retries[0].delay, 0.02)
+            self.assertIn("flaky_task", retries[0].function)
+            # 默认限制器也注册了同一组钩子
+            self.assertEqual(hooks.names().count("complete"), 3)
+
+        self.loop.run_until_complete(test_retry())
+
+
+@unittest.skipUnless(
+    importlib.util.find_spec("opentelemetry.sdk"), "需要安装 opentelemetry-sdk"
+)
+class TestOpenTelemetryHooks(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_spans(self):
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+            InMemorySpanExporter,
+        )
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = provider.get_tracer("test")
+
+        async def test_otel():
+            limiter = AdaptiveAsyncConcurrencyLimiter(
+                hooks=[OpenTelemetryHooks(tracer)],
+                log_prefix="partner",
+                log_level="WARNING",
+            )
+
+            async def sample_task():
+                return "ok"
+
+            async def overloaded_task():
+                raise ServiceOverloadError("busy")
+
+            with tracer.start_as_current_span("request"):
+                await limiter.submit(sample_task())
+                with self.assertRaises(ServiceOverloadError):
+                    await limiter.submit(overloaded_task())
+
+        self.loop.run_until_complete(test_otel())
+
+        spans = {span.name: span for span in exporter.get_finished_spans()}
+        request = spans["request"]
+        tasks = [
+            span
+            for span in exporter.get_finished_spans()
+            if span.name == "adaptio.task"
+        ]
+        self.assertEqual(len(tasks), 2)
+        self.assertTrue(
+            all(span.parent.span_id == request.context.span_id for span in tasks)
+        )
+        self.assertEqual(tasks[0].attributes["adaptio.outcome"], "succeed")
+        self.assertEqual(tasks[0].attributes["adaptio.limiter"], "partner")
+        self.assertIn("adaptio.service_time", tasks[0].attributes)
+        self.assertEqual(tasks[1].attributes["adaptio.outcome"], "overload")
+        self.assertFalse(tasks[1].status.is_ok)
+        self.assertEqual(tasks[0].events[0].name, "adaptio.acquired")
+
+
+if __name__ == "__main__":
+    unittest.main()
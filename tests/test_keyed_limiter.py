@@ -0,0 +1,169 @@
+import asyncio
+import unittest
+
+from adaptio import KeyedAdaptiveLimiter, ServiceOverloadError, with_adaptive_retry
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestKeyedAdaptiveLimiter(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_keys_are_isolated(self):
+        async def test_keyed():
+            keyed = KeyedAdaptiveLimiter(max_concurrency=8, initial_concurrency=4)
+
+            async def overloaded_task():
+                raise ServiceOverloadError("slow host")
+
+            async def sample_task():
+                return "ok"
+
+            for _ in range(8):
+                with self.assertRaises(ServiceOverloadError):
+                    await keyed.submit(overloaded_task(), key="slow")
+            for _ in range(8):
+                await keyed.submit(sample_task(), key="fast")
+
+            # 慢主机的过载不影响其他主机的并发数
+            self.assertLess(keyed.get("slow").workers_lock.initial_value, 4)
+            self.assertGreater(keyed.get("fast").workers_lock.initial_value, 4)
+            # 所有 key 共享同一个 logger
+            self.assertIs(keyed.get("slow").logger, keyed.get("fast").logger)
+            await keyed.shutdown()
+
+        self.loop.run_until_complete(test_keyed())
+
+    def test_lru_eviction_remembers_limits(self):
+        async def test_keyed():
+            keyed = KeyedAdaptiveLimiter(max_keys=2, initial_concurrency=2)
+            await keyed.get("a").workers_lock.set_value(7)
+            keyed.get("b")
+            keyed.get("a")
+            keyed.get("c")
+
+            # b 最久未使用，被回收
+            self.assertEqual(len(keyed), 2)
+            self.assertNotIn("b", keyed)
+            self.assertIn("a", keyed)
+            keyed.get("b")
+            self.assertNotIn("a", keyed)
+            # a 再次出现时沿用回收前学到的并发数
+            self.assertEqual(keyed.get("a").workers_lock.initial_value, 7)
+            self.assertEqual(keyed.evicted_count, 3)
+
+        self.loop.run_until_complete(test_keyed())
+
+    def test_busy_keys_are_not_evicted(self):
+        async def test_keyed():
+            keyed = KeyedAdaptiveLimiter(max_keys=1)
+            release = asyncio.Event()
+
+            async def sample_task():
+                await release.wait()
+
+            task = keyed.submit(sample_task(), key="busy")
+            keyed.get("other")
+            self.assertIn("busy", keyed)
+            release.set()
+            await task
+            keyed.get("third")
+            self.assertNotIn("busy", keyed)
+
+        self.loop.run_until_complete(test_keyed())
+
+    def test_eviction_stops_control_task(self):
+        async def test_keyed():
+            keyed = KeyedAdaptiveLimiter(max_keys=1, control_interval=1)
+            await keyed.submit(asyncio.sleep(0), key="a")
+            limiter = keyed.get("a")
+            control_task = limiter._control_task
+            self.assertIsNotNone(control_task)
+
+            keyed.get("b")
+            self.assertNotIn("a", keyed)
+            await asyncio.sleep(0)
+            self.assertTrue(control_task.cancelled())
+            await keyed.shutdown()
+
+        self.loop.run_until_complete(test_keyed())
+
+    def test_retrying_call_keeps_key(self):
+        async def test_keyed():
+            keyed = KeyedAdaptiveLimiter(
+                key_func=lambda host: host, max_keys=1, log_level="ERROR"
+            )
+            used: list = []
+
+            @with_adaptive_retry(scheduler=keyed, retry_interval_seconds=0.05)
+            async def fetch(host: str) -> str:
+                used.append(keyed.get(host))
+                if len(used) == 1:
+                    raise ServiceOverloadError("busy")
+                return host
+
+            task = asyncio.ensure_future(fetch("a"))
+            await asyncio.sleep(0.02)
+            # 等待重试期间 a 没有在执行的任务，但仍被持有，不会被回收
+            keyed.get("b")
+            self.assertIn("a", keyed)
+            self.assertEqual(await task, "a")
+            self.assertIs(used[0], used[1])
+
+            # 重试结束后不再被持有，可以正常回收
+            keyed.get("c")
+            self.assertNotIn("a", keyed)
+
+        self.loop.run_until_complete(test_keyed())
+
+    def test_idle_ttl(self):
+        clock = FakeClock()
+        keyed = KeyedAdaptiveLimiter(idle_ttl_seconds=10, clock=clock)
+        keyed.get("a")
+        clock.now = 5
+        keyed.get("b")
+        clock.now = 12
+        keyed.get("c")
+        self.assertNotIn("a", keyed)
+        self.assertIn("b", keyed)
+
+    def test_with_adaptive_retry_key_func(self):
+        async def test_keyed():
+            keyed = KeyedAdaptiveLimiter(
+                key_func=lambda host, path: host, max_concurrency=1
+            )
+            running: dict[str, int] = {"a": 0, "b": 0}
+            max_running: dict[str, int] = {"a": 0, "b": 0}
+
+            @with_adaptive_retry(scheduler=keyed)
+            async def fetch(host: str, path: str) -> str:
+                running[host] += 1
+                max_running[host] = max(max_running[host], running[host])
+                await asyncio.sleep(0.01)
+                running[host] -= 1
+                return f"{host}{path}"
+
+            results = await asyncio.gather(
+                *[fetch(host, f"/{i}") for i in range(3) for host in "ab"]
+            )
+            self.assertEqual(len(results), 6)
+            self.assertEqual(len(keyed), 2)
+            # 每个主机各自受并发上限约束
+            self.assertEqual(max_running, {"a": 1, "b": 1})
+
+        self.loop.run_until_complete(test_keyed())
+
+
+if __name__ == "__main__":
+    unittest.main()
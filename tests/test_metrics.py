@@ -0,0 +1,155 @@
+import asyncio
+import unittest
+
+from adaptio import (
+    AdaptiveAsyncConcurrencyLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    Histogram,
+    ServiceOverloadError,
+    render_prometheus,
+)
+
+
+class TestHistogram(unittest.TestCase):
+    def test_observe_and_quantile(self):
+        histogram = Histogram([0.1, 0.2, 0.4])
+        for value in (0.05, 0.15, 0.15, 0.3, 1.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.count, 5)
+        self.assertAlmostEqual(histogram.sum, 1.65)
+        self.assertEqual(
+            histogram.cumulative_counts(),
+            [(0.1, 1), (0.2, 3), (0.4, 4), (float("inf"), 5)],
+        )
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.175)
+        # 落在 +Inf 桶中的分位数只能给出最大的有限上界
+        self.assertEqual(histogram.quantile(1.0), 0.4)
+        self.assertIsNone(Histogram().quantile(0.5))
+
+
+class TestLimiterMetrics(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_totals_survive_window_resets(self):
+        async def test_stats():
+            limiter = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=4, initial_concurrency=2, log_level="WARNING"
+            )
+
+            async def sample_task():
+                await asyncio.sleep(0.01)
+
+            async def overloaded_task():
+                raise ServiceOverloadError("busy")
+
+            async def failing_task():
+                raise ValueError("bad input")
+
+            await asyncio.gather(*(limiter.submit(sample_task()) for _ in range(10)))
+            with self.assertRaises(ServiceOverloadError):
+                await limiter.submit(overloaded_task())
+            with self.assertRaises(ValueError):
+                await limiter.submit(failing_task())
+            task = limiter.submit(asyncio.sleep(10))
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+            stats = limiter.stats()
+            self.assertEqual(stats.submitted_total, 13)
+            self.assertEqual(stats.succeed_total, 10)
+            self.assertEqual(stats.overload_total, 1)
+            self.assertEqual(stats.failed_total, 1)
+            self.assertEqual(stats.cancelled_total, 1)
+            self.assertEqual(stats.in_flight, 0)
+            self.assertEqual(stats.queue_depth, 0)
+            self.assertGreater(stats.limit_increase_total, 0)
+            self.assertEqual(stats.current_limit, limiter.workers_lock.initial_value)
+            self.assertEqual(limiter.metrics.latency.count, 10)
+            self.assertGreaterEqual(stats.latency_p50, 0.005)
+            self.assertEqual(limiter.metrics.queue_wait.count, 13)
+
+        self.loop.run_until_complete(test_stats())
+
+    def test_queue_depth_and_wait(self):
+        async def test_stats():
+            limiter = AdaptiveAsyncConcurrencyLimiter(
+                max_concurrency=1, initial_concurrency=1, log_level="WARNING"
+            )
+            tasks = [limiter.submit(asyncio.sleep(0.02)) for _ in range(3)]
+            await asyncio.sleep(0.005)
+            stats = limiter.stats()
+            self.assertEqual(stats.in_flight, 1)
+            self.assertEqual(stats.queue_depth, 2)
+
+            await asyncio.gather(*tasks)
+            # 最后一个任务排队等待了前两个任务的执行时间
+            self.assertGreaterEqual(limiter.stats().queue_wait_p99, 0.02)
+
+        self.loop.run_until_complete(test_stats())
+
+    def test_rejected_by_circuit_breaker(self):
+        async def test_stats():
+            breaker = CircuitBreaker(minimum_calls=1, window_size=1)
+            limiter = AdaptiveAsyncConcurrencyLimiter(
+                circuit_breaker=breaker, log_level="WARNING"
+            )
+
+            async def overloaded_task():
+                raise ServiceOverloadError("busy")
+
+            with self.assertRaises(ServiceOverloadError):
+                await limiter.submit(overloaded_task())
+            with self.assertRaises(CircuitOpenError):
+                await limiter.submit(overloaded_task())
+            self.assertEqual(limiter.stats().rejected_total, 1)
+
+        self.loop.run_until_complete(test_stats())
+
+    def test_render_prometheus(self):
+        async def test_render():
+            limiter = AdaptiveAsyncConcurrencyLimiter(
+                initial_concurrency=3, log_level="WARNING"
+            )
+
+            async def sample_task():
+                return "ok"
+
+            await limiter.submit(sample_task())
+            text = render_prometheus({'partner "a"': limiter})
+
+            self.assertIn("# TYPE adaptio_concurrency_limit gauge", text)
+            self.assertIn(
+                'adaptio_concurrency_limit{limiter="partner \\"a\\""} 3', text
+            )
+            self.assertIn("# TYPE adaptio_calls_total counter", text)
+            self.assertIn(
+                'adaptio_calls_total{limiter="partner \\"a\\"",outcome="succeed"} 1',
+                text,
+            )
+            self.assertIn(
+                'adaptio_call_latency_seconds_bucket{limiter="partner \\"a\\"",le="+Inf"} 1',
+                text,
+            )
+            self.assertIn(
+                'adaptio_call_latency_seconds_count{limiter="partner \\"a\\""} 1', text
+            )
+            self.assertFalse(text.rstrip().endswith("# EOF"))
+
+            openmetrics = render_prometheus({"a": limiter}, openmetrics=True)
+            self.assertIn("# TYPE adaptio_calls counter", openmetrics)
+            self.assertTrue(openmetrics.endswith("# EOF\n"))
+
+        self.loop.run_until_complete(test_render())
+
+
+if __name__ == "__main__":
+    unittest.main()
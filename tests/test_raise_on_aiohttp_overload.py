@@ -1,11 +1,14 @@
 import asyncio
+import time
 import unittest
+from email.utils import formatdate
 from typing import Any
 from unittest.mock import AsyncMock
 
 import aiohttp
 
 from adaptio import ServiceOverloadError, raise_on_aiohttp_overload
+from adaptio.raise_on_aiohttp_overload import parse_retry_after
 
 
 class TestAiohttpOverloadDecorator(unittest.TestCase):
@@ -98,6 +101,42 @@ class TestAiohttpOverloadDecorator(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.loop.run_until_complete(failing_request())
 
+    def test_retry_after_header(self) -> None:
+        """测试 Retry-After 头会被解析为 ServiceOverloadError.retry_after。"""
+
+        @raise_on_aiohttp_overload()
+        async def failing_request() -> Any:
+            raise aiohttp.ClientResponseError(
+                request_info=AsyncMock(),
+                history=(),
+                status=429,
+                headers={"Retry-After": "30"},  # type: ignore[arg-type]
+            )
+
+        with self.assertRaises(ServiceOverloadError) as cm:
+            self.loop.run_until_complete(failing_request())
+        self.assertEqual(cm.exception.retry_after, 30)
+
+    def test_parse_retry_after(self) -> None:
+        """测试 Retry-After 头的两种格式。"""
+        self.assertEqual(parse_retry_after("5"), 5)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("not a date"))
+        retry_at = formatdate(time.time() + 60, usegmt=True)
+        delay = parse_retry_after(retry_at)
+        assert delay is not None
+        self.assertAlmostEqual(delay, 60, delta=2)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+
+    def test_parse_retry_after_is_clamped(self) -> None:
+        """测试异常的 Retry-After 头不会让调用无限期暂停。"""
+        self.assertEqual(parse_retry_after("inf"), 60)
+        self.assertEqual(parse_retry_after("1e308"), 60)
+        self.assertEqual(parse_retry_after("-5"), 0)
+        self.assertIsNone(parse_retry_after("nan"))
+        self.assertEqual(parse_retry_after("Fri, 01 Jan 9999 00:00:00 GMT"), 60)
+        self.assertEqual(parse_retry_after("300", max_seconds=120), 120)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,205 @@
+import asyncio
+import unittest
+
+from adaptio import (
+    AdaptiveAsyncConcurrencyLimiter,
+    ResultCache,
+    ServiceOverloadError,
+    SingleFlight,
+    VirtualTimeEventLoop,
+    with_adaptive_retry,
+)
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.loop = VirtualTimeEventLoop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _cache(self, **kwargs):
+        return ResultCache(clock=self.loop.time, **kwargs)
+
+    def test_hits_bypass_limiter(self):
+        calls = []
+
+        async def lookup(key):
+            calls.append(key)
+            await asyncio.sleep(1)
+            return key.upper()
+
+        limiter = AdaptiveAsyncConcurrencyLimiter(
+            max_concurrency=1, initial_concurrency=1, log_level="ERROR"
+        )
+        cache = self._cache(ttl_seconds=10)
+        cached_lookup = with_adaptive_retry(scheduler=limiter, cache=cache)(lookup)
+
+        async def run():
+            self.assertEqual(await cached_lookup("a"), "A")
+            # 占满唯一的名额，命中缓存的调用仍然立即返回
+            blocker = limiter.submit(asyncio.sleep(5))
+            await asyncio.sleep(0)
+            self.assertTrue(limiter.workers_lock.locked())
+            started = self.loop.time()
+            self.assertEqual(await cached_lookup("a"), "A")
+            self.assertEqual(self.loop.time(), started)
+            await blocker
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(calls, ["a"])
+        self.assertEqual((cache.hit_total, cache.miss_total), (1, 1))
+        self.assertEqual(limiter.metrics.succeed_total, 2)
+
+    def test_ttl_and_lru(self):
+        calls = []
+
+        async def lookup(key):
+            calls.append(key)
+            return key
+
+        cache = self._cache(ttl_seconds=10, max_entries=2)
+        cached_lookup = with_adaptive_retry(log_level="ERROR", cache=cache)(lookup)
+
+        async def run():
+            for key in "aba":
+                await cached_lookup(key)
+            # b 最久没有被使用，加入 c 时被淘汰
+            await cached_lookup("c")
+            await cached_lookup("a")
+            self.assertEqual(calls, ["a", "b", "c"])
+            await cached_lookup("b")
+            self.assertEqual(len(cache), 2)
+
+            await asyncio.sleep(11)
+            await cached_lookup("b")
+            self.assertEqual(calls, ["a", "b", "c", "b", "b"])
+
+        self.loop.run_until_complete(run())
+
+    def test_stale_while_revalidate(self):
+        version = 0
+
+        async def lookup(key):
+            nonlocal version
+            version += 1
+            await asyncio.sleep(1)
+            return version
+
+        cache = self._cache(ttl_seconds=10, stale_seconds=5)
+        cached_lookup = with_adaptive_retry(log_level="ERROR", cache=cache)(lookup)
+
+        async def run():
+            self.assertEqual(await cached_lookup("k"), 1)
+            await asyncio.sleep(12)
+            # 过期但仍在 stale_seconds 内：立即返回旧结果，只在后台刷新一次
+            started = self.loop.time()
+            self.assertEqual(await cached_lookup("k"), 1)
+            self.assertEqual(await cached_lookup("k"), 1)
+            self.assertEqual(self.loop.time(), started)
+            await asyncio.sleep(2)
+            self.assertEqual(await cached_lookup("k"), 2)
+
+            # 超过 stale_seconds 后同步重新加载
+            await asyncio.sleep(20)
+            self.assertEqual(await cached_lookup("k"), 3)
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(cache.stale_hit_total, 2)
+
+    def test_failed_refresh_keeps_stale_result(self):
+        calls = 0
+
+        async def lookup(key):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(1)
+            if calls > 1:
+                raise ServiceOverloadError("busy")
+            return "v1"
+
+        cache = self._cache(ttl_seconds=10, stale_seconds=30)
+        cached_lookup = with_adaptive_retry(
+            log_level="ERROR", max_retries=0, cache=cache
+        )(lookup)
+
+        async def run():
+            self.assertEqual(await cached_lookup("k"), "v1")
+            await asyncio.sleep(11)
+            for expected_calls in (2, 3):
+                # 过载的后台刷新失败后保留旧结果，下一次命中再次刷新
+                self.assertEqual(await cached_lookup("k"), "v1")
+                await asyncio.sleep(2)
+                self.assertEqual(calls, expected_calls)
+                self.assertEqual(cache.refresh_failed_total, expected_calls - 1)
+
+        self.loop.run_until_complete(run())
+
+    def test_negative_caching_never_caches_overload(self):
+        calls = 0
+        error = ValueError("not found")
+
+        async def lookup(key):
+            nonlocal calls
+            calls += 1
+            if key == "busy":
+                raise ServiceOverloadError("busy")
+            raise error
+
+        cache = self._cache(ttl_seconds=10, error_ttl_seconds=3)
+        cached_lookup = with_adaptive_retry(
+            log_level="ERROR", max_retries=0, cache=cache
+        )(lookup)
+
+        async def run():
+            for _ in range(2):
+                with self.assertRaises(ValueError) as ctx:
+                    await cached_lookup("missing")
+                self.assertIs(ctx.exception, error)
+            self.assertEqual(calls, 1)
+            await asyncio.sleep(4)
+            with self.assertRaises(ValueError):
+                await cached_lookup("missing")
+            self.assertEqual(calls, 2)
+
+            for _ in range(2):
+                with self.assertRaises(ServiceOverloadError):
+                    await cached_lookup("busy")
+            self.assertEqual(calls, 4)
+
+        self.loop.run_until_complete(run())
+
+    def test_with_singleflight(self):
+        calls = 0
+
+        async def lookup(key):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(1)
+            return key
+
+        cached_lookup = with_adaptive_retry(
+            log_level="ERROR",
+            cache=self._cache(ttl_seconds=10),
+            singleflight=SingleFlight(),
+        )(lookup)
+
+        async def run():
+            await asyncio.gather(*(cached_lookup("k") for _ in range(5)))
+            await cached_lookup("k")
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(calls, 1)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            ResultCache(ttl_seconds=0)
+        with self.assertRaises(ValueError):
+            ResultCache(ttl_seconds=1, max_entries=0)
+        with self.assertRaises(ValueError):
+            ResultCache(ttl_seconds=1, stale_seconds=-1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import unittest
+import uuid
+
+from adaptio import ServiceOverloadError, SharedMemoryLimiter, with_adaptive_retry
+
+
+def _run_worker(name: str, task_count: int, max_seen) -> None:
+    limiter = SharedMemoryLimiter(name, max_concurrency=3, initial_concurrency=3)
+
+    async def sample_task():
+        with max_seen.get_lock():
+            max_seen.value = max(max_seen.value, limiter.running_count)
+        await asyncio.sleep(0.005)
+
+    async def main():
+        await asyncio.gather(
+            *[limiter.submit(sample_task()) for _ in range(task_count)]
+        )
+        await limiter.shutdown()
+
+    asyncio.run(main())
+
+
+def _acquire_and_die(name: str) -> None:
+    limiter = SharedMemoryLimiter(name, initial_concurrency=2, max_concurrency=2)
+    limiter.try_acquire()
+    limiter.try_acquire()
+    os._exit(0)
+
+
+class TestSharedMemoryLimiter(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.name = f"test-{uuid.uuid4().hex[:12]}"
+        self.limiters: list[SharedMemoryLimiter] = []
+
+    def tearDown(self):
+        self.loop.close()
+        for limiter in self.limiters:
+            limiter.close()
+        if self.limiters:
+            self.limiters[0].unlink()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.limiters[0]._lock_path)
+
+    def _limiter(self, **kwargs) -> SharedMemoryLimiter:
+        limiter = SharedMemoryLimiter(self.name, **kwargs)
+        self.limiters.append(limiter)
+        return limiter
+
+    def test_instances_share_state(self):
+        first = self._limiter(initial_concurrency=2, max_concurrency=8)
+        # 后创建的实例沿用已有的共享状态
+        second = self._limiter(initial_concurrency=5, max_concurrency=8)
+        self.assertEqual(second.current_concurrency, 2)
+
+        self.assertTrue(first.try_acquire())
+        self.assertTrue(second.try_acquire())
+        self.assertFalse(first.try_acquire())
+        self.assertEqual(second.running_count, 2)
+        first.release()
+        self.assertTrue(second.try_acquire())
+
+    def test_adjusts_shared_limit(self):
+        async def test_shm():
+            limiter = self._limiter(initial_concurrency=4, max_concurrency=16)
+
+            async def sample_task():
+                await asyncio.sleep(0.001)
+
+            async def overloaded_task():
+                raise ServiceOverloadError("overloaded")
+
+            await asyncio.gather(*[limiter.submit(sample_task()) for _ in range(5)])
+            self.assertGreater(limiter.current_concurrency, 4)
+
+            before = limiter.current_concurrency
+            results = await asyncio.gather(
+                *[limiter.submit(overloaded_task()) for _ in range(before + 1)],
+                return_exceptions=True,
+            )
+            self.assertTrue(all(isinstance(r, ServiceOverloadError) for r in results))
+            self.assertLess(limiter.current_concurrency, before)
+            self.assertEqual(limiter.running_count, 0)
+
+        self.loop.run_until_complete(test_shm())
+
+    def test_limit_is_shared_across_processes(self):
+        self._limiter(initial_concurrency=3, max_concurrency=3)
+        max_seen = multiprocessing.Value("i", 0)
+        processes = [
+            multiprocessing.Process(target=_run_worker, args=(self.name, 10, max_seen))
+            for _ in range(3)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertTrue(all(process.exitcode == 0 for process in processes))
+        self.assertLessEqual(max_seen.value, 3)
+        self.assertEqual(self.limiters[0].running_count, 0)
+
+    def test_reclaims_permits_of_dead_processes(self):
+        limiter = self._limiter(initial_concurrency=2, max_concurrency=2)
+        process = multiprocessing.Process(target=_acquire_and_die, args=(self.name,))
+        process.start()
+        process.join()
+
+        self.assertEqual(limiter.running_count, 2)
+        # 名额已满时会检查并回收已退出进程占用的名额
+        self.assertTrue(limiter.try_acquire())
+        self.assertEqual(limiter.running_count, 1)
+
+    def test_with_adaptive_retry(self):
+        async def test_shm():
+            limiter = self._limiter(initial_concurrency=2)
+            attempts = 0
+
+            @with_adaptive_retry(scheduler=limiter, retry_interval_seconds=0.001)
+            async def sample_task() -> str:
+                nonlocal attempts
+                attempts += 1
+                if attempts == 1:
+                    raise ServiceOverloadError("overloaded")
+                return "ok"
+
+            self.assertEqual(await sample_task(), "ok")
+            self.assertEqual(attempts, 2)
+
+        self.loop.run_until_complete(test_shm())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import asyncio
+import statistics
+import time
+import unittest
+
+from adaptio import (
+    AdaptiveAsyncConcurrencyLimiter,
+    AIMDController,
+    ClosedLoopWorkload,
+    OpenLoopWorkload,
+    SimulatedBackend,
+    Simulation,
+    VirtualTimeEventLoop,
+    limiter_probes,
+    step_schedule,
+    with_adaptive_retry,
+)
+
+
+def _limiter_simulation(
+    capacity, duration: float, seed: int = 0, **limiter_kwargs
+) -> Simulation:
+    backend = SimulatedBackend(capacity, base_latency=0.5, seed=seed)
+    limiter = AdaptiveAsyncConcurrencyLimiter(
+        max_concurrency=256, initial_concurrency=1, log_level="ERROR", **limiter_kwargs
+    )
+    return Simulation(
+        lambda: limiter.submit(backend.call()),
+        backend,
+        ClosedLoopWorkload(callers=96),
+        duration=duration,
+        probes=limiter_probes(limiter),
+        seed=seed,
+    )
+
+
+class TestVirtualTimeEventLoop(unittest.TestCase):
+    def test_sleep_advances_virtual_clock(self):
+        loop = VirtualTimeEventLoop()
+        self.addCleanup(loop.close)
+
+        async def sleeper():
+            await asyncio.gather(asyncio.sleep(3600), asyncio.sleep(1800))
+            return loop.time()
+
+        start = time.perf_counter()
+        self.assertAlmostEqual(loop.run_until_complete(sleeper()), 3600)
+        self.assertLess(time.perf_counter() - start, 1)
+
+    def test_threadsafe_wakeup_still_works(self):
+        loop = VirtualTimeEventLoop()
+        self.addCleanup(loop.close)
+
+        async def wait_for_executor():
+            return await loop.run_in_executor(None, lambda: 42)
+
+        self.assertEqual(loop.run_until_complete(wait_for_executor()), 42)
+
+
+class TestSimulation(unittest.TestCase):
+    def test_aimd_converges_and_stays_stable(self):
+        result = _limiter_simulation(capacity=16, duration=1200).run()
+
+        limits = [limit for t, limit in result.series("limit") if t >= 600]
+        self.assertLess(result.wall_seconds, 30)
+        # 稳态时并发上限在容量附近小幅振荡
+        self.assertGreater(statistics.fmean(limits), 16 * 0.7)
+        self.assertLess(statistics.fmean(limits), 16 * 1.5)
+        self.assertLess(statistics.pstdev(limits), 16 * 0.3)
+        self.assertLess(result.overload_ratio, 0.4)
+        # 满载时延迟约为 2 * base_latency，吞吐上限约 16 次每秒
+        self.assertGreater(result.goodput, 16 * 0.6)
+
+    def test_limit_follows_capacity_change(self):
+        result = _limiter_simulation(
+            capacity=step_schedule([(0, 32), (600, 8)]),
+            duration=1200,
+            controller=AIMDController(decrease_factor=0.5),
+        ).run()
+
+        before = [limit for t, limit in result.series("limit") if 300 <= t < 600]
+        after = [limit for t, limit in result.series("limit") if t >= 900]
+        self.assertGreater(statistics.fmean(before), 20)
+        self.assertLess(statistics.fmean(after), 14)
+
+    def test_same_seed_is_reproducible(self):
+        first = _limiter_simulation(capacity=16, duration=120, seed=7).run()
+        second = _limiter_simulation(capacity=16, duration=120, seed=7).run()
+
+        self.assertEqual(first.trace, second.trace)
+        self.assertEqual(first.latencies, second.latencies)
+
+    def test_with_adaptive_retry_open_loop(self):
+        backend = SimulatedBackend(8, base_latency=0.5, retry_after=1)
+
+        @with_adaptive_retry(retry_interval_seconds=0.5, log_level="ERROR")
+        async def call():
+            await backend.call()
+
+        result = Simulation(call, backend, OpenLoopWorkload(rate=4), duration=600).run()
+
+        # 到达率低于后端的吞吐上限（约 8 次每秒），重试之后所有调用都能成功
+        self.assertEqual(result.failed_count, 0)
+        self.assertAlmostEqual(result.goodput, 4, delta=0.5)
+        self.assertEqual(len(result.trace), 601)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import asyncio
+import unittest
+
+from adaptio import (
+    AdaptiveAsyncConcurrencyLimiter,
+    ServiceOverloadError,
+    SingleFlight,
+    VirtualTimeEventLoop,
+    with_adaptive_retry,
+)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.loop = VirtualTimeEventLoop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_identical_calls_share_one_execution(self):
+        calls = []
+
+        async def fetch(user_id, field="name"):
+            calls.append((user_id, field))
+            await asyncio.sleep(1)
+            return f"{field} of {user_id}"
+
+        flight = SingleFlight()
+        dedup_fetch = with_adaptive_retry(
+            initial_concurrency=1, log_level="ERROR", singleflight=flight
+        )(fetch)
+
+        async def run():
+            return await asyncio.gather(
+                *(dedup_fetch(1) for _ in range(5)),
+                dedup_fetch(1, field="email"),
+                dedup_fetch(2),
+            )
+
+        results = self.loop.run_until_complete(run())
+        self.assertEqual(results[:5], ["name of 1"] * 5)
+        self.assertEqual(results[5:], ["email of 1", "name of 2"])
+        self.assertEqual(sorted(calls), [(1, "email"), (1, "name"), (2, "name")])
+        self.assertEqual(flight.shared_total, 4)
+        self.assertEqual(flight.in_flight, 0)
+
+        # 调用结束后不缓存结果
+        self.loop.run_until_complete(dedup_fetch(1))
+        self.assertEqual(len(calls), 4)
+
+    def test_key_func_and_unhashable_arguments(self):
+        calls = []
+
+        async def embed(text, options):
+            calls.append(text)
+            await asyncio.sleep(1)
+            return len(text)
+
+        # options 是 dict，不可哈希，默认 key 下不合并
+        plain = with_adaptive_retry(
+            initial_concurrency=4, log_level="ERROR", singleflight=SingleFlight()
+        )(embed)
+        keyed = with_adaptive_retry(
+            initial_concurrency=4,
+            log_level="ERROR",
+            singleflight=SingleFlight(key_func=lambda text, options: text),
+        )(embed)
+
+        async def run(func):
+            return await asyncio.gather(*(func("abc", {}) for _ in range(3)))
+
+        self.assertEqual(self.loop.run_until_complete(run(plain)), [3, 3, 3])
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.loop.run_until_complete(run(keyed)), [3, 3, 3])
+        self.assertEqual(len(calls), 4)
+
+    def test_waiters_share_exception_and_overload_retries(self):
+        attempts = 0
+
+        async def flaky():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0.1)
+            if attempts <= 2:
+                raise ServiceOverloadError("busy")
+            if attempts == 3:
+                raise ValueError("bad request")
+            return "ok"
+
+        limiter = AdaptiveAsyncConcurrencyLimiter(
+            initial_concurrency=4, log_level="ERROR"
+        )
+        dedup_flaky = with_adaptive_retry(
+            scheduler=limiter, retry_interval_seconds=1, singleflight=SingleFlight()
+        )(flaky)
+
+        async def run():
+            return await asyncio.gather(
+                *(dedup_flaky() for _ in range(10)), return_exceptions=True
+            )
+
+        results = self.loop.run_until_complete(run())
+        # 两次过载只为整组重试，而不是每个等待者各重试一次
+        self.assertEqual(attempts, 3)
+        self.assertEqual(limiter.metrics.overload_total, 2)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(len({id(r) for r in results}), 1)
+
+        self.assertEqual(self.loop.run_until_complete(dedup_flaky()), "ok")
+
+    def test_cancellation(self):
+        started = 0
+        cancelled = 0
+
+        async def slow():
+            nonlocal started, cancelled
+            started += 1
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled += 1
+                raise
+            return "done"
+
+        flight = SingleFlight()
+
+        async def run():
+            first = asyncio.ensure_future(flight.do("k", slow))
+            second = asyncio.ensure_future(flight.do("k", slow))
+            await asyncio.sleep(1)
+            # 一个等待者被取消，另一个仍然拿到结果
+            first.cancel()
+            self.assertEqual(await second, "done")
+            with self.assertRaises(asyncio.CancelledError):
+                await first
+
+            # 所有等待者都被取消后，共享的调用也被取消
+            third = asyncio.ensure_future(flight.do("k", slow))
+            await asyncio.sleep(1)
+            third.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await third
+            await asyncio.sleep(0)
+            self.assertEqual(flight.in_flight, 0)
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(started, 2)
+        self.assertEqual(cancelled, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import math
+import unittest
+
+from adaptio import SlidingWindowStats
+
+
+class TestSlidingWindowStats(unittest.TestCase):
+    def test_totals_within_window(self):
+        stats = SlidingWindowStats(window_seconds=10, bucket_count=10)
+        stats.record(0.5, "succeed", 0.2)
+        stats.record(3.2, "succeed", 0.1)
+        stats.record(3.7, "overload")
+        stats.record(9.9, "failed")
+
+        totals = stats.totals(9.9)
+        self.assertEqual(totals.succeed_count, 2)
+        self.assertEqual(totals.overload_count, 1)
+        self.assertEqual(totals.failed_count, 1)
+        self.assertEqual(totals.finished_count, 4)
+        self.assertAlmostEqual(totals.latency_sum, 0.3)
+        self.assertAlmostEqual(totals.min_latency, 0.1)
+
+    def test_old_buckets_expire(self):
+        stats = SlidingWindowStats(window_seconds=10, bucket_count=10)
+        stats.record(0.5, "overload")
+        stats.record(5.5, "succeed", 0.1)
+
+        # 0 秒所在的桶已滑出窗口
+        self.assertEqual(stats.totals(10.5).overload_count, 0)
+        self.assertEqual(stats.totals(10.5).succeed_count, 1)
+        # 同一个环形槽位被新的时间区间复用时先清空
+        stats.record(20.2, "failed")
+        totals = stats.totals(20.2)
+        self.assertEqual(totals.finished_count, 1)
+        self.assertEqual(totals.min_latency, math.inf)
+
+    def test_clear(self):
+        stats = SlidingWindowStats(window_seconds=1)
+        stats.record(0.1, "overload")
+        stats.clear()
+        self.assertEqual(stats.totals(0.2).finished_count, 0)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            SlidingWindowStats(window_seconds=0)
+        with self.assertRaises(ValueError):
+            SlidingWindowStats(window_seconds=1, bucket_count=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+
+from adaptio import TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=3, clock=clock)
+
+        # 初始满桶，允许 capacity 个请求突发
+        self.assertTrue(all(bucket.try_acquire() for _ in range(3)))
+        self.assertFalse(bucket.try_acquire())
+
+        # 0.1 秒补充一个令牌
+        clock.now = 0.1
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+
+        # 长时间空闲后令牌数不会超过容量
+        clock.now = 100
+        self.assertAlmostEqual(bucket.tokens, 3)
+
+    def test_reserve_returns_delay(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=1, clock=clock)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        self.assertAlmostEqual(bucket.reserve(), 0.2)
+
+        # 提速后按新速率补充：0.1 秒补充 2 个令牌，正好还清预约
+        bucket.set_rate(20)
+        clock.now = 0.1
+        self.assertAlmostEqual(bucket.tokens, 0)
+
+    def test_acquire_paces_calls(self):
+        async def test_bucket():
+            bucket = TokenBucket(rate=50, capacity=5)
+            start = asyncio.get_running_loop().time()
+            await asyncio.gather(*[bucket.acquire() for _ in range(15)])
+            elapsed = asyncio.get_running_loop().time() - start
+            # 5 个突发 + 10 个按 50 QPS 放行，约 0.2 秒
+            self.assertGreaterEqual(elapsed, 0.18)
+            self.assertLess(elapsed, 0.5)
+
+        self.loop.run_until_complete(test_bucket())
+
+    def test_cancelled_acquire_returns_token(self):
+        async def test_bucket():
+            clock = FakeClock()
+            bucket = TokenBucket(rate=1, capacity=1, clock=clock)
+            await bucket.acquire()
+            waiter = asyncio.create_task(bucket.acquire())
+            await asyncio.sleep(0)
+            self.assertAlmostEqual(bucket.tokens, -1)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            self.assertAlmostEqual(bucket.tokens, 0)
+
+        self.loop.run_until_complete(test_bucket())
+
+    def test_invalid_values(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=1, capacity=0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
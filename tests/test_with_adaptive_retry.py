@@ -1,7 +1,12 @@
 import asyncio
 import unittest
 
-from adaptio import ServiceOverloadError, with_adaptive_retry
+from adaptio import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ServiceOverloadError,
+    with_adaptive_retry,
+)
 
 
 class TestWithAdaptiveRetry(unittest.TestCase):
@@ -57,6 +62,55 @@ class TestWithAdaptiveRetry(unittest.TestCase):
 
         self.loop.run_until_complete(test_retry())
 
+    def test_backoff_and_retry_after(self) -> None:
+        async def test_retry() -> None:
+            attempt_times: list[float] = []
+            loop = asyncio.get_running_loop()
+
+            @with_adaptive_retry(
+                max_retries=3, retry_interval_seconds=0.01, backoff="exponential"
+            )
+            async def failing_task() -> bool:
+                attempt_times.append(loop.time())
+                if len(attempt_times) == 1:
+                    raise ServiceOverloadError("Service overloaded", retry_after=0.2)
+                if len(attempt_times) < 4:
+                    raise ServiceOverloadError("Service overloaded")
+                return True
+
+            self.assertTrue(await failing_task())
+            gaps = [
+                b - a for a, b in zip(attempt_times, attempt_times[1:], strict=False)
+            ]
+            # 第一次重试遵循服务端给出的 retry_after，之后按指数退避
+            self.assertGreaterEqual(gaps[0], 0.2)
+            self.assertGreaterEqual(gaps[1], 0.02)
+            self.assertGreaterEqual(gaps[2], 0.04)
+            self.assertLess(gaps[1], 0.2)
+
+        self.loop.run_until_complete(test_retry())
+
+    def test_circuit_open_stops_retries(self) -> None:
+        async def test_retry() -> None:
+            attempts = 0
+
+            @with_adaptive_retry(
+                max_retries=100,
+                retry_interval_seconds=0.001,
+                circuit_breaker=CircuitBreaker(minimum_calls=3),
+            )
+            async def failing_task() -> None:
+                nonlocal attempts
+                attempts += 1
+                raise ServiceOverloadError("Service overloaded")
+
+            # 熔断后立即失败，而不是继续重试到 max_retries
+            with self.assertRaises(CircuitOpenError):
+                await failing_task()
+            self.assertEqual(attempts, 3)
+
+        self.loop.run_until_complete(test_retry())
+
 
 if __name__ == "__main__":
     unittest.main()
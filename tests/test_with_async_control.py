@@ -74,6 +74,23 @@ class TestWithAsyncControl(unittest.TestCase):
 
         self.loop.run_until_complete(test_control_callable())
 
+    def test_with_async_control_max_qps(self):
+        async def test_control_qps():
+            @with_async_control(max_qps=50, max_burst=5)
+            async def limited_task(task_id):
+                return task_id
+
+            start = asyncio.get_running_loop().time()
+            results = await asyncio.gather(*[limited_task(i) for i in range(15)])
+            elapsed = asyncio.get_running_loop().time() - start
+
+            self.assertEqual(results, list(range(15)))
+            # 前 5 个请求可以突发，其余 10 个按 50 QPS 放行
+            self.assertGreaterEqual(elapsed, 0.18)
+            self.assertLess(elapsed, 0.5)
+
+        self.loop.run_until_complete(test_control_qps())
+
 
 if __name__ == "__main__":
     unittest.main()